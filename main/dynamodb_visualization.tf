@@ -8,7 +8,9 @@
 # - stdDev (N): Standard deviation value
 # - lastUpdatedBy (S): User identifier who last updated
 # - userId (S): User who owns the visualization
-# - lastUpdatedAt (N): Last update timestamp (redundant with timestamp but more explicit)
+# - lastUpdatedAt (N): Last update timestamp (differs from timestamp when updates are coalesced)
+# - version (S): Version identifier (v1, v2, ...)
+# Each paramId also has a version counter item at timestamp 0 holding versionNumber (N)
 module "parameter_table" {
   source = "./modules/dynamodb"
 
@@ -50,6 +52,10 @@ module "parameter_table" {
 
   enable_point_in_time_recovery = var.dynamodb_point_in_time_recovery
 
+  # Stream new parameter items to the WebSocket broadcaster
+  stream_enabled   = true
+  stream_view_type = "NEW_IMAGE"
+
   tags = {
     Component   = "LTO Demand Planning"
     Name        = "Parameter Table"
@@ -133,6 +139,7 @@ module "history_table" {
 # - expiry (N): TTL timestamp for connection expiration
 # - connectionStatus (S): Status of the connection (connected, disconnected)
 # - clientIp (S): Client IP address for diagnostics
+# - paramIds (L): Parameter sets subscribed at connect time (see subscription_table)
 module "connection_table" {
   source = "./modules/dynamodb"
 
@@ -177,3 +184,56 @@ module "connection_table" {
     Environment = var.environment
   }
 }
+
+# WebSocket subscriptions table
+# Stores which parameter sets each WebSocket connection is viewing:
+# - connectionId (S): Primary key - WebSocket connection identifier
+# - paramId (S): Sort key - Parameter set the connection is subscribed to
+# - userId (S): User identifier who owns the connection
+# - subscribedAt (N): Timestamp when the subscription was created
+# - expiry (N): TTL timestamp matching the connection expiry
+module "subscription_table" {
+  source = "./modules/dynamodb"
+
+  environment = var.environment
+  table_name  = "${var.project_name}-subscriptions-${var.environment}"
+  hash_key    = "connectionId"
+  range_key   = "paramId"
+
+  attributes = [
+    {
+      name = "connectionId"
+      type = "S"
+    },
+    {
+      name = "paramId"
+      type = "S"
+    }
+  ]
+
+  # Add a GSI so broadcasts only read the subscribers of the updated parameter set
+  global_secondary_indexes = [
+    {
+      name               = "ParamSubscribersIndex"
+      hash_key           = "paramId"
+      range_key          = "connectionId"
+      write_capacity     = 5
+      read_capacity      = 5
+      projection_type    = "KEYS_ONLY"
+      non_key_attributes = []
+    }
+  ]
+
+  billing_mode = var.dynamodb_billing_mode
+
+  # TTL for auto-cleanup of subscriptions left behind by dropped connections
+  enable_point_in_time_recovery = false
+  ttl_enabled                   = true
+  ttl_attribute                 = "expiry"
+
+  tags = {
+    Component   = "LTO Demand Planning"
+    Name        = "WebSocket Subscriptions Table"
+    Environment = var.environment
+  }
+}
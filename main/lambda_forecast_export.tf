@@ -0,0 +1,88 @@
+# Lambda function for streaming filtered forecast exports to S3
+# Shares the forecast sync deployment package (export.py is packaged alongside index.py)
+
+module "forecast_export_lambda" {
+  source = "./modules/lambda_function"
+
+  function_name = "forecast-export-${var.environment}"
+  description   = "Streams filtered forecast extracts to S3 via COPY and multipart upload"
+  handler       = "export.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 900 # 15 minutes for multi-million row exports
+  memory_size   = 512
+  zip_file      = local.forecast_sync_lambda_zip_path
+
+  create_log_group = false
+
+  environment_variables = {
+    SSM_NEON_API_KEY_PATH    = "/forecast-sync/${var.environment}/neon-api-key"
+    SSM_NEON_PROJECT_ID_PATH = "/forecast-sync/${var.environment}/neon-project-id"
+    EXPORT_BUCKET            = aws_s3_bucket.wyatt-datalake-35315550.id
+    EXPORT_PREFIX            = "forecast-exports"
+    EXPORT_URL_EXPIRY        = "3600"
+    ENVIRONMENT              = var.environment
+  }
+
+  policy_statements = {
+    logs = {
+      effect = "Allow"
+      actions = [
+        "logs:CreateLogGroup",
+        "logs:CreateLogStream",
+        "logs:PutLogEvents"
+      ]
+      resources = ["arn:aws:logs:*:*:*"]
+    }
+    s3_exports = {
+      effect = "Allow"
+      actions = [
+        "s3:PutObject",
+        "s3:GetObject",
+        "s3:AbortMultipartUpload",
+        "s3:ListMultipartUploadParts"
+      ]
+      resources = [
+        "${aws_s3_bucket.wyatt-datalake-35315550.arn}/forecast-exports/*"
+      ]
+    }
+    kms = {
+      effect = "Allow"
+      actions = [
+        "kms:Decrypt",
+        "kms:GenerateDataKey"
+      ]
+      resources = [
+        aws_kms_key.s3_key.arn
+      ]
+    }
+    ssm_parameters = {
+      effect = "Allow"
+      actions = [
+        "ssm:GetParameter",
+        "ssm:GetParameters"
+      ]
+      resources = [
+        "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/forecast-sync/*"
+      ]
+    }
+    kms_decrypt_ssm = {
+      effect = "Allow"
+      actions = [
+        "kms:Decrypt"
+      ]
+      resources = [
+        "arn:aws:kms:${var.aws_region}:${data.aws_caller_identity.current.account_id}:key/*"
+      ]
+      condition = {
+        test     = "StringEquals"
+        variable = "kms:ViaService"
+        values   = ["ssm.${var.aws_region}.amazonaws.com"]
+      }
+    }
+  }
+
+  tags = {
+    Component = "Data Sync"
+    Function  = "Forecast Export"
+  }
+}
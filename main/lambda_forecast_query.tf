@@ -0,0 +1,70 @@
+# Lambda function for forecast read queries against Postgres
+# Shares the forecast sync deployment package (query.py is packaged alongside index.py)
+
+module "forecast_query_lambda" {
+  source = "./modules/lambda_function"
+
+  function_name = "forecast-query-${var.environment}"
+  description   = "Keyset-paginated forecast queries and aggregations with a per-container result cache"
+  handler       = "query.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 30
+  memory_size   = 512
+  zip_file      = local.forecast_sync_lambda_zip_path
+
+  create_log_group = false
+
+  environment_variables = {
+    SSM_NEON_API_KEY_PATH    = "/forecast-sync/${var.environment}/neon-api-key"
+    SSM_NEON_PROJECT_ID_PATH = "/forecast-sync/${var.environment}/neon-project-id"
+    DEFAULT_PAGE_SIZE        = "1000"
+    MAX_PAGE_SIZE            = "10000"
+    MAX_AGGREGATE_GROUPS     = "10000"
+    QUERY_CACHE_SIZE         = "256"
+    QUERY_CACHE_MAX_MB       = "64"
+    QUERY_CACHE_MAX_ENTRY_MB = "4"
+    DATA_VERSION_TTL_SECONDS = "30"
+    ENVIRONMENT              = var.environment
+  }
+
+  policy_statements = {
+    logs = {
+      effect = "Allow"
+      actions = [
+        "logs:CreateLogGroup",
+        "logs:CreateLogStream",
+        "logs:PutLogEvents"
+      ]
+      resources = ["arn:aws:logs:*:*:*"]
+    }
+    ssm_parameters = {
+      effect = "Allow"
+      actions = [
+        "ssm:GetParameter",
+        "ssm:GetParameters"
+      ]
+      resources = [
+        "arn:aws:ssm:${var.aws_region}:${data.aws_caller_identity.current.account_id}:parameter/forecast-sync/*"
+      ]
+    }
+    kms_decrypt_ssm = {
+      effect = "Allow"
+      actions = [
+        "kms:Decrypt"
+      ]
+      resources = [
+        "arn:aws:kms:${var.aws_region}:${data.aws_caller_identity.current.account_id}:key/*"
+      ]
+      condition = {
+        test     = "StringEquals"
+        variable = "kms:ViaService"
+        values   = ["ssm.${var.aws_region}.amazonaws.com"]
+      }
+    }
+  }
+
+  tags = {
+    Component = "Data Sync"
+    Function  = "Forecast Query"
+  }
+}
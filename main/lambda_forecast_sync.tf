@@ -27,6 +27,9 @@ module "forecast_sync_lambda" {
     SSM_NEON_PROJECT_ID_PATH = "/forecast-sync/${var.environment}/neon-project-id"
     BATCH_SIZE               = "10000"
     ENVIRONMENT              = var.environment
+    SNAPSHOT_BUCKET          = aws_s3_bucket.wyatt-datalake-35315550.id
+    SNAPSHOT_PREFIX          = "forecast-snapshots"
+    SNAPSHOT_KEEP_VERSIONS   = "3"
   }
 
   policy_statements = merge(
@@ -78,6 +81,17 @@ module "forecast_sync_lambda" {
           "${aws_s3_bucket.wyatt-datalake-35315550.arn}/athena-results/*"
         ]
       }
+      snapshot_pruning = {
+        effect = "Allow"
+        actions = [
+          "s3:ListBucket",
+          "s3:DeleteObject"
+        ]
+        resources = [
+          aws_s3_bucket.wyatt-datalake-35315550.arn,
+          "${aws_s3_bucket.wyatt-datalake-35315550.arn}/forecast-snapshots/*"
+        ]
+      }
       secretsmanager = {
         effect = "Allow"
         actions = [
@@ -90,7 +104,8 @@ module "forecast_sync_lambda" {
       kms = {
         effect = "Allow"
         actions = [
-          "kms:Decrypt"
+          "kms:Decrypt",
+          "kms:GenerateDataKey"
         ]
         resources = [
           aws_kms_key.s3_key.arn
@@ -207,6 +222,39 @@ resource "aws_cloudwatch_event_target" "forecast_sync" {
   arn       = module.forecast_sync_lambda.function_arn
 }
 
+# Scheduled adjustment engine run. The engine is incremental, so runs with no adjustment
+# or base forecast changes since the last one only compare the adjustment snapshot.
+resource "aws_cloudwatch_event_rule" "forecast_adjustments" {
+  name                = "forecast-adjustments-rule-${var.environment}"
+  description         = "Recompute adjusted forecasts after adjustment changes"
+  schedule_expression = "rate(5 minutes)"
+  state               = "ENABLED"
+
+  tags = {
+    Component = "Data Sync"
+    Function  = "Forecast Adjustments Trigger"
+  }
+}
+
+resource "aws_cloudwatch_event_target" "forecast_adjustments" {
+  rule      = aws_cloudwatch_event_rule.forecast_adjustments.name
+  target_id = "forecast-adjustments-lambda"
+  arn       = module.forecast_sync_lambda.function_arn
+
+  # lambda_handler routes this source to the adjustment engine only
+  input = jsonencode({
+    source = "forecast.adjustments"
+  })
+}
+
+resource "aws_lambda_permission" "eventbridge_adjustments_invoke" {
+  statement_id  = "AllowEventBridgeAdjustmentsInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = module.forecast_sync_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.forecast_adjustments.arn
+}
+
 # CloudWatch Alarm for Lambda errors
 resource "aws_cloudwatch_metric_alarm" "forecast_sync_errors" {
   alarm_name          = "forecast-sync-errors-${var.environment}"
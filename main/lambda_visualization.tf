@@ -21,7 +21,8 @@ module "get_visualization_lambda" {
   zip_file      = local.lambda_viz_zip_path
 
   environment_variables = {
-    PARAMETER_TABLE = module.parameter_table.table_id
+    PARAMETER_TABLE   = module.parameter_table.table_id
+    CACHE_TTL_SECONDS = "2"
   }
 
   policy_statements = {
@@ -58,22 +59,69 @@ module "update_visualization_lambda" {
   zip_file      = local.lambda_viz_zip_path
 
   environment_variables = {
-    PARAMETER_TABLE        = module.parameter_table.table_id
-    HISTORY_TABLE          = module.history_table.table_id
+    PARAMETER_TABLE    = module.parameter_table.table_id
+    HISTORY_TABLE      = module.history_table.table_id
+    COALESCE_WINDOW_MS = "100"
+  }
+
+  policy_statements = {
+    dynamodb = {
+      effect  = "Allow"
+      actions = ["dynamodb:Query", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:ConditionCheckItem"]
+      resources = [
+        module.parameter_table.table_arn,
+        module.history_table.table_arn
+      ]
+    },
+    logs = {
+      effect    = "Allow"
+      actions   = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents"]
+      resources = ["arn:aws:logs:*:*:*"]
+    }
+  }
+
+  tags = {
+    Component   = "LTO Demand Planning"
+    Function    = "Update Visualization Data"
+    Environment = var.environment
+  }
+}
+
+# Parameter broadcast Lambda
+# Consumes the parameter table stream and fans updates out to subscribed WebSocket
+# connections, so the update API returns without waiting on connected clients
+module "broadcast_visualization_lambda" {
+  source = "./modules/lambda_function"
+
+  function_name = "${local.function_prefix}-broadcast-${local.env_suffix}"
+  description   = "Lambda function to broadcast parameter updates over WebSocket"
+  handler       = "visualization/broadcastParamsUpdate.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 30
+  zip_file      = local.lambda_viz_zip_path
+
+  environment_variables = {
     CONNECTION_TABLE       = module.connection_table.table_id
+    SUBSCRIPTION_TABLE     = module.subscription_table.table_id
     WEBSOCKET_API_ENDPOINT = aws_apigatewayv2_stage.websocket.invoke_url
+    BROADCAST_CONCURRENCY  = "32"
   }
 
   policy_statements = {
     dynamodb = {
       effect  = "Allow"
-      actions = ["dynamodb:Query", "dynamodb:Scan", "dynamodb:GetItem", "dynamodb:PutItem"]
+      actions = ["dynamodb:Query", "dynamodb:DeleteItem", "dynamodb:BatchWriteItem"]
       resources = [
-        module.parameter_table.table_arn,
-        module.history_table.table_arn,
-        module.connection_table.table_arn
+        module.connection_table.table_arn,
+        module.subscription_table.table_arn,
+        "${module.subscription_table.table_arn}/index/*"
       ]
     },
+    stream = {
+      effect    = "Allow"
+      actions   = ["dynamodb:GetRecords", "dynamodb:GetShardIterator", "dynamodb:DescribeStream", "dynamodb:ListStreams"]
+      resources = [module.parameter_table.table_stream_arn]
+    },
     websocket = {
       effect    = "Allow"
       actions   = ["execute-api:ManageConnections"]
@@ -88,11 +136,30 @@ module "update_visualization_lambda" {
 
   tags = {
     Component   = "LTO Demand Planning"
-    Function    = "Update Visualization Data"
+    Function    = "Broadcast Visualization Updates"
     Environment = var.environment
   }
 }
 
+resource "aws_lambda_event_source_mapping" "parameter_stream" {
+  event_source_arn        = module.parameter_table.table_stream_arn
+  function_name           = module.broadcast_visualization_lambda.function_name
+  starting_position       = "LATEST"
+  batch_size              = 100
+  maximum_retry_attempts  = 2
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # Only new or changed parameter items need broadcasting, not version counter items (timestamp 0)
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT", "MODIFY"]
+        dynamodb  = { Keys = { timestamp = { N = [{ "anything-but" = ["0"] }] } } }
+      })
+    }
+  }
+}
+
 # WebSocket Connect Lambda
 module "ws_connect_lambda" {
   source = "./modules/lambda_function"
@@ -105,15 +172,17 @@ module "ws_connect_lambda" {
   zip_file      = local.lambda_viz_zip_path
 
   environment_variables = {
-    CONNECTION_TABLE = module.connection_table.table_id
+    CONNECTION_TABLE   = module.connection_table.table_id
+    SUBSCRIPTION_TABLE = module.subscription_table.table_id
   }
 
   policy_statements = {
     dynamodb = {
       effect  = "Allow"
-      actions = ["dynamodb:PutItem"]
+      actions = ["dynamodb:PutItem", "dynamodb:BatchWriteItem"]
       resources = [
-        module.connection_table.table_arn
+        module.connection_table.table_arn,
+        module.subscription_table.table_arn
       ]
     },
     logs = {
@@ -142,15 +211,17 @@ module "ws_disconnect_lambda" {
   zip_file      = local.lambda_viz_zip_path
 
   environment_variables = {
-    CONNECTION_TABLE = module.connection_table.table_id
+    CONNECTION_TABLE   = module.connection_table.table_id
+    SUBSCRIPTION_TABLE = module.subscription_table.table_id
   }
 
   policy_statements = {
     dynamodb = {
       effect  = "Allow"
-      actions = ["dynamodb:DeleteItem"]
+      actions = ["dynamodb:DeleteItem", "dynamodb:Query", "dynamodb:BatchWriteItem"]
       resources = [
-        module.connection_table.table_arn
+        module.connection_table.table_arn,
+        module.subscription_table.table_arn
       ]
     },
     logs = {
@@ -166,3 +237,42 @@ module "ws_disconnect_lambda" {
     Environment = var.environment
   }
 }
+
+# WebSocket Subscribe Lambda
+module "ws_subscribe_lambda" {
+  source = "./modules/lambda_function"
+
+  function_name = "${local.function_prefix}-ws-subscribe-${local.env_suffix}"
+  description   = "Lambda function to handle WebSocket parameter subscriptions"
+  handler       = "visualization/wsSubscribe.lambda_handler"
+  runtime       = "python3.12"
+  timeout       = 10
+  zip_file      = local.lambda_viz_zip_path
+
+  environment_variables = {
+    CONNECTION_TABLE   = module.connection_table.table_id
+    SUBSCRIPTION_TABLE = module.subscription_table.table_id
+  }
+
+  policy_statements = {
+    dynamodb = {
+      effect  = "Allow"
+      actions = ["dynamodb:GetItem", "dynamodb:BatchWriteItem"]
+      resources = [
+        module.connection_table.table_arn,
+        module.subscription_table.table_arn
+      ]
+    },
+    logs = {
+      effect    = "Allow"
+      actions   = ["logs:CreateLogGroup", "logs:CreateLogStream", "logs:PutLogEvents"]
+      resources = ["arn:aws:logs:*:*:*"]
+    }
+  }
+
+  tags = {
+    Component   = "LTO Demand Planning"
+    Function    = "WebSocket Subscribe"
+    Environment = var.environment
+  }
+}
@@ -22,6 +22,10 @@ module "dynamodb_table" {
   ttl_enabled        = var.ttl_enabled
   ttl_attribute_name = var.ttl_attribute
 
+  # Stream configuration
+  stream_enabled   = var.stream_enabled
+  stream_view_type = var.stream_enabled ? var.stream_view_type : null
+
   # Global secondary indexes
   global_secondary_indexes = var.global_secondary_indexes
 
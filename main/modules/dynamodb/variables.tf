@@ -116,3 +116,15 @@ variable "ttl_attribute" {
   type        = string
   default     = null
 }
+
+variable "stream_enabled" {
+  description = "Whether to enable DynamoDB Streams for the table"
+  type        = bool
+  default     = false
+}
+
+variable "stream_view_type" {
+  description = "What is written to the stream when an item changes (KEYS_ONLY, NEW_IMAGE, OLD_IMAGE, NEW_AND_OLD_IMAGES)"
+  type        = string
+  default     = null
+}
@@ -38,6 +38,19 @@ resource "aws_apigatewayv2_route" "disconnect" {
   target    = "integrations/${aws_apigatewayv2_integration.disconnect.id}"
 }
 
+# Subscribe/unsubscribe routes ({"action": "subscribe", "paramIds": [...]})
+resource "aws_apigatewayv2_route" "subscribe" {
+  api_id    = aws_apigatewayv2_api.websocket.id
+  route_key = "subscribe"
+  target    = "integrations/${aws_apigatewayv2_integration.subscribe.id}"
+}
+
+resource "aws_apigatewayv2_route" "unsubscribe" {
+  api_id    = aws_apigatewayv2_api.websocket.id
+  route_key = "unsubscribe"
+  target    = "integrations/${aws_apigatewayv2_integration.subscribe.id}"
+}
+
 # Connect integration
 resource "aws_apigatewayv2_integration" "connect" {
   api_id             = aws_apigatewayv2_api.websocket.id
@@ -54,6 +67,14 @@ resource "aws_apigatewayv2_integration" "disconnect" {
   integration_method = "POST"
 }
 
+# Subscribe integration
+resource "aws_apigatewayv2_integration" "subscribe" {
+  api_id             = aws_apigatewayv2_api.websocket.id
+  integration_type   = "AWS_PROXY"
+  integration_uri    = module.ws_subscribe_lambda.function_invoke_arn
+  integration_method = "POST"
+}
+
 # Lambda permissions for WebSocket API
 resource "aws_lambda_permission" "websocket_connect" {
   statement_id  = "AllowExecutionFromWebSocketAPI"
@@ -70,3 +91,11 @@ resource "aws_lambda_permission" "websocket_disconnect" {
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${aws_apigatewayv2_api.websocket.execution_arn}/*/*"
 }
+
+resource "aws_lambda_permission" "websocket_subscribe" {
+  statement_id  = "AllowExecutionFromWebSocketAPI"
+  action        = "lambda:InvokeFunction"
+  function_name = module.ws_subscribe_lambda.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_apigatewayv2_api.websocket.execution_arn}/*/*"
+}
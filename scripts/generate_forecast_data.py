@@ -9,14 +9,34 @@ Requirements:
 - 30 unique DMA IDs (3-letter codes)
 - 60 unique DC IDs (1-60)
 - 5 unique states (US state abbreviations)
+
+The restaurant x item x date grid is computed with NumPy broadcasting rather than a Python
+loop per row, so generation time is dominated by array arithmetic and output I/O.
+
+Restaurants are generated in fixed-size shards so memory stays bounded at any scale. Every shard
+draws from its own RNG stream spawned from the root seed (np.random.SeedSequence), so shards can
+be simulated on a process pool and the output is bit-identical for any --workers value. Two
+output formats are supported:
+- csv: a single CSV file (the original seed format)
+- parquet: Hive-partitioned Parquet (business_date=YYYY-MM-DD/part-NNNNN-NNN.parquet), the
+  layout the Athena `forecast` table and the forecast_sync Lambda read. The output may be a
+  local directory or an s3:// URI (e.g. s3://<datalake-bucket>/forecast).
+
+Usage:
+    python scripts/generate_forecast_data.py --format parquet --output ./data/forecast --n-restaurants 275000 --workers 8
 """
 
+import os
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
-# Set seed for reproducibility
-np.random.seed(42)
+# Seed for reproducibility
+SEED = 42
 
 # Configuration from requirements
 N_RESTAURANTS = 2750
@@ -25,110 +45,373 @@ N_SIMULATIONS = 1000
 START_DATE = datetime(2025, 1, 1)
 END_DATE = datetime(2025, 4, 1)
 
-# Generate date range (daily for 10 weeks)
-date_range = pd.date_range(start=START_DATE, end=END_DATE, freq="D")
-n_days = len(date_range)
+# Output defaults
+DEFAULT_CSV_PATH = "/workspaces/wyatt-personal-aws/data/forecast_data.csv"
+DEFAULT_PARQUET_PATH = "/workspaces/wyatt-personal-aws/data/forecast"
+DEFAULT_CHUNK_ROWS = 2_000_000  # rows generated per restaurant shard (bounds memory)
+DEFAULT_ROW_GROUP_SIZE = 1_000_000  # max rows per Parquet row group
+DEFAULT_TARGET_FILE_MB = 128  # roll to a new file in a partition beyond this size
+DEFAULT_MAX_BUFFER_MB = 2048  # rows buffered across partitions before flushing short row groups
+DEFAULT_MAX_OPEN_FILES = 16  # Parquet files open at once across partitions
 
-print(f"Generating data for {n_days} days from {START_DATE.date()} to {END_DATE.date()}")
+# 5 US states
+STATES = np.array(["CA", "TX", "FL", "NY", "IL"])
 
-# Generate restaurant IDs (5 digits, zero-padded between 00000 and 30000)
-restaurant_ids = np.random.choice(range(30001), size=N_RESTAURANTS, replace=False)
-restaurant_ids = [f"{rid:05d}" for rid in sorted(restaurant_ids)]
+# Day of week effects (Fourier-based, Tuesday lowest, Saturday highest)
+# 0=Monday, 1=Tuesday, ..., 5=Saturday, 6=Sunday
+DOW_EFFECTS = np.array([-0.1, -0.2, -0.05, 0.05, 0.15, 0.3, 0.1])  # Monday  # Tuesday (lowest)  # Wednesday  # Thursday  # Friday  # Saturday (highest)  # Sunday
 
-# Generate inventory item IDs (5 unique from range 1-2000)
-inventory_item_ids = sorted(np.random.choice(range(1, 2001), size=N_INVENTORY_ITEMS, replace=False))
+# Quantile spread: coefficient of variation 0.2 at the 5th/95th percentile z-score
+Z_95 = 1.645
+CV = 0.2
 
-# Generate DMA IDs (30 unique 3-letter codes)
-dma_ids = []
-for i in range(30):
-    letters = "".join(np.random.choice(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"), size=3))
-    dma_ids.append(letters)
-dma_ids = sorted(list(set(dma_ids)))[:30]
+# SeedSequence spawn keys: model parameters draw from one child stream, shard i from (SHARD_STREAM, i)
+PARAMS_STREAM = 0
+SHARD_STREAM = 1
 
-# Generate DC IDs (60 unique from 1-60)
-dc_ids = list(range(1, 61))
+# Per-restaurant parameter arrays (sliced when generating a chunk)
+RESTAURANT_KEYS = ["restaurant_ids", "restaurant_dma", "restaurant_dc", "restaurant_state", "restaurant_effects"]
 
-# 5 US states
-states = ["CA", "TX", "FL", "NY", "IL"]
 
-# Assign each restaurant to a specific DMA, DC, and state (they don't change)
-restaurant_assignments = {}
-for rid in restaurant_ids:
-    restaurant_assignments[rid] = {"dma_id": np.random.choice(dma_ids), "dc_id": np.random.choice(dc_ids), "state": np.random.choice(states)}
+def generate_model_params(rng, n_restaurants=N_RESTAURANTS, n_inventory_items=N_INVENTORY_ITEMS):
+    """
+    Draw restaurant/item dimensions and model parameters.
 
-# Generate model parameters
-# Restaurant random effects (normal distribution)
-restaurant_effects = {rid: np.random.normal(0, 1) for rid in restaurant_ids}
+    Returns a dict of aligned NumPy arrays: one entry per restaurant for IDs, assignments and
+    effects, and one entry per inventory item for item effects and decay rates.
+    """
+    # Generate restaurant IDs (5 digits, zero-padded between 00000 and 30000)
+    restaurant_ids = np.sort(rng.choice(30001, size=n_restaurants, replace=False))
 
-# Inventory item constant effects (gamma distribution with mean 20)
-# Using shape=4, scale=5 to get mean=20
-inventory_effects = {iid: np.random.gamma(4, 5) for iid in inventory_item_ids}
+    # Generate inventory item IDs (unique from range 1-2000)
+    inventory_item_ids = np.sort(rng.choice(np.arange(1, 2001), size=n_inventory_items, replace=False))
 
-# Day of week effects (Fourier-based, Tuesday lowest, Saturday highest)
-# 0=Monday, 1=Tuesday, ..., 5=Saturday, 6=Sunday
-dow_effects = {0: -0.1, 1: -0.2, 2: -0.05, 3: 0.05, 4: 0.15, 5: 0.3, 6: 0.1}  # Monday  # Tuesday (lowest)  # Wednesday  # Thursday  # Friday  # Saturday (highest)  # Sunday
+    # Generate DMA IDs (30 unique 3-letter codes)
+    letters = rng.choice(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"), size=(30, 3))
+    dma_ids = np.unique(["".join(code) for code in letters])[:30]
+
+    # Generate DC IDs (60 unique from 1-60)
+    dc_ids = np.arange(1, 61)
+
+    # Assign each restaurant to a specific DMA, DC, and state (they don't change)
+    restaurant_dma = rng.choice(dma_ids, size=n_restaurants)
+    restaurant_dc = rng.choice(dc_ids, size=n_restaurants)
+    restaurant_state = rng.choice(STATES, size=n_restaurants)
+
+    # Restaurant random effects (normal distribution)
+    restaurant_effects = rng.normal(0, 1, size=n_restaurants)
+
+    # Inventory item constant effects (gamma distribution with mean 20)
+    # Using shape=4, scale=5 to get mean=20
+    inventory_effects = rng.gamma(4, 5, size=n_inventory_items)
+
+    # Exponential decay effects for each inventory item (gamma with mean 0.95)
+    # Using shape=95, scale=0.01 to get mean≈0.95
+    decay_rates = rng.gamma(95, 0.01, size=n_inventory_items)
+
+    return {"restaurant_ids": restaurant_ids, "inventory_item_ids": inventory_item_ids, "restaurant_dma": restaurant_dma, "restaurant_dc": restaurant_dc, "restaurant_state": restaurant_state, "restaurant_effects": restaurant_effects, "inventory_effects": inventory_effects, "decay_rates": decay_rates}
+
+
+def params_rng(seed):
+    """RNG for the model parameters, independent of the shard streams"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(PARAMS_STREAM,)))
+
+
+def shard_rng(seed, shard_index):
+    """RNG for one restaurant shard; depends only on the root seed and the shard index"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(SHARD_STREAM, shard_index)))
+
+
+def slice_params(params, start, stop):
+    """Restrict the per-restaurant parameters to restaurants[start:stop]"""
+    return {key: (value[start:stop] if key in RESTAURANT_KEYS else value) for key, value in params.items()}
+
+
+def simulate_quantiles(params, date_range, rng):
+    """
+    Compute quantile forecasts for every restaurant x item x date with broadcasting.
+
+    Returns y_05/y_50/y_95 arrays of shape (restaurant, item, day).
+    """
+    n_restaurants = len(params["restaurant_ids"])
+    n_items = len(params["inventory_item_ids"])
+    n_days = len(date_range)
+
+    # (restaurant, item, day) grid built from per-axis vectors
+    base = params["inventory_effects"][None, :, None] + params["restaurant_effects"][:, None, None]
+    dow = 1 + DOW_EFFECTS[date_range.dayofweek.to_numpy()][None, None, :]
+    decay = params["decay_rates"][:, None] ** np.arange(n_days)[None, :]
+    noise = 1 + rng.normal(0, 0.1, size=(n_restaurants, n_items, n_days))
+
+    # Ensure positive values; y_50 is the base value
+    y_50 = np.maximum(0.1, base * dow * decay[None, :, :] * noise)
+
+    # y_05 and y_95 are based on uncertainty
+    std_dev = y_50 * CV
+    y_05 = np.maximum(0.1, y_50 - Z_95 * std_dev)
+    y_95 = y_50 + Z_95 * std_dev
+
+    return {"y_05": y_05.round(2), "y_50": y_50.round(2), "y_95": y_95.round(2)}
+
+
+def quantiles_to_frame(params, date_range, quantiles):
+    """Flatten a simulated block into rows ordered restaurant, then item, then date"""
+    n_restaurants = len(params["restaurant_ids"])
+    n_items = len(params["inventory_item_ids"])
+    n_days = len(date_range)
+
+    # Expand per-axis columns to the flattened grid
+    per_restaurant = n_items * n_days
+    return pd.DataFrame(
+        {
+            "restaurant_id": np.repeat(params["restaurant_ids"], per_restaurant),
+            "inventory_item_id": np.tile(np.repeat(params["inventory_item_ids"], n_days), n_restaurants),
+            "business_date": np.tile(date_range.strftime("%Y-%m-%d").to_numpy(), n_restaurants * n_items),
+            "dma_id": np.repeat(params["restaurant_dma"], per_restaurant),
+            "dc_id": np.repeat(params["restaurant_dc"], per_restaurant),
+            "state": np.repeat(params["restaurant_state"], per_restaurant),
+            "y_05": quantiles["y_05"].ravel(),
+            "y_50": quantiles["y_50"].ravel(),
+            "y_95": quantiles["y_95"].ravel(),
+        }
+    )
+
+
+def plan_shards(n_restaurants, rows_per_restaurant, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Split restaurants into (start, stop) shards; depends only on sizes, never on worker count"""
+    shard_restaurants = max(1, chunk_rows // rows_per_restaurant)
+    return [(start, min(start + shard_restaurants, n_restaurants)) for start in range(0, n_restaurants, shard_restaurants)]
+
+
+def simulate_shard(shard_params, date_range, seed, shard_index):
+    """Process-pool task: simulate one shard with its own spawned RNG stream"""
+    return simulate_quantiles(shard_params, date_range, shard_rng(seed, shard_index))
+
+
+def iter_chunks(params, date_range, seed, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """
+    Yield (shard_index, shard_params, quantiles) for consecutive restaurant shards, in order.
+
+    With workers > 1 shards are simulated on a process pool; at most two shards per worker
+    are in flight so memory stays bounded while the caller writes results in shard order.
+    """
+    shards = plan_shards(len(params["restaurant_ids"]), len(params["inventory_item_ids"]) * len(date_range), chunk_rows)
+
+    if workers <= 1:
+        for shard_index, (start, stop) in enumerate(shards):
+            shard_params = slice_params(params, start, stop)
+            yield shard_index, shard_params, simulate_shard(shard_params, date_range, seed, shard_index)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for shard_index, (start, stop) in enumerate(shards):
+            shard_params = slice_params(params, start, stop)
+            pending.append((shard_index, shard_params, executor.submit(simulate_shard, shard_params, date_range, seed, shard_index)))
+            if len(pending) >= 2 * workers:
+                done_index, done_params, future = pending.popleft()
+                yield done_index, done_params, future.result()
+        while pending:
+            done_index, done_params, future = pending.popleft()
+            yield done_index, done_params, future.result()
+
+
+class PartitionedParquetWriter:
+    """
+    Writes Hive-partitioned Parquet files under business_date=YYYY-MM-DD partitions.
+
+    Each restaurant chunk only holds a slice of every partition, so rows are buffered per
+    partition and written once a full row group (row_group_size rows) is available; the
+    remainder is written when the writer closes. If the buffers outgrow max_buffer_bytes the
+    largest partition is flushed early, which is the only case a row group comes out short.
+    At most max_open_files part files are open at once (least recently written is finished
+    first), and a partition rolls over to a new part file once the current one passes the
+    target size.
+    """
+
+    def __init__(self, output, date_range, row_group_size=DEFAULT_ROW_GROUP_SIZE, target_file_bytes=DEFAULT_TARGET_FILE_MB * 1024 * 1024, file_prefix="part-00000", max_buffer_bytes=DEFAULT_MAX_BUFFER_MB * 1024 * 1024, max_open_files=DEFAULT_MAX_OPEN_FILES):
+        import pyarrow as pa
+        import pyarrow.fs as pafs
+
+        self.pa = pa
+        self.filesystem, self.root = pafs.FileSystem.from_uri(output if "://" in output else os.path.abspath(output))
+        self.dates = date_range.strftime("%Y-%m-%d").tolist()
+        self.row_group_size = row_group_size
+        self.target_file_bytes = target_file_bytes
+        self.file_prefix = file_prefix
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_open_files = max(1, max_open_files)
+        self.schema = pa.schema([("restaurant_id", pa.int32()), ("inventory_item_id", pa.int32()), ("dma_id", pa.string()), ("dc_id", pa.int32()), ("state", pa.string()), ("y_05", pa.float64()), ("y_50", pa.float64()), ("y_95", pa.float64())])
+        self.buffers = {}  # business_date -> list of tables not yet written
+        self.buffered_rows = {}
+        self.partition_bytes = {}
+        self.buffered_bytes = 0
+        self.open_files = OrderedDict()  # least recently written first
+        self.file_counts = {}
+        self.written_files = []
+
+    def _writer(self, business_date):
+        """Current (stream, writer) for a partition, rolling over past the target size"""
+        import pyarrow.parquet as pq
+
+        current = self.open_files.get(business_date)
+        if current and current[0].tell() < self.target_file_bytes:
+            self.open_files.move_to_end(business_date)
+            return current[1]
+        if current:
+            self._close(business_date)
+        while len(self.open_files) >= self.max_open_files:
+            self._close(next(iter(self.open_files)))
+
+        partition_dir = f"{self.root}/business_date={business_date}"
+        self.filesystem.create_dir(partition_dir, recursive=True)
+        file_number = self.file_counts.get(business_date, 0)
+        self.file_counts[business_date] = file_number + 1
+        path = f"{partition_dir}/{self.file_prefix}-{file_number:03d}.parquet"
+
+        stream = self.filesystem.open_output_stream(path)
+        writer = pq.ParquetWriter(stream, self.schema, compression="snappy")
+        self.open_files[business_date] = (stream, writer, path)
+        return writer
+
+    def _close(self, business_date):
+        stream, writer, path = self.open_files.pop(business_date)
+        writer.close()
+        stream.close()
+        self.written_files.append(path)
+
+    def _flush(self, business_date, full_groups_only=True):
+        """Write a partition's buffered rows; with full_groups_only, keep the partial last group buffered"""
+        n_rows = self.buffered_rows.get(business_date, 0)
+        n_write = n_rows - n_rows % self.row_group_size if full_groups_only else n_rows
+        if n_write == 0:
+            return
+
+        table = self.pa.concat_tables(self.buffers.pop(business_date))
+        self.buffered_bytes -= self.partition_bytes.pop(business_date)
+        for offset in range(0, n_write, self.row_group_size):
+            self._writer(business_date).write_table(table.slice(offset, min(self.row_group_size, n_write - offset)), row_group_size=self.row_group_size)
+
+        remainder = table.slice(n_write)
+        if remainder.num_rows:
+            remainder = remainder.combine_chunks()
+            self.buffers[business_date] = [remainder]
+            self.partition_bytes[business_date] = remainder.nbytes
+            self.buffered_bytes += remainder.nbytes
+        self.buffered_rows[business_date] = remainder.num_rows
+
+    def write_chunk(self, params, quantiles):
+        """Buffer one restaurant chunk into every date partition, writing any full row groups"""
+        pa = self.pa
+        n_items = len(params["inventory_item_ids"])
+        restaurant_columns = {
+            "restaurant_id": pa.array(np.repeat(params["restaurant_ids"], n_items), type=pa.int32()),
+            "inventory_item_id": pa.array(np.tile(params["inventory_item_ids"], len(params["restaurant_ids"])), type=pa.int32()),
+            "dma_id": pa.array(np.repeat(params["restaurant_dma"], n_items)),
+            "dc_id": pa.array(np.repeat(params["restaurant_dc"], n_items), type=pa.int32()),
+            "state": pa.array(np.repeat(params["restaurant_state"], n_items)),
+        }
+
+        for day_idx, business_date in enumerate(self.dates):
+            columns = dict(restaurant_columns)
+            for name in ["y_05", "y_50", "y_95"]:
+                columns[name] = pa.array(quantiles[name][:, :, day_idx].ravel())
+            table = pa.Table.from_pydict(columns, schema=self.schema)
+            self.buffers.setdefault(business_date, []).append(table)
+            self.buffered_rows[business_date] = self.buffered_rows.get(business_date, 0) + table.num_rows
+            self.partition_bytes[business_date] = self.partition_bytes.get(business_date, 0) + table.nbytes
+            self.buffered_bytes += table.nbytes
+            if self.buffered_rows[business_date] >= self.row_group_size:
+                self._flush(business_date)
+
+        # Keep memory bounded: flush the largest partitions early, accepting a short row group
+        while self.buffered_bytes > self.max_buffer_bytes and self.buffers:
+            self._flush(max(self.buffers, key=self.buffered_rows.get), full_groups_only=False)
+
+    def close(self):
+        """Write the remaining rows one partition at a time and finish every file"""
+        for business_date in self.dates:
+            self._flush(business_date, full_groups_only=False)
+            if business_date in self.open_files:
+                self._close(business_date)
+        for business_date in list(self.open_files):
+            self._close(business_date)
+        return self.written_files
 
-# Exponential decay effects for each inventory item (gamma with mean 0.95)
-# Using shape=95, scale=0.01 to get mean≈0.95
-decay_rates = {iid: np.random.gamma(95, 0.01) for iid in inventory_item_ids}
 
-print("Generating forecast data...")
+def generate_forecast_frame(params, date_range, seed=SEED, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """Generate one in-memory DataFrame for all restaurants (small configurations only)"""
+    return pd.concat([quantiles_to_frame(chunk_params, date_range, quantiles) for _, chunk_params, quantiles in iter_chunks(params, date_range, seed, chunk_rows, workers)], ignore_index=True)
 
-# Create the base dataframe
-rows = []
-for rid in restaurant_ids:
-    for iid in inventory_item_ids:
-        for day_idx, date in enumerate(date_range):
-            # Get restaurant assignment
-            assignment = restaurant_assignments[rid]
 
-            # Base value from inventory effect
-            base_value = inventory_effects[iid]
+def write_csv(params, date_range, seed, output_path, chunk_rows=DEFAULT_CHUNK_ROWS, workers=1):
+    """Stream restaurant shards into a single CSV file; returns rows written"""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    total_rows = 0
+    for chunk_index, chunk_params, quantiles in iter_chunks(params, date_range, seed, chunk_rows, workers):
+        df = quantiles_to_frame(chunk_params, date_range, quantiles)
+        df.to_csv(output_path, index=False, mode="w" if chunk_index == 0 else "a", header=chunk_index == 0)
+        total_rows += len(df)
+    return total_rows
 
-            # Add restaurant effect
-            base_value += restaurant_effects[rid]
 
-            # Add day of week effect
-            dow = date.weekday()
-            base_value *= 1 + dow_effects[dow]
+def write_parquet(params, date_range, seed, output, chunk_rows=DEFAULT_CHUNK_ROWS, row_group_size=DEFAULT_ROW_GROUP_SIZE, target_file_mb=DEFAULT_TARGET_FILE_MB, workers=1, max_buffer_mb=DEFAULT_MAX_BUFFER_MB):
+    """Stream restaurant shards into Hive-partitioned Parquet; returns (rows written, files)"""
+    writer = PartitionedParquetWriter(output, date_range, row_group_size=row_group_size, target_file_bytes=target_file_mb * 1024 * 1024, max_buffer_bytes=max_buffer_mb * 1024 * 1024)
+    total_rows = 0
+    try:
+        for _, chunk_params, quantiles in iter_chunks(params, date_range, seed, chunk_rows, workers):
+            writer.write_chunk(chunk_params, quantiles)
+            total_rows += quantiles["y_50"].size
+    finally:
+        files = writer.close()
+    return total_rows, files
 
-            # Apply exponential decay
-            decay = decay_rates[iid] ** day_idx
-            base_value *= decay
 
-            # Add white noise
-            noise = np.random.normal(0, 0.1)
-            base_value *= 1 + noise
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate simulated restaurant forecast data")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format (default: csv)")
+    parser.add_argument("--output", help=f"Output CSV file or Parquet directory/s3:// URI (default: {DEFAULT_CSV_PATH} or {DEFAULT_PARQUET_PATH})")
+    parser.add_argument("--n-restaurants", type=int, default=N_RESTAURANTS)
+    parser.add_argument("--n-items", type=int, default=N_INVENTORY_ITEMS)
+    parser.add_argument("--start-date", type=datetime.fromisoformat, default=START_DATE)
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=END_DATE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows generated per restaurant shard; bounds peak memory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes simulating shards in parallel (output is identical for any value)")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE, help="Max rows per Parquet row group")
+    parser.add_argument("--target-file-mb", type=int, default=DEFAULT_TARGET_FILE_MB, help="Roll to a new Parquet file in a partition beyond this size")
+    parser.add_argument("--max-buffer-mb", type=int, default=DEFAULT_MAX_BUFFER_MB, help="Memory for rows buffered until a partition fills a row group; beyond it row groups may be smaller than --row-group-size")
+    return parser.parse_args(argv)
 
-            # Ensure positive values
-            base_value = max(0.1, base_value)
 
-            # Generate quantiles
-            # y_50 is the base value
-            y_50 = base_value
+def main(argv=None):
+    args = parse_args(argv)
 
-            # y_05 and y_95 are based on uncertainty
-            # Using a coefficient of variation of 0.2
-            std_dev = y_50 * 0.2
-            y_05 = max(0.1, y_50 - 1.645 * std_dev)  # 5th percentile
-            y_95 = y_50 + 1.645 * std_dev  # 95th percentile
+    # Generate date range (daily)
+    date_range = pd.date_range(start=args.start_date, end=args.end_date, freq="D")
+    print(f"Generating data for {len(date_range)} days from {args.start_date.date()} to {args.end_date.date()}")
 
-            rows.append({"restaurant_id": int(rid), "inventory_item_id": int(iid), "business_date": date.strftime("%Y-%m-%d"), "dma_id": assignment["dma_id"], "dc_id": int(assignment["dc_id"]), "state": assignment["state"], "y_05": round(y_05, 2), "y_50": round(y_50, 2), "y_95": round(y_95, 2)})
+    params = generate_model_params(params_rng(args.seed), args.n_restaurants, args.n_items)
 
-# Create DataFrame
-df = pd.DataFrame(rows)
+    print(f"Generating forecast data for {args.n_restaurants:,} restaurants and {args.n_items} items...")
+    if args.format == "csv":
+        output_path = args.output or DEFAULT_CSV_PATH
+        total_rows = write_csv(params, date_range, args.seed, output_path, args.chunk_rows, args.workers)
+        print("\nForecast data generated successfully!")
+        print(f"Total rows: {total_rows:,}")
+        print(f"File saved to: {output_path}")
 
-# Save to CSV
-output_path = "/workspaces/wyatt-personal-aws/data/forecast_data.csv"
-df.to_csv(output_path, index=False)
+        # Display sample data
+        print("\nSample data (first 10 rows):")
+        print(pd.read_csv(output_path, nrows=10))
+    else:
+        output_path = args.output or DEFAULT_PARQUET_PATH
+        total_rows, files = write_parquet(params, date_range, args.seed, output_path, args.chunk_rows, args.row_group_size, args.target_file_mb, args.workers, args.max_buffer_mb)
+        print("\nForecast data generated successfully!")
+        print(f"Total rows: {total_rows:,}")
+        print(f"Wrote {len(files)} Parquet files across {len(date_range)} business_date partitions under {output_path}")
 
-print("\nForecast data generated successfully!")
-print(f"Total rows: {len(df):,}")
-print(f"Date range: {df['business_date'].min()} to {df['business_date'].max()}")
-print(f"Unique restaurants: {df['restaurant_id'].nunique()}")
-print(f"Unique inventory items: {df['inventory_item_id'].nunique()}")
-print(f"File saved to: {output_path}")
 
-# Display sample data
-print("\nSample data (first 10 rows):")
-print(df.head(10))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the forecast data generator
+"""
+
+import glob
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from generate_forecast_data import PartitionedParquetWriter, generate_forecast_frame, generate_model_params, iter_chunks, params_rng, write_parquet
+
+DATE_RANGE = pd.date_range(start="2025-01-01", end="2025-01-07", freq="D")
+
+
+class TestShardDeterminism(unittest.TestCase):
+    """Test cases for per-shard RNG streams"""
+
+    def setUp(self):
+        self.params = generate_model_params(params_rng(7), 300, 4)
+
+    def test_output_independent_of_workers(self):
+        """Test the generated data is identical for any worker count"""
+        serial = generate_forecast_frame(self.params, DATE_RANGE, seed=7, chunk_rows=2_000, workers=1)
+        parallel = generate_forecast_frame(self.params, DATE_RANGE, seed=7, chunk_rows=2_000, workers=3)
+
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_seed_changes_output(self):
+        """Test different seeds produce different forecasts"""
+        first = generate_forecast_frame(self.params, DATE_RANGE, seed=7, chunk_rows=2_000)
+        second = generate_forecast_frame(self.params, DATE_RANGE, seed=8, chunk_rows=2_000)
+
+        self.assertFalse(np.allclose(first["y_50"], second["y_50"]))
+
+
+class TestPartitionedParquetWriter(unittest.TestCase):
+    """Test cases for Hive-partitioned Parquet output"""
+
+    def setUp(self):
+        self.params = generate_model_params(params_rng(7), 300, 4)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def row_groups(self, path):
+        metadata = pq.ParquetFile(path).metadata
+        return [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+
+    def test_row_groups_honor_row_group_size(self):
+        """Test rows are buffered across shards so row groups match --row-group-size"""
+        # 1,200 rows per date arrive in shards of 50 restaurants (200 rows per date)
+        total_rows, files = write_parquet(self.params, DATE_RANGE, 7, self.tempdir.name, chunk_rows=1_400, row_group_size=500)
+
+        self.assertEqual(total_rows, 300 * 4 * len(DATE_RANGE))
+        self.assertEqual(len(files), len(DATE_RANGE))
+        for path in files:
+            self.assertEqual(self.row_groups(path), [500, 500, 200])
+
+    def test_parquet_matches_generated_frame(self):
+        """Test the partitioned output holds exactly the generated rows"""
+        write_parquet(self.params, DATE_RANGE, 7, self.tempdir.name, chunk_rows=1_400, row_group_size=500, workers=2)
+
+        table = ds.dataset(self.tempdir.name, partitioning="hive").to_table().to_pandas()
+        expected = generate_forecast_frame(self.params, DATE_RANGE, seed=7, chunk_rows=1_400)
+        table["business_date"] = pd.to_datetime(table["business_date"].astype(str))
+        keys = ["business_date", "restaurant_id", "inventory_item_id"]
+        table = table.sort_values(keys).reset_index(drop=True)
+        expected = expected.sort_values(keys).reset_index(drop=True)
+
+        for column in ["restaurant_id", "inventory_item_id", "dc_id"]:
+            np.testing.assert_array_equal(table[column].to_numpy(), expected[column].to_numpy())
+        np.testing.assert_allclose(table["y_50"].to_numpy(), expected["y_50"].to_numpy())
+
+    def test_open_files_bounded(self):
+        """Test no more than max_open_files part files are open at once"""
+        writer = PartitionedParquetWriter(self.tempdir.name, DATE_RANGE, row_group_size=100, max_open_files=2)
+        peak_open = 0
+        try:
+            for _, chunk_params, quantiles in iter_chunks(self.params, DATE_RANGE, 7, 1_400, 1):
+                writer.write_chunk(chunk_params, quantiles)
+                peak_open = max(peak_open, len(writer.open_files))
+        finally:
+            files = writer.close()
+
+        self.assertLessEqual(peak_open, 2)
+        self.assertEqual(sum(pq.ParquetFile(path).metadata.num_rows for path in files), 300 * 4 * len(DATE_RANGE))
+
+    def test_buffer_budget_flushes_early(self):
+        """Test exceeding the buffer budget flushes partitions instead of growing memory"""
+        writer = PartitionedParquetWriter(self.tempdir.name, DATE_RANGE, row_group_size=1_000_000, max_buffer_bytes=1)
+        try:
+            for _, chunk_params, quantiles in iter_chunks(self.params, DATE_RANGE, 7, 1_400, 1):
+                writer.write_chunk(chunk_params, quantiles)
+                self.assertEqual(writer.buffered_bytes, 0)
+        finally:
+            files = writer.close()
+
+        self.assertEqual(len(glob.glob(f"{self.tempdir.name}/business_date=*/*.parquet")), len(files))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,272 @@
+"""
+Benchmark suite for the forecast simulation engines.
+
+Runs every available engine (local NumPy modes, and the Spark engines when PySpark and a
+JVM are present) on a grid of restaurants x items x days x simulation counts in local mode.
+Each case runs in a fresh process so peak memory is per case. Wall time, peak RSS and
+rows/sec are recorded, and every output is checked against the exact analytic quantiles
+within the engine's expected sampling tolerance.
+
+Results are written as JSON plus a Markdown summary table; --baseline compares throughput
+against a previous results file and exits non-zero on regressions.
+
+Usage:
+    python benchmark_forecast_simulation.py --grid quick --output-dir benchmark_results
+    python benchmark_forecast_simulation.py --grid full --baseline benchmark_results/previous.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import itertools
+import contextlib
+import multiprocessing
+from queue import Empty
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+import local_forecast_simulation
+from local_forecast_simulation import DEFAULT_CONFIG, DEFAULT_SKETCH_K, KEY_COLUMNS, QUANTILE_Z, adaptive_limits, analytic_quantile_batch, create_parameter_df, generate_base_data, monte_carlo_tolerance
+
+# Engine name -> config overrides
+LOCAL_ENGINES = {
+    "numpy_analytic": {"backend": "local", "mode": "analytic"},
+    "numpy_monte_carlo": {"backend": "local", "mode": "monte_carlo"},
+    "numpy_sketch": {"backend": "local", "mode": "monte_carlo", "sketch_k": DEFAULT_SKETCH_K},
+    "numpy_adaptive": {"backend": "local", "mode": "adaptive"},
+}
+SPARK_ENGINES = {
+    "spark_analytic": {"backend": "spark", "mode": "analytic"},
+    "spark_pandas_udf": {"backend": "spark", "mode": "monte_carlo", "engine": "pandas_udf"},
+    "spark_udf": {"backend": "spark", "mode": "monte_carlo", "engine": "udf"},
+}
+
+# Configuration grids: restaurants, items, days, simulations per combination
+GRIDS = {
+    "quick": {"n_restaurants": [10, 100], "n_inventory_items": [2, 10], "n_days": [90], "n_simulations": [1000]},
+    "full": {"n_restaurants": [10, 100, 1000], "n_inventory_items": [2, 10, 50], "n_days": [30, 90], "n_simulations": [100, 1000, 10000]},
+}
+
+# Skip Monte Carlo cases above this many simulated paths (rows x n_simulations)
+DEFAULT_MAX_PATHS = 2_000_000_000
+
+# Flag a case when its rows/sec falls more than this fraction below the baseline
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+
+# A case still running after this many seconds is terminated and recorded as failed
+DEFAULT_CASE_TIMEOUT_SECONDS = 3600
+
+# How often run_case checks whether the case process is still alive
+POLL_SECONDS = 1.0
+
+
+def spark_available():
+    """PySpark importable and a JVM on the path"""
+    try:
+        import pyspark  # noqa: F401
+    except ImportError:
+        return False
+    return bool(os.environ.get("JAVA_HOME") or shutil.which("java"))
+
+
+def expected_tolerance(engine, config):
+    """Max absolute difference from the analytic quantiles an engine should stay within"""
+    overrides = {**LOCAL_ENGINES, **SPARK_ENGINES}[engine]
+    if overrides["mode"] == "analytic":
+        return 1e-4
+    if overrides["mode"] == "adaptive":
+        return 3 * adaptive_limits(config["n_simulations"], config["adaptive_tolerance"], config["adaptive_max_simulations"])[0]
+    tolerance = monte_carlo_tolerance(config["n_simulations"])
+    if overrides.get("sketch_k"):
+        # Sketch rank error ~1/k, converted to value error at the 5th percentile density
+        tolerance += 4 / (overrides["sketch_k"] * 0.103)
+    return tolerance
+
+
+def analytic_reference(config):
+    """Exact quantiles for the config, keyed by combination"""
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        base_df, model_params = generate_base_data(config)
+        param_df = create_parameter_df(base_df, model_params)
+    return pd.concat([param_df[KEY_COLUMNS].reset_index(drop=True), analytic_quantile_batch(param_df["decayed_value"].to_numpy())], axis=1)
+
+
+def run_engine(engine, config):
+    """Run one engine and return (forecast pandas DataFrame, setup seconds, run seconds)"""
+    if engine in LOCAL_ENGINES:
+        start = time.perf_counter()
+        forecast_df, _ = local_forecast_simulation.generate_forecast_data(config)
+        return forecast_df, 0.0, time.perf_counter() - start
+
+    import spark_forecast_simulation
+
+    start = time.perf_counter()
+    spark = spark_forecast_simulation.create_spark_session("ForecastSimulationBenchmark")
+    setup_seconds = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        forecast_df, _ = spark_forecast_simulation.generate_forecast_data(spark, config)
+        forecast_pdf = forecast_df.toPandas()
+        return forecast_pdf, setup_seconds, time.perf_counter() - start
+    finally:
+        spark.stop()
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process plus its reaped children (Linux reports KiB)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return usage * 1024 / scale / 1024
+
+
+def benchmark_case(engine, config, queue):
+    """Subprocess entry point: run one case and report its measurements"""
+    try:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            forecast_df, setup_seconds, run_seconds = run_engine(engine, config)
+
+        # Compare against the analytic quantiles on the combination keys
+        reference_df = analytic_reference(config)
+        forecast_df = forecast_df.astype({column: str for column in KEY_COLUMNS})
+        merged = forecast_df.merge(reference_df, on=KEY_COLUMNS, suffixes=("", "_exact"))
+        max_abs_diff = {name: float((merged[name] - merged[f"{name}_exact"]).abs().max()) for name in QUANTILE_Z}
+
+        tolerance = expected_tolerance(engine, config)
+        rows = len(forecast_df)
+        queue.put({"status": "ok", "rows": rows, "setup_s": round(setup_seconds, 3), "wall_s": round(run_seconds, 3), "rows_per_s": round(rows / run_seconds, 1) if run_seconds else None, "peak_rss_mb": round(peak_rss_mb(), 1), "max_abs_diff": max_abs_diff, "tolerance": tolerance, "agrees": len(merged) == len(reference_df) and all(diff <= tolerance for diff in max_abs_diff.values())})
+    except Exception as e:
+        queue.put({"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(engine, config, timeout=DEFAULT_CASE_TIMEOUT_SECONDS):
+    """
+    Run a case in a fresh spawned process so peak memory is measured per case.
+
+    A process that dies without reporting (crash, OOM kill) or outlives the timeout is
+    recorded as an error instead of blocking the suite.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=benchmark_case, args=(engine, config, queue))
+    process.start()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                return queue.get(timeout=POLL_SECONDS)
+            except Empty:
+                pass
+            if not process.is_alive():
+                # The result may have been flushed just before the process exited
+                try:
+                    return queue.get(timeout=POLL_SECONDS)
+                except Empty:
+                    return {"status": "error", "error": f"case process exited with code {process.exitcode} without a result"}
+            if time.monotonic() > deadline:
+                process.terminate()
+                return {"status": "error", "error": f"timed out after {timeout}s"}
+    finally:
+        process.join()
+
+
+def build_cases(grid, engines, max_paths):
+    """Expand the grid into (engine, config, skip reason) cases"""
+    cases = []
+    for n_restaurants, n_items, n_days, n_simulations in itertools.product(grid["n_restaurants"], grid["n_inventory_items"], grid["n_days"], grid["n_simulations"]):
+        start_date = DEFAULT_CONFIG["start_date"]
+        base_config = {**DEFAULT_CONFIG, "n_restaurants": n_restaurants, "n_inventory_items": n_items, "n_simulations": n_simulations, "start_date": start_date, "end_date": start_date + timedelta(days=n_days)}
+        rows = n_restaurants * n_items * n_days
+        for engine in engines:
+            overrides = {**LOCAL_ENGINES, **SPARK_ENGINES}[engine]
+            if overrides["mode"] == "analytic" and n_simulations != grid["n_simulations"][0]:
+                continue  # analytic results do not depend on the simulation count
+            skip = "exceeds max paths" if overrides["mode"] != "analytic" and rows * n_simulations > max_paths else None
+            cases.append((engine, {**base_config, **overrides}, skip))
+    return cases
+
+
+def summary_table(results):
+    """Markdown table of the benchmark results"""
+    lines = ["| engine | restaurants | items | days | n_sims | rows | wall_s | setup_s | rows/s | peak_mb | max_abs_diff | agrees |", "|---|---|---|---|---|---|---|---|---|---|---|---|"]
+    for result in results:
+        max_diff = max(result["max_abs_diff"].values()) if result.get("max_abs_diff") else None
+        cells = [result["engine"], result["n_restaurants"], result["n_inventory_items"], result["n_days"], result["n_simulations"], result.get("rows", "-"), result.get("wall_s", "-"), result.get("setup_s", "-"), result.get("rows_per_s", "-"), result.get("peak_rss_mb", "-"), f"{max_diff:.4f}" if max_diff is not None else "-", result.get("agrees", result["status"])]
+        lines.append("| " + " | ".join(str(cell) for cell in cells) + " |")
+    return "\n".join(lines)
+
+
+def case_key(result):
+    return (result["engine"], result["n_restaurants"], result["n_inventory_items"], result["n_days"], result["n_simulations"])
+
+
+def find_regressions(results, baseline_path, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """Cases whose rows/sec dropped more than threshold below the baseline file"""
+    with open(baseline_path) as f:
+        baseline = {case_key(result): result for result in json.load(f)["results"] if result.get("rows_per_s")}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(case_key(result))
+        if previous and result.get("rows_per_s") and result["rows_per_s"] < previous["rows_per_s"] * (1 - threshold):
+            regressions.append({"case": case_key(result), "rows_per_s": result["rows_per_s"], "baseline_rows_per_s": previous["rows_per_s"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the forecast simulation engines")
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick")
+    parser.add_argument("--engines", nargs="+", help="Engines to run (default: every available engine)")
+    parser.add_argument("--output-dir", default="benchmark_results")
+    parser.add_argument("--max-paths", type=float, default=DEFAULT_MAX_PATHS, help="Skip Monte Carlo cases above rows x n_simulations")
+    parser.add_argument("--baseline", help="Previous results JSON to check for throughput regressions")
+    parser.add_argument("--regression-threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    parser.add_argument("--case-timeout", type=float, default=DEFAULT_CASE_TIMEOUT_SECONDS, help="Seconds before a running case is terminated and recorded as failed")
+    args = parser.parse_args(argv)
+
+    has_spark = spark_available()
+    available = list(LOCAL_ENGINES) + (list(SPARK_ENGINES) if has_spark else [])
+    engines = args.engines or available
+    unknown = [engine for engine in engines if engine not in available]
+    if unknown:
+        parser.error(f"Unavailable engines: {', '.join(unknown)} (available: {', '.join(available)})")
+
+    results = []
+    for engine, config, skip in build_cases(GRIDS[args.grid], engines, args.max_paths):
+        case = {"engine": engine, "n_restaurants": config["n_restaurants"], "n_inventory_items": config["n_inventory_items"], "n_days": (config["end_date"] - config["start_date"]).days, "n_simulations": config["n_simulations"]}
+        result = {**case, "status": "skipped", "reason": skip} if skip else {**case, **run_case(engine, config, args.case_timeout)}
+        results.append(result)
+        print(f"{engine:18s} {case['n_restaurants']:>5} x {case['n_inventory_items']:>3} x {case['n_days']:>3} @ {case['n_simulations']:>6}: {result.get('wall_s', result['status'])}s, agrees={result.get('agrees')}")
+
+    run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+    report = {"run_id": run_id, "grid": args.grid, "environment": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count(), "spark_available": has_spark}, "results": results}
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    json_path = os.path.join(args.output_dir, f"benchmark_{run_id}.json")
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    table = summary_table(results)
+    with open(os.path.join(args.output_dir, f"benchmark_{run_id}.md"), "w") as f:
+        f.write(table + "\n")
+    print("\n" + table)
+    print(f"\nResults written to {json_path}")
+
+    failed = [case_key(result) for result in results if result["status"] == "error" or result.get("agrees") is False]
+    if failed:
+        print(f"\n{len(failed)} cases failed or disagreed with the analytic quantiles: {failed}")
+
+    regressions = find_regressions(results, args.baseline, args.regression_threshold) if args.baseline else []
+    for regression in regressions:
+        print(f"Regression: {regression['case']} {regression['rows_per_s']} rows/s vs baseline {regression['baseline_rows_per_s']}")
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,770 @@
+import os
+import json
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from datetime import datetime, timedelta, timezone
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Simulation defaults
+SIMULATION_SEED = 42
+SIMULATION_MODES = ["monte_carlo", "analytic", "adaptive"]
+SAMPLE_ROWS = 5000
+SAMPLE_PATHS = 5
+
+# Streaming sketch defaults: accuracy (items kept per level) and the number of values
+# (rows x paths) drawn per chunk, so chunk memory stays flat as the batch grows
+DEFAULT_SKETCH_K = 400
+SKETCH_CHUNK_ELEMENTS = 1_000_000
+
+# Adaptive mode: first round size, target CI half-width, confidence level and per-combination
+# path budget. A None tolerance or budget is derived from n_simulations (see adaptive_limits), so
+# by default adaptive mode matches a fixed run's precision and never exceeds its path count.
+# Rows are simulated in blocks of at most ADAPTIVE_CHUNK_ELEMENTS (rows x max paths) values.
+ADAPTIVE_MIN_SIMS = 500
+ADAPTIVE_TOLERANCE = None
+ADAPTIVE_CONFIDENCE = 0.95
+ADAPTIVE_MAX_SIMS = None
+ADAPTIVE_CHUNK_ELEMENTS = 4_000_000
+
+# Output quantiles
+QUANTILES = [5, 50, 95]
+QUANTILE_Z = {f"y_{q:02d}": NormalDist().inv_cdf(q / 100) for q in QUANTILES}
+FORECAST_COLUMNS = ["restaurant_id", "inventory_item_id", "business_date", "dma_id", "dc_id", "state", "y_05", "y_50", "y_95"]
+
+# Rollup levels for hierarchical forecasts (level name -> restaurant attribute)
+HIERARCHY_LEVELS = {"dc": "dc_id", "dma": "dma_id", "state": "state"}
+AGGREGATE_COLUMNS = ["level", "level_id", "inventory_item_id", "business_date", "y_05", "y_50", "y_95"]
+
+# Combination key and the model inputs hashed into its parameter fingerprint
+KEY_COLUMNS = ["restaurant_id", "inventory_item_id", "business_date"]
+FINGERPRINT_COLUMNS = ["rest_effect", "item_effect", "decay_effect", "business_date", "days_from_start"]
+
+# Descriptive attributes that don't affect the simulation; reused rows take the current values
+ATTRIBUTE_COLUMNS = ["dma_id", "dc_id", "state"]
+
+# Parquet output for the Athena forecast table: business_date=YYYY-MM-DD/ partitions, ids as
+# integers like forecast_data, and files rolled at a target size (estimated from bytes per row)
+TARGET_FILE_MB = 128
+PARQUET_BYTES_PER_ROW = 20
+MANIFEST_DIR = "_manifests"
+
+# Restaurants whose paths are held in memory at once while rolling up one item/date
+HIERARCHY_CHUNK_ROWS = 2_000
+
+# Default simulation configuration shared by the local and Spark engines
+DEFAULT_CONFIG = {"n_restaurants": 1, "n_inventory_items": 2, "n_simulations": 1000, "start_date": datetime(2025, 1, 1), "end_date": datetime(2025, 4, 1), "mode": "analytic", "engine": "pandas_udf", "backend": "auto", "seed": SIMULATION_SEED, "sketch_k": None, "adaptive_tolerance": ADAPTIVE_TOLERANCE, "adaptive_max_simulations": ADAPTIVE_MAX_SIMS, "hierarchy": False, "store_path": None, "output_path": None, "target_file_mb": TARGET_FILE_MB}
+
+# backend="auto" runs locally when the combination count is at or below this threshold
+LOCAL_ENGINE_MAX_ROWS = 2_000_000
+
+# Rows per process-pool task in the local Monte Carlo engine
+LOCAL_BATCH_ROWS = 20_000
+
+
+def count_combinations(config):
+    """Number of restaurant x item x date combinations a config produces"""
+    return config["n_restaurants"] * config["n_inventory_items"] * (config["end_date"] - config["start_date"]).days
+
+
+def select_backend(config):
+    """Resolve backend="auto" to "local" or "spark" by problem size"""
+    backend = config.get("backend", "auto")
+    if backend != "auto":
+        return backend
+    return "local" if count_combinations(config) <= LOCAL_ENGINE_MAX_ROWS else "spark"
+
+
+def generate_model_params(config):
+    """
+    Draw the dimensions and model parameters for a simulation.
+
+    Parameters:
+    - config: Dictionary containing simulation parameters
+
+    Returns:
+    - model_params: Dictionary with restaurant/item/date dimensions, per-restaurant
+      DMA/DC/state assignments and the restaurant, item and decay effects
+    """
+    # Extract configuration
+    n_restaurants = config["n_restaurants"]
+    n_inventory_items = config["n_inventory_items"]
+    start_date = config["start_date"]
+    end_date = config["end_date"]
+
+    # Dedicated generator for reproducibility (no global seeding, independent of call order)
+    rng = np.random.default_rng(np.random.SeedSequence(config.get("seed", SIMULATION_SEED)))
+
+    # Generate restaurant IDs (5 digits, zero-padded between 00000 and 30000), sampled without replacement
+    restaurant_ids = [f"{rest_id:05d}" for rest_id in rng.choice(30001, size=n_restaurants, replace=False)]
+
+    # Generate inventory item IDs (integers between 1 and 2000)
+    inventory_item_ids = [str(item_id) for item_id in rng.choice(np.arange(1, 2001), size=n_inventory_items, replace=False)]
+
+    # Generate business dates
+    n_days = (end_date - start_date).days
+    business_dates = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)]
+
+    # Generate DMA IDs (3 letter codes - 30 unique)
+    dma_ids = ["".join(code) for code in rng.choice(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"), size=(30, 3))]
+
+    # Generate DC IDs (integers between 1 and 60)
+    dc_ids = [str(i) for i in range(1, 61)]
+
+    # Generate states (5 unique US state abbreviations)
+    states = list(rng.choice(["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"], size=5, replace=False))
+
+    # Generate model parameters (drawn once and reused across simulations)
+    # Restaurant random effects (normal distribution)
+    restaurant_effects = dict(zip(restaurant_ids, rng.normal(0, 1, size=n_restaurants)))
+
+    # Item constant effects (gamma distribution with mean 20)
+    item_effects = dict(zip(inventory_item_ids, rng.gamma(20, 1, size=n_inventory_items)))
+
+    # Decay effects (uniform distribution between 0.95 and 0.995)
+    decay_effects = dict(zip(inventory_item_ids, rng.uniform(0.95, 0.995, size=n_inventory_items)))
+
+    # Assign DMA, DC, and state to each restaurant (these don't change)
+    restaurant_dma = dict(zip(restaurant_ids, rng.choice(dma_ids, size=n_restaurants)))
+    restaurant_dc = dict(zip(restaurant_ids, rng.choice(dc_ids, size=n_restaurants)))
+    restaurant_state = dict(zip(restaurant_ids, rng.choice(states, size=n_restaurants)))
+
+    return {"restaurant_ids": restaurant_ids, "inventory_item_ids": inventory_item_ids, "business_dates": business_dates, "restaurant_dma": restaurant_dma, "restaurant_dc": restaurant_dc, "restaurant_state": restaurant_state, "restaurant_effects": restaurant_effects, "item_effects": item_effects, "decay_effects": decay_effects, "start_date": start_date}
+
+
+def calculate_day_of_week_effect(date_str):
+    """
+    Calculate day of week effect for a given date.
+
+    Parameters:
+    - date_str: Date string in format "%Y-%m-%d"
+
+    Returns:
+    - day_of_week_effect: Float representing the day of week effect
+    """
+    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+    weekday = date_obj.weekday()  # 0=Monday, 1=Tuesday, ..., 6=Sunday
+
+    # Adjust so Tuesday (1) is lowest and Saturday (5) is highest
+    # Shift so Tuesday is at 0 in our function
+    shifted_dow = (weekday - 1) % 7
+    # Scale to cover a full cycle over 7 days
+    angle = 2 * np.pi * shifted_dow / 7
+    # Cosine will be minimum at 0 (Tuesday) and maximum at π (roughly Saturday)
+    # Multiply by 7.5 to amplify the day of week effect
+    return 7.5 * np.cos(angle)
+
+
+def combination_rng(sim_key, seed=SIMULATION_SEED, path_block=0):
+    """
+    Counter-based RNG stream for one combination.
+
+    Philox is keyed by (seed, combination key), so a combination always draws the same noise
+    no matter which partition or Arrow batch it lands in. path_block selects a disjoint
+    region of the counter space so partial runs of one combination can be split up and merged.
+    """
+    return np.random.Generator(np.random.Philox(key=(int(seed) << 64) | (int(sim_key) & 0xFFFFFFFFFFFFFFFF), counter=int(path_block) << 192))
+
+
+def simulate_noise(sim_keys, n_sims, seed=SIMULATION_SEED):
+    """Draw a (batch, n_sims) standard normal matrix, one independent stream per row"""
+    noise = np.empty((len(sim_keys), n_sims))
+    for row, sim_key in enumerate(sim_keys):
+        noise[row] = combination_rng(sim_key, seed).standard_normal(n_sims)
+    return noise
+
+
+def simulate_quantile_batch(decayed_values, sim_keys, n_sims, seed=SIMULATION_SEED):
+    """
+    Monte Carlo quantiles for a batch of combinations.
+
+    Parameters:
+    - decayed_values: NumPy array of decayed values, one per combination
+    - sim_keys: NumPy array of combination keys
+    - n_sims: Number of simulations per combination
+    - seed: Root seed mixed into every combination's stream
+
+    Returns:
+    - quantiles: pandas DataFrame with float32 y_05/y_50/y_95 columns
+    """
+    sales_values = np.maximum(0, np.asarray(decayed_values, dtype=float)[:, None] + simulate_noise(sim_keys, n_sims, seed))
+    y_05, y_50, y_95 = np.percentile(sales_values, QUANTILES, axis=1)
+    return pd.DataFrame({"y_05": y_05.astype(np.float32), "y_50": y_50.astype(np.float32), "y_95": y_95.astype(np.float32)})
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL-style quantile sketch for a batch of rows updated in lockstep.
+
+    Each row holds its own sketch, but every row sees the same number of items per update,
+    so level sizes stay aligned and compaction is a single sort over a (rows, items) array.
+    Level l items carry weight 2**l; memory is about 3k items per row regardless of how many
+    values are folded in, with rank error on the order of 1/k.
+    """
+
+    def __init__(self, n_rows, k=DEFAULT_SKETCH_K, seed=SIMULATION_SEED):
+        self.n_rows = n_rows
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty((n_rows, 0))]
+        self.count = 0
+
+    def capacity(self, level):
+        """Lower levels get geometrically smaller capacities, as in KLL"""
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """Fold a (rows, m) block of values into the sketch"""
+        values = np.asarray(values, dtype=float).reshape(self.n_rows, -1)
+        self.levels[0] = np.concatenate([self.levels[0], values], axis=1)
+        self.count += values.shape[1]
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch over the same rows into this one"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty((self.n_rows, 0)))
+            self.levels[level] = np.concatenate([self.levels[level], items], axis=1)
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _compress(self):
+        while any(items.shape[1] > self.capacity(level) for level, items in enumerate(self.levels)):
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if items.shape[1] <= self.capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty((self.n_rows, 0)))
+
+                # Keep every other sorted item (random offset) at double weight
+                items = np.sort(items, axis=1)
+                n_paired = items.shape[1] // 2 * 2
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[:, self.rng.integers(2) : n_paired : 2]], axis=1)
+                self.levels[level] = items[:, n_paired:]
+
+    def quantiles(self, fractions):
+        """Weighted quantile estimates per row, one array per fraction"""
+        values = np.concatenate(self.levels, axis=1)
+        weights = np.concatenate([np.full(items.shape[1], 2.0**level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, axis=1)
+        sorted_values = np.take_along_axis(values, order, axis=1)
+        cumulative = np.cumsum(weights[order], axis=1)
+        rows = np.arange(self.n_rows)
+        return [sorted_values[rows, np.minimum((cumulative < q * cumulative[:, -1:]).sum(axis=1), values.shape[1] - 1)] for q in fractions]
+
+
+def simulate_sketch(decayed_values, sim_keys, n_sims, seed=SIMULATION_SEED, sketch_k=DEFAULT_SKETCH_K, path_block=0, chunk_sims=None):
+    """
+    Stream n_sims paths per combination into a QuantileSketch, chunk_sims paths at a time
+    (by default as many as fit SKETCH_CHUNK_ELEMENTS values across the batch).
+
+    Sketches for different path_blocks of the same combinations draw disjoint streams and can
+    be merged, so a large path count can be split across workers.
+    """
+    decayed_values = np.asarray(decayed_values, dtype=float)
+    rngs = [combination_rng(sim_key, seed, path_block) for sim_key in sim_keys]
+    sketch = QuantileSketch(len(rngs), sketch_k, seed=seed + path_block)
+    chunk_sims = chunk_sims or max(1, SKETCH_CHUNK_ELEMENTS // max(1, len(rngs)))
+    for start in range(0, n_sims, chunk_sims):
+        size = min(chunk_sims, n_sims - start)
+        noise = np.stack([rng.standard_normal(size) for rng in rngs]) if rngs else np.empty((0, size))
+        sketch.update(np.maximum(0, decayed_values[:, None] + noise))
+    return sketch
+
+
+def sketch_quantiles(sketch):
+    """Reduce a sketch to the float32 y_05/y_50/y_95 frame the engines return"""
+    y_05, y_50, y_95 = sketch.quantiles([q / 100 for q in QUANTILES])
+    return pd.DataFrame({"y_05": y_05.astype(np.float32), "y_50": y_50.astype(np.float32), "y_95": y_95.astype(np.float32)})
+
+
+def monte_carlo_quantile_batch(decayed_values, sim_keys, n_sims, seed=SIMULATION_SEED, sketch_k=None):
+    """Exact Monte Carlo quantiles, or streamed through a sketch when sketch_k is set"""
+    if sketch_k:
+        return sketch_quantiles(simulate_sketch(decayed_values, sim_keys, n_sims, seed, sketch_k))
+    return simulate_quantile_batch(decayed_values, sim_keys, n_sims, seed)
+
+
+def quantile_interval_half_widths(sorted_samples, confidence=ADAPTIVE_CONFIDENCE):
+    """
+    Distribution-free confidence interval half-widths for each output quantile.
+
+    Uses the binomial order-statistic interval: the p-quantile lies between the sorted
+    samples at ranks n*p -/+ z*sqrt(n*p*(1-p)) with the given confidence.
+
+    Returns:
+    - half_widths: (rows, len(QUANTILES)) array
+    """
+    n = sorted_samples.shape[1]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_widths = []
+    for q in QUANTILES:
+        p = q / 100
+        spread = z * np.sqrt(n * p * (1 - p))
+        lower = int(np.clip(np.floor(n * p - spread), 0, n - 1))
+        upper = int(np.clip(np.ceil(n * p + spread), 0, n - 1))
+        half_widths.append((sorted_samples[:, upper] - sorted_samples[:, lower]) / 2)
+    return np.column_stack(half_widths)
+
+
+def adaptive_limits(n_simulations, tolerance=ADAPTIVE_TOLERANCE, max_sims=ADAPTIVE_MAX_SIMS, confidence=ADAPTIVE_CONFIDENCE):
+    """
+    Resolve the adaptive tolerance and path budget, deriving unset ones from n_simulations.
+
+    The default tolerance is the expected CI half-width of the widest quantile after a fixed
+    n_simulations run, and the default budget is n_simulations itself. With unit-variance noise
+    every uncensored series needs about that many paths, so only series censored at zero stop
+    early; a looser tolerance or larger budget has to be asked for explicitly.
+    """
+    if tolerance is None:
+        tolerance = monte_carlo_tolerance(n_simulations, n_std_errors=NormalDist().inv_cdf(0.5 + confidence / 2))
+    if max_sims is None:
+        max_sims = n_simulations
+    return tolerance, max_sims
+
+
+def adaptive_quantile_batch(decayed_values, sim_keys, seed=SIMULATION_SEED, tolerance=ADAPTIVE_TOLERANCE, max_sims=ADAPTIVE_MAX_SIMS, min_sims=ADAPTIVE_MIN_SIMS, confidence=ADAPTIVE_CONFIDENCE, n_simulations=1000):
+    """
+    Sequential Monte Carlo: simulate in rounds and retire each combination once converged.
+
+    Every round doubles the paths of the still-active combinations (continuing their streams)
+    until all quantile CI half-widths are within tolerance or max_sims is reached. Unset
+    tolerance and max_sims are derived from n_simulations (see adaptive_limits). Rows are
+    processed in blocks so at most ADAPTIVE_CHUNK_ELEMENTS samples are held at once.
+
+    Returns:
+    - quantiles: pandas DataFrame with float32 y_05/y_50/y_95 and the n_simulations used
+    """
+    tolerance, max_sims = adaptive_limits(n_simulations, tolerance, max_sims, confidence)
+    decayed_values = np.asarray(decayed_values, dtype=float)
+    n_rows = len(decayed_values)
+    rngs = [combination_rng(sim_key, seed) for sim_key in sim_keys]
+    result = np.zeros((n_rows, len(QUANTILES)))
+    used = np.zeros(n_rows, dtype=np.int64)
+
+    block_rows = max(1, ADAPTIVE_CHUNK_ELEMENTS // max_sims)
+    for block_start in range(0, n_rows, block_rows):
+        active = np.arange(block_start, min(block_start + block_rows, n_rows))
+        samples = np.empty((len(active), 0))
+        round_sims = min(min_sims, max_sims)
+        while len(active):
+            noise = np.stack([rngs[row].standard_normal(round_sims) for row in active])
+            samples = np.sort(np.concatenate([samples, np.maximum(0, decayed_values[active, None] + noise)], axis=1), axis=1)
+            n_sims = samples.shape[1]
+
+            converged = (quantile_interval_half_widths(samples, confidence) <= tolerance).all(axis=1)
+            done = converged | (n_sims >= max_sims)
+            result[active[done]] = np.percentile(samples[done], QUANTILES, axis=1).T
+            used[active[done]] = n_sims
+
+            active, samples = active[~done], samples[~done]
+            round_sims = min(n_sims, max_sims - n_sims)
+
+    quantiles = pd.DataFrame(result.astype(np.float32), columns=list(QUANTILE_Z))
+    quantiles["n_simulations"] = used
+    return quantiles
+
+
+def aggregate_path_quantiles(group_df, n_sims, seed=SIMULATION_SEED, chunk_rows=HIERARCHY_CHUNK_ROWS):
+    """
+    Coherent rollup quantiles for one inventory item and business date.
+
+    Restaurant paths are drawn from the same per-combination streams as the restaurant-level
+    forecast and summed path-by-path into each DC, DMA and state, so aggregate quantiles are
+    quantiles of the summed sales rather than sums of quantiles. Restaurants are processed
+    chunk_rows at a time; only the (level members, n_sims) running totals are kept.
+
+    Parameters:
+    - group_df: pandas DataFrame for a single inventory_item_id/business_date with
+      decayed_value, sim_key and the HIERARCHY_LEVELS columns
+    - n_sims: Number of simulation paths
+    - seed: Root seed for the simulation streams
+    - chunk_rows: Restaurants simulated per chunk
+
+    Returns:
+    - aggregate_df: pandas DataFrame with AGGREGATE_COLUMNS
+    """
+    decayed_values = group_df["decayed_value"].to_numpy(dtype=float)
+    sim_keys = group_df["sim_key"].to_numpy()
+    members = {level: pd.factorize(group_df[column].astype(str)) for level, column in HIERARCHY_LEVELS.items()}
+    totals = {level: np.zeros((len(uniques), n_sims)) for level, (_, uniques) in members.items()}
+
+    for start in range(0, len(group_df), chunk_rows):
+        stop = start + chunk_rows
+        paths = np.maximum(0, decayed_values[start:stop, None] + simulate_noise(sim_keys[start:stop], n_sims, seed))
+        for level, (codes, uniques) in members.items():
+            # One-hot membership (members, chunk) @ paths (chunk, n_sims) adds each restaurant to its parent
+            membership = (codes[start:stop][None, :] == np.arange(len(uniques))[:, None]).astype(float)
+            totals[level] += membership @ paths
+
+    frames = []
+    for level, (_, uniques) in members.items():
+        y_05, y_50, y_95 = np.percentile(totals[level], QUANTILES, axis=1)
+        frames.append(pd.DataFrame({"level": level, "level_id": np.asarray(uniques, dtype=str), "y_05": y_05.astype(np.float32), "y_50": y_50.astype(np.float32), "y_95": y_95.astype(np.float32)}))
+    aggregate_df = pd.concat(frames, ignore_index=True)
+    aggregate_df["inventory_item_id"] = group_df["inventory_item_id"].iloc[0]
+    aggregate_df["business_date"] = group_df["business_date"].iloc[0]
+    return aggregate_df[AGGREGATE_COLUMNS]
+
+
+def analytic_quantile_batch(decayed_values):
+    """
+    Exact quantiles of max(0, decayed_value + N(0, 1)).
+
+    max(0, x) is monotone, so each quantile is the shifted normal quantile censored at zero.
+    """
+    decayed_values = np.asarray(decayed_values, dtype=float)
+    return pd.DataFrame({name: np.maximum(0, decayed_values + z).astype(np.float32) for name, z in QUANTILE_Z.items()})
+
+
+def monte_carlo_tolerance(n_simulations, n_std_errors=6.0):
+    """
+    Expected agreement bound between Monte Carlo and analytic quantiles.
+
+    Uses the asymptotic standard error of a sample quantile, sqrt(p(1-p)/n) / pdf(z_p),
+    for the widest (tail) quantile; the margin is wide because the check takes the max
+    over every combination.
+    """
+    p = min(QUANTILES) / 100
+    standard_error = np.sqrt(p * (1 - p) / n_simulations) / NormalDist().pdf(NormalDist().inv_cdf(p))
+    return float(n_std_errors * standard_error)
+
+
+def generate_base_data(config):
+    """
+    Generate the base data for restaurant forecast simulations as a pandas DataFrame.
+
+    Parameters:
+    - config: Dictionary containing simulation parameters
+
+    Returns:
+    - base_df: pandas DataFrame with base data combinations
+    - model_params: Dictionary of model parameters
+    """
+    model_params = generate_model_params(config)
+    restaurant_ids = np.array(model_params["restaurant_ids"], dtype=object)
+    inventory_item_ids = np.array(model_params["inventory_item_ids"], dtype=object)
+    business_dates = np.array(model_params["business_dates"], dtype=object)
+
+    # Restaurant-major, then item, then date (same order as the Spark engine)
+    n_items, n_days = len(inventory_item_ids), len(business_dates)
+    rest_col = np.repeat(restaurant_ids, n_items * n_days)
+    base_df = pd.DataFrame({"restaurant_id": rest_col, "inventory_item_id": np.tile(np.repeat(inventory_item_ids, n_days), len(restaurant_ids)), "business_date": np.tile(business_dates, len(restaurant_ids) * n_items)})
+    for column, mapping in [("dma_id", "restaurant_dma"), ("dc_id", "restaurant_dc"), ("state", "restaurant_state")]:
+        base_df[column] = base_df["restaurant_id"].map(model_params[mapping])
+
+    print(f"Created base dataframe with {len(base_df)} combinations")
+
+    return base_df, model_params
+
+
+def create_parameter_df(base_df, model_params):
+    """
+    Add the model parameters and decayed value to each combination (vectorized).
+
+    Parameters:
+    - base_df: pandas DataFrame with base data combinations
+    - model_params: Dictionary of model parameters
+
+    Returns:
+    - param_df: pandas DataFrame with calculated parameters
+    """
+    param_df = base_df.copy()
+    param_df["rest_effect"] = param_df["restaurant_id"].map(model_params["restaurant_effects"]).fillna(0.0).astype(np.float32)
+    param_df["item_effect"] = param_df["inventory_item_id"].map(model_params["item_effects"]).fillna(0.0).astype(np.float32)
+    param_df["decay_effect"] = param_df["inventory_item_id"].map(model_params["decay_effects"]).fillna(0.95).astype(np.float32)
+
+    # Date terms computed once per distinct date, then expanded
+    date_codes, distinct_dates = pd.factorize(param_df["business_date"])
+    distinct_dates = pd.to_datetime(distinct_dates)
+    shifted_dow = (distinct_dates.weekday.to_numpy() - 1) % 7
+    param_df["dow_effect"] = (7.5 * np.cos(2 * np.pi * shifted_dow / 7)).astype(np.float32)[date_codes]
+    param_df["days_from_start"] = (distinct_dates - pd.Timestamp(model_params["start_date"].date())).days.to_numpy()[date_codes]
+
+    # Calculate base value and decayed value
+    param_df["base_value"] = param_df["rest_effect"] + param_df["item_effect"] + param_df["dow_effect"]
+    param_df["decayed_value"] = param_df["base_value"] * np.power(param_df["decay_effect"].to_numpy(dtype=float), param_df["days_from_start"].to_numpy())
+
+    return param_df
+
+
+def combination_keys(param_df):
+    """Stable 64-bit key per restaurant/item/date combination"""
+    return pd.util.hash_pandas_object(param_df[FORECAST_COLUMNS[:3]], index=False).to_numpy()
+
+
+def run_simulations(param_df, n_simulations=1000, seed=SIMULATION_SEED, mode="monte_carlo", workers=None, sketch_k=None, adaptive_tolerance=ADAPTIVE_TOLERANCE, adaptive_max_simulations=ADAPTIVE_MAX_SIMS):
+    """
+    Compute quantile forecasts locally with NumPy, fanning Monte Carlo batches out to a process pool.
+
+    Parameters:
+    - param_df: pandas DataFrame with calculated parameters
+    - n_simulations: Number of simulations to run per combination
+    - seed: Root seed for the simulation streams
+    - mode: "monte_carlo", "analytic" or "adaptive" (sequential rounds until the quantile CIs converge)
+    - workers: Process count for Monte Carlo batches (default: all cores)
+    - sketch_k: Stream paths through a QuantileSketch of this size instead of keeping them all
+    - adaptive_tolerance: Target CI half-width per quantile in adaptive mode (None: precision of a fixed n_simulations run)
+    - adaptive_max_simulations: Per-combination path budget in adaptive mode (None: n_simulations)
+
+    Returns:
+    - forecast_df: pandas DataFrame with quantile forecasts (plus n_simulations in adaptive mode)
+    - sample_sim_df: pandas DataFrame with sample simulations (for verification), None in analytic mode
+    """
+    if mode not in SIMULATION_MODES:
+        raise ValueError(f"Unknown simulation mode: {mode}")
+
+    keys_df = param_df[FORECAST_COLUMNS[:6]].reset_index(drop=True)
+    decayed_values = param_df["decayed_value"].to_numpy(dtype=float)
+
+    if mode == "analytic":
+        return pd.concat([keys_df, analytic_quantile_batch(decayed_values)], axis=1), None
+
+    if mode == "adaptive":
+        simulate_batch = partial(adaptive_quantile_batch, seed=seed, tolerance=adaptive_tolerance, max_sims=adaptive_max_simulations, n_simulations=n_simulations)
+    else:
+        simulate_batch = partial(monte_carlo_quantile_batch, n_sims=n_simulations, seed=seed, sketch_k=sketch_k)
+
+    sim_keys = combination_keys(param_df)
+    batches = [(decayed_values[start : start + LOCAL_BATCH_ROWS], sim_keys[start : start + LOCAL_BATCH_ROWS]) for start in range(0, len(param_df), LOCAL_BATCH_ROWS)]
+    workers = min(workers or os.cpu_count() or 1, len(batches))
+
+    # Small runs stay in-process; pool start-up would dominate
+    if workers <= 1:
+        quantiles = [simulate_batch(values, keys) for values, keys in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            quantiles = list(executor.map(simulate_batch, *zip(*batches)))
+    forecast_df = pd.concat([keys_df, pd.concat(quantiles, ignore_index=True)], axis=1)
+
+    # Sample paths for the first combinations only (verification)
+    sample_paths = np.maximum(0, decayed_values[:SAMPLE_ROWS, None] + simulate_noise(sim_keys[:SAMPLE_ROWS], SAMPLE_PATHS, seed)).astype(np.float32)
+    sample_sim_df = keys_df.iloc[: len(sample_paths)].loc[lambda df: df.index.repeat(SAMPLE_PATHS)].reset_index(drop=True)
+    sample_sim_df["simulation_id"] = np.tile(np.arange(SAMPLE_PATHS), len(sample_paths))
+    sample_sim_df["sales_value"] = sample_paths.ravel()
+
+    return forecast_df, sample_sim_df
+
+
+def run_hierarchical_forecast(param_df, n_simulations=1000, seed=SIMULATION_SEED, workers=None):
+    """
+    Rollup quantile forecasts for every DC, DMA and state, one task per item/date.
+
+    Parameters:
+    - param_df: pandas DataFrame with calculated parameters
+    - n_simulations: Number of simulation paths
+    - seed: Root seed for the simulation streams
+    - workers: Process count (default: all cores)
+
+    Returns:
+    - aggregate_df: pandas DataFrame with AGGREGATE_COLUMNS
+    """
+    keyed_df = param_df.assign(sim_key=combination_keys(param_df))
+    groups = [group_df for _, group_df in keyed_df.groupby(["inventory_item_id", "business_date"], sort=False)]
+    simulate_group = partial(aggregate_path_quantiles, n_sims=n_simulations, seed=seed)
+    workers = min(workers or os.cpu_count() or 1, len(groups))
+
+    if workers <= 1:
+        aggregates = [simulate_group(group_df) for group_df in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            aggregates = list(executor.map(simulate_group, groups, chunksize=max(1, len(groups) // (4 * workers))))
+    return pd.concat(aggregates, ignore_index=True)
+
+
+def simulation_settings(n_simulations, seed, mode, sketch_k=None, adaptive_tolerance=ADAPTIVE_TOLERANCE, adaptive_max_simulations=ADAPTIVE_MAX_SIMS):
+    """Run settings that change results, folded into every fingerprint"""
+    settings = {"mode": mode, "seed": seed}
+    if mode == "monte_carlo":
+        settings.update(n_simulations=n_simulations, sketch_k=sketch_k)
+    elif mode == "adaptive":
+        adaptive_tolerance, adaptive_max_simulations = adaptive_limits(n_simulations, adaptive_tolerance, adaptive_max_simulations)
+        settings.update(adaptive_tolerance=adaptive_tolerance, adaptive_max_simulations=adaptive_max_simulations)
+    return "|".join(f"{name}={value}" for name, value in sorted(settings.items()))
+
+
+def parameter_fingerprints(param_df, settings):
+    """64-bit fingerprint of each combination's model inputs and the run settings"""
+    inputs = param_df[FINGERPRINT_COLUMNS].assign(settings=settings)
+    return pd.util.hash_pandas_object(inputs, index=False).to_numpy().view(np.int64)
+
+
+def run_incremental_simulations(param_df, store_path, n_simulations=1000, seed=SIMULATION_SEED, mode="monte_carlo", workers=None, **simulation_kwargs):
+    """
+    Re-simulate only combinations whose parameter fingerprint changed since the last run.
+
+    Results are kept in a Parquet store keyed by restaurant/item/date along with their
+    fingerprint. Each run simulates new or changed combinations, reuses the rest from the
+    store, and atomically replaces the store with the merged result.
+
+    Parameters:
+    - param_df: pandas DataFrame with calculated parameters
+    - store_path: Parquet file holding previous results
+    - n_simulations, seed, mode, workers, simulation_kwargs: passed to run_simulations
+
+    Returns:
+    - forecast_df: pandas DataFrame with quantile forecasts for every combination
+    - sample_sim_df: Sample simulations for the re-simulated combinations (None if nothing ran)
+    - stats: Dictionary with reused and simulated combination counts
+    """
+    settings = simulation_settings(n_simulations, seed, mode, **simulation_kwargs)
+    param_df = param_df.reset_index(drop=True).assign(fingerprint=lambda df: parameter_fingerprints(df, settings))
+
+    # Previous results whose fingerprint still matches are reused, with the current hierarchy attributes
+    cached_df = pd.read_parquet(store_path) if os.path.exists(store_path) else pd.DataFrame({**{column: pd.Series(dtype=object) for column in KEY_COLUMNS}, "fingerprint": pd.Series(dtype=np.int64)})
+    current_keys = param_df[KEY_COLUMNS + ["fingerprint"]]
+    reused_df = cached_df.drop(columns=ATTRIBUTE_COLUMNS, errors="ignore").merge(param_df[KEY_COLUMNS + ATTRIBUTE_COLUMNS + ["fingerprint"]], on=KEY_COLUMNS + ["fingerprint"], how="inner")
+    reused_df = reused_df.reindex(columns=FORECAST_COLUMNS + [column for column in reused_df.columns if column not in FORECAST_COLUMNS])
+    changed_mask = ~pd.MultiIndex.from_frame(current_keys).isin(pd.MultiIndex.from_frame(reused_df[KEY_COLUMNS + ["fingerprint"]]))
+    changed_df = param_df[changed_mask]
+
+    sample_sim_df = None
+    if len(changed_df):
+        simulated_df, sample_sim_df = run_simulations(changed_df, n_simulations, seed, mode, workers, **simulation_kwargs)
+        simulated_df["fingerprint"] = changed_df["fingerprint"].to_numpy()
+        # Stored rows from another mode can carry columns (n_simulations) this run doesn't produce
+        forecast_df = pd.concat([reused_df, simulated_df], ignore_index=True)[simulated_df.columns]
+    else:
+        forecast_df = reused_df
+
+    # Write next to the store and swap in, so a failed run never leaves a partial store
+    forecast_df = forecast_df.merge(param_df[KEY_COLUMNS], on=KEY_COLUMNS)
+    store_dir = os.path.dirname(os.path.abspath(store_path))
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = f"{store_path}.tmp-{os.getpid()}"
+    forecast_df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, store_path)
+
+    stats = {"reused": len(forecast_df) - len(changed_df), "simulated": len(changed_df)}
+    print(f"Incremental simulation: {stats['simulated']} combinations simulated, {stats['reused']} reused from {store_path}")
+    return forecast_df.drop(columns="fingerprint"), sample_sim_df, stats
+
+
+def rows_per_file(target_file_mb=TARGET_FILE_MB):
+    """Row cap per Parquet file that lands files near the target size"""
+    return max(1, int(target_file_mb * 1024 * 1024 / PARQUET_BYTES_PER_ROW))
+
+
+def output_filesystem(output_path):
+    """pyarrow filesystem and root path for a local directory or s3:// (or Spark s3a://) URI"""
+    import pyarrow.fs as pafs
+
+    if output_path.startswith("s3a://"):
+        output_path = "s3://" + output_path[len("s3a://") :]
+    return pafs.FileSystem.from_uri(output_path if "://" in output_path else os.path.abspath(output_path))
+
+
+def list_partition_files(output_path, business_dates):
+    """Data files currently under the given business_date partitions"""
+    import pyarrow.fs as pafs
+
+    filesystem, root = output_filesystem(output_path)
+    files = []
+    for business_date in sorted(business_dates):
+        selector = pafs.FileSelector(f"{root}/business_date={business_date}", allow_not_found=True)
+        for info in filesystem.get_file_info(selector):
+            if info.type == pafs.FileType.File and info.base_name.endswith(".parquet"):
+                files.append({"path": info.path, "size": info.size, "business_date": business_date})
+    return files
+
+
+def write_manifest(output_path, run_id, files, rows):
+    """
+    Record the objects a run wrote under <output>/_manifests/<run_id>.json.
+
+    Underscore-prefixed directories are ignored by Athena, so the manifest can live next to
+    the data and downstream sync can pick up exactly the files of a run.
+    """
+    filesystem, root = output_filesystem(output_path)
+    manifest = {"run_id": run_id, "created_at": datetime.now(timezone.utc).isoformat(), "output_path": output_path, "rows": rows, "partitions": sorted({f["business_date"] for f in files}), "files": files, "total_bytes": sum(f["size"] for f in files)}
+
+    filesystem.create_dir(f"{root}/{MANIFEST_DIR}", recursive=True)
+    with filesystem.open_output_stream(f"{root}/{MANIFEST_DIR}/{run_id}.json") as stream:
+        stream.write(json.dumps(manifest, indent=2).encode())
+    print(f"Wrote {len(files)} files ({manifest['total_bytes']} bytes) across {len(manifest['partitions'])} partitions; manifest {MANIFEST_DIR}/{run_id}.json")
+    return manifest
+
+
+def new_run_id():
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+
+
+def write_forecast_parquet(forecast_df, output_path, target_file_mb=TARGET_FILE_MB):
+    """
+    Write forecasts as business_date-partitioned Parquet for the Athena forecast table.
+
+    Partitions in this run are replaced; other dates are left untouched.
+
+    Parameters:
+    - forecast_df: pandas DataFrame with FORECAST_COLUMNS
+    - output_path: Local directory or s3:// URI
+    - target_file_mb: Approximate Parquet file size
+
+    Returns:
+    - manifest: Dictionary describing the written objects
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    filesystem, root = output_filesystem(output_path)
+    run_id = new_run_id()
+    schema = pa.schema([("restaurant_id", pa.int32()), ("inventory_item_id", pa.int32()), ("business_date", pa.string()), ("dma_id", pa.string()), ("dc_id", pa.int32()), ("state", pa.string()), ("y_05", pa.float64()), ("y_50", pa.float64()), ("y_95", pa.float64())])
+    ordered_df = forecast_df[FORECAST_COLUMNS].astype({"restaurant_id": np.int32, "inventory_item_id": np.int32, "dc_id": np.int32}).sort_values(["business_date", "restaurant_id", "inventory_item_id"])
+    table = pa.Table.from_pandas(ordered_df, preserve_index=False).cast(schema).replace_schema_metadata()
+
+    max_rows = rows_per_file(target_file_mb)
+    ds.write_dataset(table, root, filesystem=filesystem, format="parquet", partitioning=ds.partitioning(pa.schema([("business_date", pa.string())]), flavor="hive"), basename_template=f"part-{run_id}-{{i}}.parquet", max_rows_per_file=max_rows, max_rows_per_group=min(max_rows, 1024 * 1024), existing_data_behavior="delete_matching")
+
+    return write_manifest(output_path, run_id, list_partition_files(output_path, forecast_df["business_date"].unique()), len(forecast_df))
+
+
+def generate_hierarchical_forecast(config=None, workers=None):
+    """
+    Generate DC / DMA / state rollup forecasts on the local machine.
+
+    Parameters:
+    - config: Dictionary containing simulation parameters (default: DEFAULT_CONFIG)
+    - workers: Process count (default: all cores)
+
+    Returns:
+    - aggregate_df: pandas DataFrame with AGGREGATE_COLUMNS
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+
+    base_df, model_params = generate_base_data(config)
+    param_df = create_parameter_df(base_df, model_params)
+    return run_hierarchical_forecast(param_df, config["n_simulations"], config["seed"], workers)
+
+
+def generate_forecast_data(config=None, workers=None):
+    """
+    Generate restaurant sales forecast data on the local machine (no Spark).
+
+    Same generate_base_data -> create_parameter_df -> run_simulations pipeline as the Spark
+    engine, suited to configurations small enough that SparkSession start-up would dominate.
+
+    Parameters:
+    - config: Dictionary containing simulation parameters (default: DEFAULT_CONFIG)
+    - workers: Process count for Monte Carlo batches (default: all cores)
+
+    Returns:
+    - forecast_df: pandas DataFrame with forecasted sales quantiles
+    - sample_sim_df: pandas DataFrame with sample simulations (for verification)
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+
+    base_df, model_params = generate_base_data(config)
+    param_df = create_parameter_df(base_df, model_params)
+    simulation_kwargs = {"sketch_k": config["sketch_k"], "adaptive_tolerance": config["adaptive_tolerance"], "adaptive_max_simulations": config["adaptive_max_simulations"]}
+
+    if config["store_path"]:
+        forecast_df, sample_sim_df, _ = run_incremental_simulations(param_df, config["store_path"], config["n_simulations"], config["seed"], config["mode"], workers, **simulation_kwargs)
+        return forecast_df, sample_sim_df
+    return run_simulations(param_df, config["n_simulations"], config["seed"], config["mode"], workers, **simulation_kwargs)
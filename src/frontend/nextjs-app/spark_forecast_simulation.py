@@ -1,11 +1,20 @@
 import numpy as np
-from datetime import datetime, timedelta
-import random
+import pandas as pd
+
+import local_forecast_simulation
+from local_forecast_simulation import TARGET_FILE_MB, ADAPTIVE_MAX_SIMS, ATTRIBUTE_COLUMNS, ADAPTIVE_TOLERANCE, DEFAULT_CONFIG, FINGERPRINT_COLUMNS, FORECAST_COLUMNS, HIERARCHY_LEVELS, KEY_COLUMNS, QUANTILE_Z, SAMPLE_PATHS, SAMPLE_ROWS, SIMULATION_MODES, SIMULATION_SEED, adaptive_limits, adaptive_quantile_batch, aggregate_path_quantiles, generate_model_params, monte_carlo_quantile_batch, monte_carlo_tolerance, list_partition_files, new_run_id, rows_per_file, select_backend, simulate_noise, simulation_settings, write_manifest
 
 # PySpark imports
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, udf, percentile_approx, expr
-from pyspark.sql.types import StructType, StructField, StringType, FloatType, IntegerType, ArrayType
+from pyspark.sql.functions import abs as spark_abs, col, udf, pandas_udf, percentile_approx, expr, greatest, max as spark_max, broadcast, coalesce, cos, date_format, date_sub, datediff, dayofweek, explode, lit, pmod, posexplode, sequence, to_date, xxhash64
+from pyspark.sql.utils import AnalysisException
+from pyspark.sql.types import StructType, StructField, StringType, FloatType, LongType, ArrayType
+
+# Monte Carlo engines and the struct the vectorized engine returns
+SIMULATION_ENGINES = ["pandas_udf", "udf"]
+QUANTILE_SCHEMA = StructType([StructField("y_05", FloatType()), StructField("y_50", FloatType()), StructField("y_95", FloatType())])
+ADAPTIVE_SCHEMA = StructType(QUANTILE_SCHEMA.fields + [StructField("n_simulations", LongType())])
+AGGREGATE_SCHEMA = StructType([StructField("level", StringType()), StructField("level_id", StringType()), StructField("inventory_item_id", StringType()), StructField("business_date", StringType())] + QUANTILE_SCHEMA.fields)
 
 
 def create_spark_session(app_name="ForecastSimulation"):
@@ -28,6 +37,10 @@ def generate_base_data(spark, config):
     """
     Generate the base data for restaurant forecast simulations.
 
+    Only the small dimension tables are built on the driver; the restaurant x item x date
+    combinations are expanded on the executors by cross joins, with dates produced by
+    sequence(), so the driver never holds the full grid.
+
     Parameters:
     - spark: SparkSession object
     - config: Dictionary containing simulation parameters
@@ -36,103 +49,45 @@ def generate_base_data(spark, config):
     - base_df: Spark DataFrame with base data combinations
     - model_params: Dictionary of model parameters
     """
-    # Extract configuration
-    n_restaurants = config["n_restaurants"]
-    n_inventory_items = config["n_inventory_items"]
-    start_date = config["start_date"]
-    end_date = config["end_date"]
-
-    # Set seed for reproducibility
-    random.seed(42)
-    np.random.seed(42)
-
-    # Generate restaurant IDs (5 digits, zero-padded between 00000 and 30000)
-    restaurant_ids = []
-    while len(restaurant_ids) < n_restaurants:
-        new_id = f"{random.randint(0, 30000):05d}"
-        if new_id not in restaurant_ids:
-            restaurant_ids.append(new_id)
-
-    # Generate inventory item IDs (integers between 1 and 2000)
-    inventory_item_ids = [str(id) for id in random.sample(range(1, 2001), n_inventory_items)]
-
-    # Generate business dates
-    n_days = (end_date - start_date).days
-    business_dates = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)]
-
-    # Generate DMA IDs (3 letter codes - 30 unique)
-    dma_ids = ["".join(random.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=3)) for _ in range(30)]
+    model_params = generate_model_params(config)
+    restaurant_ids = model_params["restaurant_ids"]
+    inventory_item_ids = model_params["inventory_item_ids"]
 
-    # Generate DC IDs (integers between 1 and 60)
-    dc_ids = [str(i) for i in range(1, 61)]
+    # Restaurant dimension (one row per restaurant, spread across the cluster)
+    restaurant_schema = StructType([StructField("restaurant_id", StringType(), False), StructField("dma_id", StringType(), False), StructField("dc_id", StringType(), False), StructField("state", StringType(), False)])
+    restaurants_df = spark.createDataFrame([(rest_id, str(model_params["restaurant_dma"][rest_id]), str(model_params["restaurant_dc"][rest_id]), str(model_params["restaurant_state"][rest_id])) for rest_id in restaurant_ids], restaurant_schema).repartition(spark.sparkContext.defaultParallelism)
 
-    # Generate states (5 unique US state abbreviations)
-    states = random.sample(["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD", "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ", "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"], 5)
+    # Item x date dimension, small enough to broadcast
+    items_df = spark.createDataFrame([(item_id,) for item_id in inventory_item_ids], StructType([StructField("inventory_item_id", StringType(), False)]))
+    dates_df = spark.range(1).select(explode(sequence(lit(config["start_date"].date()), date_sub(lit(config["end_date"].date()), 1))).alias("date")).select(date_format(col("date"), "yyyy-MM-dd").alias("business_date"))
+    item_dates_df = items_df.crossJoin(dates_df)
 
-    # Generate model parameters (drawn once and reused across simulations)
-    # Restaurant random effects (normal distribution)
-    restaurant_effects = {rest_id: np.random.normal(0, 1) for rest_id in restaurant_ids}
+    # Expand the grid executor-side; the restaurant side streams, item x date is broadcast
+    base_df = restaurants_df.crossJoin(broadcast(item_dates_df)).select("restaurant_id", "inventory_item_id", "business_date", "dma_id", "dc_id", "state")
 
-    # Item constant effects (gamma distribution with mean 20)
-    item_effects = {item_id: np.random.gamma(20, 1) for item_id in inventory_item_ids}
-
-    # Decay effects (uniform distribution between 0.95 and 0.995)
-    decay_effects = {item_id: np.random.uniform(0.95, 0.995) for item_id in inventory_item_ids}
-    print(f"decay_effects: {decay_effects}")
-
-    # Assign DMA, DC, and state to each restaurant (these don't change)
-    restaurant_dma = {rest_id: random.choice(dma_ids) for rest_id in restaurant_ids}
-    restaurant_dc = {rest_id: random.choice(dc_ids) for rest_id in restaurant_ids}
-    restaurant_state = {rest_id: random.choice(states) for rest_id in restaurant_ids}
-
-    # Create combinations for the base data
-    combinations = []
-    for rest_id in restaurant_ids:
-        for item_id in inventory_item_ids:
-            for date in business_dates:
-                combinations.append({"restaurant_id": rest_id, "inventory_item_id": item_id, "business_date": date, "dma_id": restaurant_dma[rest_id], "dc_id": restaurant_dc[rest_id], "state": restaurant_state[rest_id]})
-
-    # Define schema for base DataFrame
-    schema = StructType([StructField("restaurant_id", StringType(), False), StructField("inventory_item_id", StringType(), False), StructField("business_date", StringType(), False), StructField("dma_id", StringType(), False), StructField("dc_id", StringType(), False), StructField("state", StringType(), False)])
-
-    # Create Spark DataFrame from combinations
-    base_df = spark.createDataFrame(combinations, schema)
-
-    # Store model parameters in dictionary
-    model_params = {"restaurant_effects": restaurant_effects, "item_effects": item_effects, "decay_effects": decay_effects, "start_date": start_date}
-
-    print(f"Created base dataframe with {base_df.count()} combinations")
+    print(f"Created base dataframe with {len(restaurant_ids) * len(inventory_item_ids) * len(model_params['business_dates'])} combinations")
 
     return base_df, model_params
 
 
-def calculate_day_of_week_effect(date_str):
+def day_of_week_effect_expr(date_col):
     """
-    Calculate day of week effect for a given date.
+    Native Spark expression equivalent of calculate_day_of_week_effect.
 
-    Parameters:
-    - date_str: Date string in format "%Y-%m-%d"
-
-    Returns:
-    - day_of_week_effect: Float representing the day of week effect
+    Spark's dayofweek is 1=Sunday..7=Saturday, so (dayofweek + 4) % 7 gives the same
+    Tuesday-based shift as (weekday - 1) % 7 on Python's Monday=0 weekday.
     """
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-    weekday = date_obj.weekday()  # 0=Monday, 1=Tuesday, ..., 6=Sunday
-
-    # Adjust so Tuesday (1) is lowest and Saturday (5) is highest
-    # Shift so Tuesday is at 0 in our function
-    shifted_dow = (weekday - 1) % 7
-    # Scale to cover a full cycle over 7 days
-    angle = 2 * np.pi * shifted_dow / 7
-    # Cosine will be minimum at 0 (Tuesday) and maximum at π (roughly Saturday)
-    # Multiply by 7.5 to amplify the day of week effect
-    return 7.5 * np.cos(angle)
+    shifted_dow = pmod(dayofweek(date_col) + 4, 7)
+    return lit(7.5) * cos(lit(2 * np.pi) * shifted_dow / 7)
 
 
 def create_parameter_df(base_df, model_params):
     """
     Create a DataFrame with calculated parameters for each combination.
 
+    Effects are joined in from small broadcast DataFrames and date terms are native
+    expressions, so the whole stage runs in the JVM without Python UDF round trips.
+
     Parameters:
     - base_df: Spark DataFrame with base data combinations
     - model_params: Dictionary of model parameters
@@ -146,30 +101,21 @@ def create_parameter_df(base_df, model_params):
     decay_effects = model_params["decay_effects"]
     start_date = model_params["start_date"]
 
-    # Create UDFs for parameter calculations
-    @udf(returnType=FloatType())
-    def calculate_restaurant_effect(rest_id):
-        return float(restaurant_effects.get(rest_id, 0.0))
+    spark = base_df.sparkSession
 
-    @udf(returnType=FloatType())
-    def calculate_item_effect(item_id):
-        return float(item_effects.get(item_id, 0.0))
+    # Small lookup DataFrames for the effects (one row per restaurant / item)
+    rest_effect_schema = StructType([StructField("restaurant_id", StringType(), False), StructField("rest_effect", FloatType(), False)])
+    rest_effect_df = spark.createDataFrame([(rest_id, float(effect)) for rest_id, effect in restaurant_effects.items()], rest_effect_schema)
 
-    @udf(returnType=FloatType())
-    def calculate_decay_effect(item_id):
-        return float(decay_effects.get(item_id, 0.95))
+    item_effect_schema = StructType([StructField("inventory_item_id", StringType(), False), StructField("item_effect", FloatType(), False), StructField("decay_effect", FloatType(), False)])
+    item_effect_df = spark.createDataFrame([(item_id, float(item_effects.get(item_id, 0.0)), float(decay_effects.get(item_id, 0.95))) for item_id in set(item_effects) | set(decay_effects)], item_effect_schema)
 
-    @udf(returnType=FloatType())
-    def calculate_dow_effect(date_str):
-        return float(calculate_day_of_week_effect(date_str))
+    # Broadcast-join the effects; missing keys fall back to the same defaults as before
+    param_df = base_df.join(broadcast(rest_effect_df), "restaurant_id", "left").join(broadcast(item_effect_df), "inventory_item_id", "left").withColumn("rest_effect", coalesce(col("rest_effect"), lit(0.0).cast("float"))).withColumn("item_effect", coalesce(col("item_effect"), lit(0.0).cast("float"))).withColumn("decay_effect", coalesce(col("decay_effect"), lit(0.95).cast("float")))
 
-    @udf(returnType=IntegerType())
-    def calculate_days_from_start(date_str):
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        return (date_obj - start_date.date()).days
-
-    # Add parameter columns to the base DataFrame
-    param_df = base_df.withColumn("rest_effect", calculate_restaurant_effect(col("restaurant_id"))).withColumn("item_effect", calculate_item_effect(col("inventory_item_id"))).withColumn("decay_effect", calculate_decay_effect(col("inventory_item_id"))).withColumn("dow_effect", calculate_dow_effect(col("business_date"))).withColumn("days_from_start", calculate_days_from_start(col("business_date")))
+    # Date terms as native expressions
+    business_date = to_date(col("business_date"))
+    param_df = param_df.withColumn("dow_effect", day_of_week_effect_expr(business_date).cast("float")).withColumn("days_from_start", datediff(business_date, lit(start_date.date())))
 
     # Calculate base value and decayed value
     param_df = param_df.withColumn("base_value", col("rest_effect") + col("item_effect") + col("dow_effect")).withColumn("decayed_value", col("base_value") * expr("pow(decay_effect, days_from_start)"))
@@ -177,18 +123,86 @@ def create_parameter_df(base_df, model_params):
     return param_df
 
 
-def run_simulations(param_df, n_simulations=1000):
+def combination_key_expr():
+    """64-bit key identifying a restaurant/item/date combination, computed in the JVM"""
+    return xxhash64(col("restaurant_id"), col("inventory_item_id"), col("business_date"))
+
+
+def run_analytic_forecast(param_df):
+    """
+    Closed-form quantile forecasts as native expressions (no sampling, no Python workers).
+
+    Parameters:
+    - param_df: Spark DataFrame with calculated parameters
+
+    Returns:
+    - forecast_df: Spark DataFrame with quantile forecasts
+    """
+    quantile_cols = [greatest(lit(0.0), col("decayed_value") + lit(z)).cast("float").alias(name) for name, z in QUANTILE_Z.items()]
+    return param_df.select(*FORECAST_COLUMNS[:6], *quantile_cols)
+
+
+def validate_analytic_mode(param_df, n_simulations=1000, engine="pandas_udf", seed=SIMULATION_SEED, tolerance=None):
+    """
+    Compare analytic quantiles against a Monte Carlo run of the same combinations.
+
+    Parameters:
+    - param_df: Spark DataFrame with calculated parameters
+    - n_simulations: Number of simulations for the Monte Carlo side
+    - engine: Monte Carlo engine to compare against
+    - seed: Root seed for the simulation streams
+    - tolerance: Max allowed absolute difference (default: monte_carlo_tolerance)
+
+    Returns:
+    - report: Dictionary with the max absolute difference per quantile and a pass flag
+    """
+    tolerance = monte_carlo_tolerance(n_simulations) if tolerance is None else tolerance
+    keys = FORECAST_COLUMNS[:3]
+
+    analytic_df = run_analytic_forecast(param_df).select(*keys, *[col(name).alias(f"{name}_analytic") for name in QUANTILE_Z])
+    monte_carlo_df, _ = run_simulations(param_df, n_simulations, engine, seed, mode="monte_carlo")
+
+    diffs = monte_carlo_df.join(analytic_df, keys).agg(*[spark_max(spark_abs(col(name) - col(f"{name}_analytic"))).alias(name) for name in QUANTILE_Z]).first()
+    max_abs_diff = {name: float(diffs[name] or 0.0) for name in QUANTILE_Z}
+
+    report = {"n_simulations": n_simulations, "engine": engine, "tolerance": tolerance, "max_abs_diff": max_abs_diff, "passed": all(diff <= tolerance for diff in max_abs_diff.values())}
+    print(f"Analytic vs Monte Carlo ({engine}, {n_simulations} sims): {report}")
+    return report
+
+
+def run_simulations(param_df, n_simulations=1000, engine="pandas_udf", seed=SIMULATION_SEED, mode="monte_carlo", sketch_k=None, adaptive_tolerance=ADAPTIVE_TOLERANCE, adaptive_max_simulations=ADAPTIVE_MAX_SIMS):
     """
     Run Monte Carlo simulations for each combination in parallel.
 
     Parameters:
     - param_df: Spark DataFrame with calculated parameters
     - n_simulations: Number of simulations to run per combination
+    - engine: "pandas_udf" (vectorized, per-combination streams) or "udf" (original row-at-a-time engine)
+    - seed: Root seed for the simulation streams
+    - mode: "monte_carlo" samples paths; "analytic" uses the closed-form quantiles of the
+      current model (n_simulations, engine and seed are ignored); "adaptive" samples in
+      rounds per combination until its quantile CIs converge (pandas_udf engine only)
+    - sketch_k: With the pandas_udf engine, stream paths in chunks through a mergeable
+      quantile sketch of this size so memory per combination is constant in n_simulations
+    - adaptive_tolerance: Target CI half-width per quantile in adaptive mode (None: precision of a fixed n_simulations run)
+    - adaptive_max_simulations: Per-combination path budget in adaptive mode (None: n_simulations)
 
     Returns:
-    - forecast_df: Spark DataFrame with quantile forecasts
-    - sample_sim_df: Spark DataFrame with sample simulations (for verification)
+    - forecast_df: Spark DataFrame with quantile forecasts (plus n_simulations in adaptive mode)
+    - sample_sim_df: Spark DataFrame with sample simulations (for verification), None in analytic mode
     """
+    if mode not in SIMULATION_MODES:
+        raise ValueError(f"Unknown simulation mode: {mode}")
+    if mode == "analytic":
+        return run_analytic_forecast(param_df), None
+    if engine not in SIMULATION_ENGINES:
+        raise ValueError(f"Unknown simulation engine: {engine}")
+    if engine == "pandas_udf":
+        return run_vectorized_simulations(param_df, n_simulations, seed, sketch_k, mode, adaptive_tolerance, adaptive_max_simulations)
+    if sketch_k or mode == "adaptive":
+        raise ValueError("Quantile sketches and adaptive mode require the pandas_udf engine")
+
+    spark = param_df.sparkSession
 
     # Create UDF to generate simulations
     @udf(returnType=ArrayType(FloatType()))
@@ -247,22 +261,188 @@ def run_simulations(param_df, n_simulations=1000):
     return forecast_df, sample_sim_df
 
 
-def generate_forecast_data(spark):
+def run_vectorized_simulations(param_df, n_simulations=1000, seed=SIMULATION_SEED, sketch_k=None, mode="monte_carlo", adaptive_tolerance=ADAPTIVE_TOLERANCE, adaptive_max_simulations=ADAPTIVE_MAX_SIMS):
+    """
+    Vectorized Monte Carlo engine built on Arrow-batched pandas UDFs.
+
+    Each Arrow batch draws one (batch, n_simulations) noise matrix and reduces it to
+    y_05/y_50/y_95 in place, so no per-row simulation arrays are materialized or cached.
+
+    Parameters:
+    - param_df: Spark DataFrame with calculated parameters
+    - n_simulations: Number of simulations to run per combination
+    - seed: Root seed for the simulation streams
+    - sketch_k: Stream paths through a QuantileSketch of this size instead of one full matrix
+    - mode: "monte_carlo" or "adaptive"
+    - adaptive_tolerance: Target CI half-width per quantile in adaptive mode (None: precision of a fixed n_simulations run)
+    - adaptive_max_simulations: Per-combination path budget in adaptive mode (None: n_simulations)
+
+    Returns:
+    - forecast_df: Spark DataFrame with quantile forecasts
+    - sample_sim_df: Spark DataFrame with sample simulations (for verification)
+    """
+
+    @pandas_udf(QUANTILE_SCHEMA)
+    def simulate_quantiles(decayed_value: pd.Series, sim_key: pd.Series) -> pd.DataFrame:
+        return monte_carlo_quantile_batch(decayed_value.to_numpy(), sim_key.to_numpy(), n_simulations, seed, sketch_k)
+
+    @pandas_udf(ADAPTIVE_SCHEMA)
+    def simulate_adaptive_quantiles(decayed_value: pd.Series, sim_key: pd.Series) -> pd.DataFrame:
+        return adaptive_quantile_batch(decayed_value.to_numpy(), sim_key.to_numpy(), seed, adaptive_tolerance, adaptive_max_simulations, n_simulations=n_simulations)
+
+    @pandas_udf(ArrayType(FloatType()))
+    def sample_paths(decayed_value: pd.Series, sim_key: pd.Series) -> pd.Series:
+        # The first paths of each stream match the ones used for the quantiles
+        sales_values = np.maximum(0, decayed_value.to_numpy()[:, None] + simulate_noise(sim_key.to_numpy(), SAMPLE_PATHS, seed))
+        return pd.Series(list(sales_values.astype(np.float32)))
+
+    keyed_df = param_df.withColumn("sim_key", combination_key_expr())
+
+    quantile_udf = simulate_adaptive_quantiles if mode == "adaptive" else simulate_quantiles
+    forecast_df = keyed_df.withColumn("quantiles", quantile_udf(col("decayed_value"), col("sim_key"))).select(*FORECAST_COLUMNS[:6], "quantiles.*")
+
+    # Sample paths for the first combinations only (verification)
+    sample_sim_df = keyed_df.limit(SAMPLE_ROWS).withColumn("sales_simulations", sample_paths(col("decayed_value"), col("sim_key"))).select(*FORECAST_COLUMNS[:6], posexplode(col("sales_simulations")).alias("simulation_id", "sales_value"))
+
+    return forecast_df, sample_sim_df
+
+
+def run_hierarchical_simulations(param_df, n_simulations=1000, seed=SIMULATION_SEED):
+    """
+    Coherent DC / DMA / state quantile forecasts from summed simulation paths.
+
+    Each inventory item/date group is rolled up inside one pandas task: restaurant paths are
+    drawn from the same streams as the pandas_udf engine, summed into running totals per
+    rollup member chunk by chunk, and reduced to quantiles. The path matrix is never written
+    out or shuffled; only parameter rows move.
+
+    Parameters:
+    - param_df: Spark DataFrame with calculated parameters
+    - n_simulations: Number of simulation paths
+    - seed: Root seed for the simulation streams
+
+    Returns:
+    - aggregate_df: Spark DataFrame with level, level_id, inventory_item_id, business_date and quantiles
+    """
+    keyed_df = param_df.withColumn("sim_key", combination_key_expr()).select("inventory_item_id", "business_date", *HIERARCHY_LEVELS.values(), "decayed_value", "sim_key")
+
+    def rollup_group(group_df):
+        return aggregate_path_quantiles(group_df, n_simulations, seed)
+
+    return keyed_df.groupBy("inventory_item_id", "business_date").applyInPandas(rollup_group, schema=AGGREGATE_SCHEMA)
+
+
+def run_incremental_simulations(param_df, store_path, n_simulations=1000, engine="pandas_udf", seed=SIMULATION_SEED, mode="monte_carlo", **simulation_kwargs):
+    """
+    Re-simulate only combinations whose parameter fingerprint changed since the last run.
+
+    Every combination's inputs (effects, date, day offset) and the run settings are hashed
+    into a fingerprint. Results are stored as Parquet keyed by restaurant/item/date with their
+    fingerprint; matching rows are reused, new or changed ones are simulated, and the merged
+    result replaces the store.
+
+    Parameters:
+    - param_df: Spark DataFrame with calculated parameters
+    - store_path: Parquet directory (local path or S3 URI) holding previous results
+    - n_simulations, engine, seed, mode, simulation_kwargs: passed to run_simulations
+
+    Returns:
+    - forecast_df: Spark DataFrame with quantile forecasts for every combination
+    - sample_sim_df: Sample simulations for the re-simulated combinations
+    - stats: Dictionary with reused and simulated combination counts
+    """
+    spark = param_df.sparkSession
+    settings = simulation_settings(n_simulations, seed, mode, **simulation_kwargs)
+    if mode != "analytic":
+        settings += f"|engine={engine}"
+    keyed_df = param_df.withColumn("fingerprint", xxhash64(*[col(name) for name in FINGERPRINT_COLUMNS], lit(settings)))
+
+    try:
+        cached_df = spark.read.parquet(store_path)
+    except AnalysisException:
+        cached_df = None
+
+    if cached_df is not None:
+        # Hierarchy attributes aren't fingerprinted, so reused rows take the current ones
+        reused_df = cached_df.drop(*ATTRIBUTE_COLUMNS).join(keyed_df.select(*KEY_COLUMNS, *ATTRIBUTE_COLUMNS, "fingerprint"), KEY_COLUMNS + ["fingerprint"], "inner")
+        changed_df = keyed_df.join(cached_df.select(*KEY_COLUMNS, "fingerprint"), KEY_COLUMNS + ["fingerprint"], "left_anti")
+    else:
+        reused_df = None
+        changed_df = keyed_df
+
+    n_changed = changed_df.count()
+    forecast_df, sample_sim_df = run_simulations(changed_df, n_simulations, engine, seed, mode, **simulation_kwargs)
+    forecast_df = forecast_df.join(changed_df.select(*KEY_COLUMNS, "fingerprint"), KEY_COLUMNS)
+    if reused_df is not None:
+        # n_simulations exists only in adaptive runs, and the store may predate a mode change
+        forecast_df = forecast_df.unionByName(reused_df, allowMissingColumns=True).select(*forecast_df.columns)
+
+    # Materialize before overwriting the store this plan reads from
+    forecast_df = forecast_df.localCheckpoint()
+    forecast_df.write.mode("overwrite").parquet(store_path)
+
+    stats = {"reused": forecast_df.count() - n_changed, "simulated": n_changed}
+    print(f"Incremental simulation: {stats['simulated']} combinations simulated, {stats['reused']} reused from {store_path}")
+    return forecast_df.drop("fingerprint"), sample_sim_df, stats
+
+
+def write_forecast_parquet(forecast_df, output_path, target_file_mb=TARGET_FILE_MB):
+    """
+    Persist forecasts as business_date-partitioned Parquet for the Athena forecast table.
+
+    Rows are repartitioned by business_date so each date is written by one task, and
+    maxRecordsPerFile rolls files near the target size. Dynamic partition overwrite replaces
+    only the dates in this run, and a manifest of the written objects is saved under
+    <output>/_manifests/ for downstream sync.
+
+    Parameters:
+    - forecast_df: Spark DataFrame with forecast columns
+    - output_path: Local directory or S3 URI
+    - target_file_mb: Approximate Parquet file size
+
+    Returns:
+    - manifest: Dictionary describing the written objects
+    """
+    spark = forecast_df.sparkSession
+    spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
+
+    # Same column types as forecast_data (integer ids, double quantiles)
+    output_df = forecast_df.select(col("restaurant_id").cast("int"), col("inventory_item_id").cast("int"), "business_date", "dma_id", col("dc_id").cast("int"), "state", *[col(name).cast("double") for name in QUANTILE_Z]).persist()
+
+    try:
+        output_df.repartition("business_date").sortWithinPartitions("business_date", "restaurant_id", "inventory_item_id").write.mode("overwrite").partitionBy("business_date").option("maxRecordsPerFile", rows_per_file(target_file_mb)).option("compression", "snappy").parquet(output_path)
+
+        business_dates = [row.business_date for row in output_df.select("business_date").distinct().collect()]
+        rows = output_df.count()
+    finally:
+        output_df.unpersist()
+
+    return write_manifest(output_path, new_run_id(), list_partition_files(output_path, business_dates), rows)
+
+
+def generate_forecast_data(spark, config=None):
     """
     Generate restaurant sales forecast data using Spark for distributed computation.
 
     Parameters:
     - spark: SparkSession object
+    - config: Dictionary containing simulation parameters (default: DEFAULT_CONFIG)
 
     Returns:
     - forecast_df: Spark DataFrame with forecasted sales quantiles
     - sample_sim_df: Spark DataFrame with sample simulations (for verification)
     """
     # Set configuration parameters
-    config = {"n_restaurants": 1, "n_inventory_items": 2, "n_simulations": 1000, "start_date": datetime(2025, 1, 1), "end_date": datetime(2025, 4, 1)}
+    config = {**DEFAULT_CONFIG, **(config or {})}
 
     print(f"Generating forecast data with {config['n_restaurants']} restaurants, " + f"{config['n_inventory_items']} items, " + f"and {(config['end_date'] - config['start_date']).days} days...")
-    print(f"Running {config['n_simulations']} simulations...")
+    if config["mode"] == "analytic":
+        print("Computing analytic quantiles...")
+    elif config["mode"] == "adaptive":
+        tolerance, max_sims = adaptive_limits(config["n_simulations"], config["adaptive_tolerance"], config["adaptive_max_simulations"])
+        print(f"Running adaptive simulations (tolerance {tolerance:.3f}, up to {max_sims} per combination)...")
+    else:
+        print(f"Running {config['n_simulations']} simulations...")
 
     # Generate base data and model parameters
     base_df, model_params = generate_base_data(spark, config)
@@ -270,20 +450,65 @@ def generate_forecast_data(spark):
     # Calculate parameters for each combination
     param_df = create_parameter_df(base_df, model_params)
 
-    # Run simulations in parallel
-    forecast_df, sample_sim_df = run_simulations(param_df, config["n_simulations"])
+    # Run simulations in parallel, reusing unchanged combinations when a store is configured
+    simulation_kwargs = {"sketch_k": config["sketch_k"], "adaptive_tolerance": config["adaptive_tolerance"], "adaptive_max_simulations": config["adaptive_max_simulations"]}
+    if config["store_path"]:
+        forecast_df, sample_sim_df, _ = run_incremental_simulations(param_df, config["store_path"], config["n_simulations"], config["engine"], config["seed"], config["mode"], **simulation_kwargs)
+    else:
+        forecast_df, sample_sim_df = run_simulations(param_df, config["n_simulations"], config["engine"], config["seed"], config["mode"], **simulation_kwargs)
+
+    # Coherent DC / DMA / state rollups from the same paths
+    if config["hierarchy"]:
+        aggregate_df = run_hierarchical_simulations(param_df, config["n_simulations"], config["seed"])
+        aggregate_df.createOrReplaceTempView("forecast_aggregates")
+        print("Rollup forecasts saved to temp view 'forecast_aggregates'")
 
     return forecast_df, sample_sim_df
 
 
-def main():
+def run_local(config):
+    """Generate and summarize forecast data with the local NumPy engine (no JVM)."""
+    print(f"Using local NumPy engine for {local_forecast_simulation.count_combinations(config)} combinations")
+    forecast_df, sample_sim_df = local_forecast_simulation.generate_forecast_data(config)
+
+    print("\nSample of forecast data:")
+    print(forecast_df.head(5))
+
+    print("\nDataset dimensions:")
+    print(f"Number of restaurants: {forecast_df['restaurant_id'].nunique()}")
+    print(f"Number of inventory items: {forecast_df['inventory_item_id'].nunique()}")
+    print(f"Number of business dates: {forecast_df['business_date'].nunique()}")
+    print(f"Total rows in forecast: {len(forecast_df)}")
+
+    if sample_sim_df is not None:
+        print("\nSimulation summary:")
+        print(f"Sample simulations stored: {len(sample_sim_df)} rows")
+
+    if config["output_path"]:
+        local_forecast_simulation.write_forecast_parquet(forecast_df, config["output_path"], config["target_file_mb"])
+
+    if config["hierarchy"]:
+        aggregate_df = local_forecast_simulation.generate_hierarchical_forecast(config)
+        print("\nSample of rollup forecasts:")
+        print(aggregate_df.head(5))
+
+    return forecast_df, sample_sim_df
+
+
+def main(config=None):
     """Main function to generate and display data."""
+    config = {**DEFAULT_CONFIG, **(config or {})}
+
+    # Small configurations never need a JVM
+    if select_backend(config) == "local":
+        return run_local(config)
+
     # Initialize Spark session
     spark = create_spark_session()
 
     try:
         # Generate the forecast data and simulations
-        forecast_df, sample_sim_df = generate_forecast_data(spark)
+        forecast_df, sample_sim_df = generate_forecast_data(spark, config)
 
         # Display sample of forecast data
         print("\nSample of forecast data:")
@@ -315,9 +540,11 @@ def main():
             print("\nQuantiles calculated from sample simulations (for verification):")
             sim_quantiles.show(5)
 
-        # Save the data to temp views instead of Parquet files
+        # Save the data to temp views, and to partitioned Parquet when an output path is set
         forecast_df.createOrReplaceTempView("forecast_results")
         print("\nForecast data saved to temp view 'forecast_results'")
+        if config["output_path"]:
+            write_forecast_parquet(forecast_df, config["output_path"], config["target_file_mb"])
 
         if sample_sim_df is not None:
             sample_sim_df.createOrReplaceTempView("simulation_samples")
@@ -341,9 +568,8 @@ def main():
     finally:
         # Note: Temp views are only available during the Spark session
         print("\nNote: Temp views are only available during the current Spark session.")
-        print("To persist the data, you can run:")
-        print('   forecast_df.write.mode("overwrite").saveAsTable("permanent_forecast_results")')
-        print('   sample_sim_df.write.mode("overwrite").saveAsTable("permanent_simulation_samples")')
+        if not config["output_path"]:
+            print("To persist the data for the Athena forecast table, set config['output_path'] (local path or S3 URI)")
 
         # Stop Spark session to release resources
         spark.stop()
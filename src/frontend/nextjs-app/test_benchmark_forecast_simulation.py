@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the forecast simulation benchmark suite
+"""
+
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+import benchmark_forecast_simulation
+from benchmark_forecast_simulation import DEFAULT_CONFIG, run_case
+
+
+def crashing_case(engine, config, queue):
+    """Case process that dies without reporting, like an OOM kill"""
+    os._exit(137)
+
+
+def hanging_case(engine, config, queue):
+    """Case process that never finishes"""
+    time.sleep(60)
+
+
+def reporting_case(engine, config, queue):
+    """Case process that reports a result"""
+    queue.put({"status": "ok", "rows": config["n_restaurants"]})
+
+
+class TestRunCase(unittest.TestCase):
+    """Test cases for running benchmark cases in a subprocess"""
+
+    @patch("benchmark_forecast_simulation.POLL_SECONDS", 0.1)
+    def test_result_reported(self):
+        """Test the case result is returned from the subprocess"""
+        with patch.object(benchmark_forecast_simulation, "benchmark_case", reporting_case):
+            result = run_case("numpy_analytic", {**DEFAULT_CONFIG, "n_restaurants": 7})
+
+        self.assertEqual(result, {"status": "ok", "rows": 7})
+
+    @patch("benchmark_forecast_simulation.POLL_SECONDS", 0.1)
+    def test_crashed_case_recorded_as_error(self):
+        """Test a case process that dies without a result is recorded as failed"""
+        with patch.object(benchmark_forecast_simulation, "benchmark_case", crashing_case):
+            result = run_case("numpy_analytic", DEFAULT_CONFIG)
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("exited with code 137", result["error"])
+
+    @patch("benchmark_forecast_simulation.POLL_SECONDS", 0.1)
+    def test_hanging_case_times_out(self):
+        """Test a case running past the timeout is terminated and recorded as failed"""
+        start = time.monotonic()
+        with patch.object(benchmark_forecast_simulation, "benchmark_case", hanging_case):
+            result = run_case("numpy_analytic", DEFAULT_CONFIG, timeout=1)
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("timed out", result["error"])
+        self.assertLess(time.monotonic() - start, 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local forecast simulation engine
+"""
+
+import os
+import tempfile
+import tracemalloc
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from local_forecast_simulation import DEFAULT_CONFIG, FORECAST_COLUMNS, QUANTILE_Z, QuantileSketch, adaptive_limits, adaptive_quantile_batch, analytic_quantile_batch, create_parameter_df, generate_base_data, run_incremental_simulations, simulate_quantile_batch, simulate_sketch, sketch_quantiles
+
+
+class TestQuantileSketch(unittest.TestCase):
+    """Test cases for streaming quantile sketches"""
+
+    def test_sketch_rank_error(self):
+        """Test sketch quantiles stay within a small rank error of the exact quantiles"""
+        rng = np.random.default_rng(0)
+        values = rng.standard_normal((4, 200_000))
+        sketch = QuantileSketch(4, k=400, seed=1)
+        for start in range(0, values.shape[1], 10_000):
+            sketch.update(values[:, start : start + 10_000])
+
+        for fraction, estimates in zip([0.05, 0.5, 0.95], sketch.quantiles([0.05, 0.5, 0.95])):
+            ranks = (values < estimates[:, None]).mean(axis=1)
+            np.testing.assert_array_less(np.abs(ranks - fraction), 0.01)
+
+    def test_merged_sketches_match_single_sketch(self):
+        """Test sketches for disjoint path blocks merge to the accuracy of one sketch"""
+        decayed_values = np.array([5.0, 20.0, 50.0])
+        sim_keys = np.array([11, 22, 33])
+
+        merged = simulate_sketch(decayed_values, sim_keys, 20_000, path_block=0).merge(simulate_sketch(decayed_values, sim_keys, 20_000, path_block=1))
+        exact = simulate_quantile_batch(decayed_values, sim_keys, 40_000)
+
+        self.assertEqual(merged.count, 40_000)
+        np.testing.assert_allclose(sketch_quantiles(merged).to_numpy(), exact.to_numpy(), atol=0.1)
+
+    @patch("local_forecast_simulation.SKETCH_CHUNK_ELEMENTS", 50_000)
+    def test_chunk_memory_flat_in_path_count(self):
+        """Test peak allocation is bounded by the chunk element budget, not by n_sims"""
+        sim_keys = np.arange(500)
+        decayed_values = np.full(len(sim_keys), 10.0)
+
+        def peak_bytes(n_rows, n_sims):
+            tracemalloc.start()
+            simulate_sketch(decayed_values[:n_rows], sim_keys[:n_rows], n_sims, sketch_k=50)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        small, large = peak_bytes(500, 2_000), peak_bytes(500, 20_000)
+        self.assertLess(large, small * 1.5)
+
+        # A fixed 10,000-path chunk over 500 rows alone would allocate 40 MB
+        self.assertLess(large, 500 * 10_000 * 8 / 4)
+
+
+class TestAdaptiveSimulations(unittest.TestCase):
+    """Test cases for adaptive sequential Monte Carlo"""
+
+    def setUp(self):
+        self.decayed_values = np.concatenate([np.linspace(0, 50, 300), -np.linspace(0, 5, 100)])
+        self.sim_keys = np.arange(len(self.decayed_values))
+
+    def test_defaults_stay_within_fixed_budget(self):
+        """Test default settings use at most n_simulations paths and match its precision"""
+        tolerance, max_sims = adaptive_limits(1000)
+        quantiles = adaptive_quantile_batch(self.decayed_values, self.sim_keys, n_simulations=1000)
+
+        self.assertEqual(max_sims, 1000)
+        self.assertLessEqual(quantiles["n_simulations"].max(), 1000)
+        self.assertLess(quantiles["n_simulations"].mean(), 1000)
+        # Series censored at zero converge after the first round
+        self.assertTrue((quantiles["n_simulations"].to_numpy()[-50:] == 500).all())
+
+        exact = analytic_quantile_batch(self.decayed_values)
+        self.assertLess(np.abs(quantiles[list(QUANTILE_Z)].to_numpy() - exact.to_numpy()).max(), 3 * tolerance)
+
+    def test_blocks_bound_memory_without_changing_results(self):
+        """Test splitting rows into element-budget blocks gives the same quantiles"""
+        whole = adaptive_quantile_batch(self.decayed_values, self.sim_keys, tolerance=0.05, max_sims=4_000)
+
+        with patch("local_forecast_simulation.ADAPTIVE_CHUNK_ELEMENTS", 40_000):
+            tracemalloc.start()
+            blocked = adaptive_quantile_batch(self.decayed_values, self.sim_keys, tolerance=0.05, max_sims=4_000)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        pd.testing.assert_frame_equal(whole, blocked)
+        # 10 rows per block; all 400 rows at 4,000 paths would be 12.8 MB per copy
+        self.assertLess(peak, 400 * 4_000 * 8 / 4)
+
+
+class TestIncrementalSimulations(unittest.TestCase):
+    """Test cases for fingerprint-based incremental re-simulation"""
+
+    def setUp(self):
+        config = {**DEFAULT_CONFIG, "n_restaurants": 3, "n_inventory_items": 2, "end_date": datetime(2025, 1, 5)}
+        self.param_df = create_parameter_df(*generate_base_data(config))
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.store_path = os.path.join(self.tempdir.name, "store.parquet")
+        self.restaurant_id = self.param_df["restaurant_id"].iloc[0]
+        self.restaurant_rows = (self.param_df["restaurant_id"] == self.restaurant_id).to_numpy()
+        self.n_rows = len(self.param_df)
+
+    def run_incremental(self, param_df, **kwargs):
+        return run_incremental_simulations(param_df, self.store_path, n_simulations=200, workers=1, **kwargs)
+
+    def test_unchanged_combinations_reused(self):
+        """Test a second run reuses every combination and returns the same forecasts"""
+        first, _, first_stats = self.run_incremental(self.param_df)
+        second, sample_sim_df, second_stats = self.run_incremental(self.param_df)
+
+        self.assertEqual(first_stats, {"reused": 0, "simulated": self.n_rows})
+        self.assertEqual(second_stats, {"reused": self.n_rows, "simulated": 0})
+        self.assertIsNone(sample_sim_df)
+        pd.testing.assert_frame_equal(first, second, check_dtype=False)
+
+    def test_changed_parameters_resimulated(self):
+        """Test only combinations whose effects changed are simulated again"""
+        self.run_incremental(self.param_df)
+        changed = self.param_df.copy()
+        changed.loc[self.restaurant_rows, "rest_effect"] += 1
+
+        _, _, stats = self.run_incremental(changed)
+
+        self.assertEqual(stats, {"reused": self.n_rows - self.restaurant_rows.sum(), "simulated": self.restaurant_rows.sum()})
+
+    def test_reused_rows_take_current_hierarchy(self):
+        """Test a hierarchy change updates reused rows without re-simulating them"""
+        self.run_incremental(self.param_df)
+        moved = self.param_df.copy()
+        moved.loc[self.restaurant_rows, ["dma_id", "dc_id", "state"]] = ["ZZZ", "99", "WA"]
+
+        forecast_df, _, stats = self.run_incremental(moved)
+
+        self.assertEqual(stats, {"reused": self.n_rows, "simulated": 0})
+        self.assertEqual(list(forecast_df.columns), FORECAST_COLUMNS)
+        moved_rows = forecast_df[forecast_df["restaurant_id"] == self.restaurant_id]
+        self.assertEqual(set(moved_rows["dma_id"]), {"ZZZ"})
+        self.assertEqual(set(moved_rows["state"]), {"WA"})
+        self.assertEqual((pd.read_parquet(self.store_path)["dma_id"] == "ZZZ").sum(), self.restaurant_rows.sum())
+
+    def test_mode_change_resimulates(self):
+        """Test switching from adaptive to Monte Carlo drops the stored adaptive results"""
+        self.run_incremental(self.param_df, mode="adaptive")
+
+        forecast_df, _, stats = self.run_incremental(self.param_df)
+
+        self.assertEqual(stats, {"reused": 0, "simulated": self.n_rows})
+        self.assertNotIn("n_simulations", forecast_df.columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
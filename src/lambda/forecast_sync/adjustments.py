@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Set-based engine that materializes adjusted forecasts from forecast_adjustments.
+Each run recomputes adjusted_forecast only for rows whose base forecast changed since the last
+run, or which are matched by an adjustment that was added, changed or deactivated since then,
+and drops rows whose base forecast row was deleted.
+Matching follows the query-time logic of the postgres-forecast API route: inventory item must
+match, empty state/DMA/DC lists match everything, and the business date must fall within the
+adjustment's date range. Matching percentages are summed and applied to y_50.
+"""
+
+import logging
+from typing import Dict, Any
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ADJUSTMENT_SCHEMA_SQL = """
+    -- Materialized adjusted forecasts, maintained incrementally by the adjustment engine
+    CREATE TABLE IF NOT EXISTS adjusted_forecast (
+        restaurant_id INTEGER NOT NULL,
+        inventory_item_id INTEGER NOT NULL,
+        business_date DATE NOT NULL,
+        dma_id VARCHAR(50),
+        dc_id INTEGER,
+        state VARCHAR(50),
+        y_05 DECIMAL(10, 2),
+        y_50 DECIMAL(10, 2),
+        y_95 DECIMAL(10, 2),
+        total_adjustment_percent DECIMAL(10, 2) NOT NULL DEFAULT 0,
+        adjustment_count INTEGER NOT NULL DEFAULT 0,
+        adjusted_y_50 DECIMAL(12, 2),
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (restaurant_id, inventory_item_id, business_date)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_adjusted_forecast_state_date ON adjusted_forecast(state, business_date);
+    CREATE INDEX IF NOT EXISTS idx_adjusted_forecast_item_date ON adjusted_forecast(inventory_item_id, business_date);
+
+    -- Active adjustment definitions as of the last engine run
+    CREATE TABLE IF NOT EXISTS applied_adjustments (
+        id INTEGER PRIMARY KEY,
+        adjustment_value DECIMAL(5, 2) NOT NULL,
+        filter_context JSONB NOT NULL,
+        adjustment_start_date DATE,
+        adjustment_end_date DATE
+    );
+
+    -- Single-row watermark of the newest forecast_data.updated_at already processed
+    CREATE TABLE IF NOT EXISTS adjustment_engine_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_base_updated_at TIMESTAMP,
+        last_run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def json_list(expression: str) -> str:
+    """A filter_context list, treating a missing key, JSON null or a non-array value as empty"""
+    return f"(CASE WHEN jsonb_typeof({expression}) = 'array' THEN {expression} ELSE '[]'::jsonb END)"
+
+
+def match_condition(forecast: str, adjustment: str) -> str:
+    """SQL predicate matching forecast rows to an adjustment definition (aliases supplied by caller)"""
+    f, a = forecast, adjustment
+    states, dma_ids, dc_ids = (json_list(f"{a}.filter_context->'{key}'") for key in ("states", "dmaIds", "dcIds"))
+    return f"""
+        {a}.filter_context->>'inventoryItemId' = {f}.inventory_item_id::text
+        AND {f}.business_date >= {a}.adjustment_start_date
+        AND {f}.business_date <= {a}.adjustment_end_date
+        AND (jsonb_array_length({states}) = 0
+            OR {f}.state IN (SELECT jsonb_array_elements_text({states})))
+        AND (jsonb_array_length({dma_ids}) = 0
+            OR {f}.dma_id IN (SELECT jsonb_array_elements_text({dma_ids})))
+        AND (jsonb_array_length({dc_ids}) = 0
+            OR {f}.dc_id::text IN (SELECT jsonb_array_elements_text({dc_ids})))
+    """
+
+
+def apply_adjustments(cursor, full_rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Bring adjusted_forecast up to date. Runs entirely inside the caller's transaction; the
+    caller commits, so the watermark and adjustment snapshot only advance with the results.
+    """
+    cursor.execute("SELECT to_regclass('forecast_adjustments') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        logger.info("forecast_adjustments table not found, skipping adjustment engine")
+        return {"changed_adjustments": 0, "affected_rows": 0, "deleted_rows": 0}
+
+    cursor.execute("SELECT last_base_updated_at FROM adjustment_engine_state WHERE id = 1")
+    state = cursor.fetchone()
+    watermark = None if full_rebuild or not state else state[0]
+
+    cursor.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS adjustment_affected_rows (
+            restaurant_id INTEGER,
+            inventory_item_id INTEGER,
+            business_date DATE,
+            PRIMARY KEY (restaurant_id, inventory_item_id, business_date)
+        ) ON COMMIT DROP
+    """
+    )
+
+    # Old and new definitions of every adjustment added, changed or deactivated since the last run
+    cursor.execute(
+        """
+        CREATE TEMP TABLE changed_adjustment_defs ON COMMIT DROP AS
+        WITH current_adjustments AS (
+            SELECT id, adjustment_value, filter_context, adjustment_start_date, adjustment_end_date
+            FROM forecast_adjustments
+            WHERE is_active = true
+        ),
+        changed AS (
+            SELECT COALESCE(c.id, p.id) AS id
+            FROM current_adjustments c
+            FULL OUTER JOIN applied_adjustments p ON p.id = c.id
+            WHERE c.id IS NULL
+                OR p.id IS NULL
+                OR c.adjustment_value IS DISTINCT FROM p.adjustment_value
+                OR c.filter_context IS DISTINCT FROM p.filter_context
+                OR c.adjustment_start_date IS DISTINCT FROM p.adjustment_start_date
+                OR c.adjustment_end_date IS DISTINCT FROM p.adjustment_end_date
+        )
+        SELECT filter_context, adjustment_start_date, adjustment_end_date
+        FROM current_adjustments WHERE id IN (SELECT id FROM changed)
+        UNION
+        SELECT filter_context, adjustment_start_date, adjustment_end_date
+        FROM applied_adjustments WHERE id IN (SELECT id FROM changed)
+    """
+    )
+    changed_adjustments = cursor.rowcount
+
+    cursor.execute(
+        f"""
+        INSERT INTO adjustment_affected_rows
+        SELECT f.restaurant_id, f.inventory_item_id, f.business_date
+        FROM forecast_data f
+        JOIN changed_adjustment_defs a ON {match_condition("f", "a")}
+        ON CONFLICT DO NOTHING
+    """
+    )
+
+    # Base forecast rows upserted since the last run (all rows on the first run)
+    cursor.execute(
+        """
+        INSERT INTO adjustment_affected_rows
+        SELECT restaurant_id, inventory_item_id, business_date
+        FROM forecast_data
+        WHERE %s::timestamp IS NULL OR updated_at > %s::timestamp
+        ON CONFLICT DO NOTHING
+    """,
+        (watermark, watermark),
+    )
+
+    cursor.execute(
+        f"""
+        INSERT INTO adjusted_forecast (
+            restaurant_id, inventory_item_id, business_date, dma_id, dc_id, state,
+            y_05, y_50, y_95, total_adjustment_percent, adjustment_count, adjusted_y_50
+        )
+        SELECT
+            f.restaurant_id, f.inventory_item_id, f.business_date, f.dma_id, f.dc_id, f.state,
+            f.y_05, f.y_50, f.y_95,
+            COALESCE(SUM(a.adjustment_value), 0),
+            COUNT(a.id),
+            ROUND(f.y_50 * (1 + COALESCE(SUM(a.adjustment_value), 0) / 100), 2)
+        FROM adjustment_affected_rows k
+        JOIN forecast_data f
+            ON f.restaurant_id = k.restaurant_id
+            AND f.inventory_item_id = k.inventory_item_id
+            AND f.business_date = k.business_date
+        LEFT JOIN forecast_adjustments a ON a.is_active = true AND {match_condition("f", "a")}
+        GROUP BY f.id
+        ON CONFLICT (restaurant_id, inventory_item_id, business_date)
+        DO UPDATE SET
+            dma_id = EXCLUDED.dma_id,
+            dc_id = EXCLUDED.dc_id,
+            state = EXCLUDED.state,
+            y_05 = EXCLUDED.y_05,
+            y_50 = EXCLUDED.y_50,
+            y_95 = EXCLUDED.y_95,
+            total_adjustment_percent = EXCLUDED.total_adjustment_percent,
+            adjustment_count = EXCLUDED.adjustment_count,
+            adjusted_y_50 = EXCLUDED.adjusted_y_50,
+            updated_at = CURRENT_TIMESTAMP
+    """
+    )
+    affected_rows = cursor.rowcount
+
+    # Drop materialized rows whose base forecast row no longer exists
+    cursor.execute(
+        """
+        DELETE FROM adjusted_forecast a
+        WHERE NOT EXISTS (
+            SELECT 1 FROM forecast_data f
+            WHERE f.restaurant_id = a.restaurant_id
+                AND f.inventory_item_id = a.inventory_item_id
+                AND f.business_date = a.business_date
+        )
+    """
+    )
+    deleted_rows = cursor.rowcount
+
+    # Advance the adjustment snapshot and base watermark
+    cursor.execute("DELETE FROM applied_adjustments")
+    cursor.execute(
+        """
+        INSERT INTO applied_adjustments (id, adjustment_value, filter_context, adjustment_start_date, adjustment_end_date)
+        SELECT id, adjustment_value, filter_context, adjustment_start_date, adjustment_end_date
+        FROM forecast_adjustments
+        WHERE is_active = true
+    """
+    )
+    cursor.execute(
+        """
+        INSERT INTO adjustment_engine_state (id, last_base_updated_at, last_run_at)
+        SELECT 1, MAX(updated_at), CURRENT_TIMESTAMP FROM forecast_data
+        ON CONFLICT (id) DO UPDATE SET
+            last_base_updated_at = EXCLUDED.last_base_updated_at,
+            last_run_at = EXCLUDED.last_run_at
+    """
+    )
+
+    logger.info(f"Adjustment engine recomputed {affected_rows} rows and removed {deleted_rows} orphaned rows for {changed_adjustments} changed adjustment definitions")
+    return {"changed_adjustments": changed_adjustments, "affected_rows": affected_rows, "deleted_rows": deleted_rows}
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Lambda function for exporting filtered forecast data to S3.
+CSV exports stream COPY (SELECT ...) TO STDOUT, Parquet exports stream a server-side cursor
+in batches; either way the bytes flow through an optional compressor straight into an S3
+multipart upload, so memory stays bounded by the part size regardless of export size.
+"""
+
+import io
+import os
+import json
+import uuid
+import zlib
+import logging
+from datetime import datetime
+from typing import Dict, Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from index import ForecastSyncHandler, s3_client
+from query import QueryError, normalize_filters, build_where_clause, parse_request
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Environment variables
+EXPORT_BUCKET = os.environ.get("EXPORT_BUCKET")
+EXPORT_PREFIX = os.environ.get("EXPORT_PREFIX", "forecast-exports")
+EXPORT_URL_EXPIRY = int(os.environ.get("EXPORT_URL_EXPIRY", "3600"))
+EXPORT_PART_SIZE = int(os.environ.get("EXPORT_PART_SIZE", str(8 * 1024 * 1024)))
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "50000"))
+
+# S3 rejects non-final parts smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+EXPORT_COLUMNS = ["restaurant_id", "inventory_item_id", "business_date", "dma_id", "dc_id", "state", "y_05", "y_50", "y_95"]
+EXPORT_SCHEMA = pa.schema([("restaurant_id", pa.int32()), ("inventory_item_id", pa.int32()), ("business_date", pa.date32()), ("dma_id", pa.string()), ("dc_id", pa.int32()), ("state", pa.string()), ("y_05", pa.float64()), ("y_50", pa.float64()), ("y_95", pa.float64())])
+
+FORMATS = {"csv": ("csv", "text/csv"), "parquet": ("parquet", "application/vnd.apache.parquet")}
+CSV_COMPRESSIONS = {None: "", "gzip": ".gz"}
+PARQUET_COMPRESSIONS = [None, "snappy", "zstd", "gzip"]
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Write-only file object that uploads its stream to S3 as multipart parts"""
+
+    def __init__(self, client, bucket: str, key: str, content_type: str, part_size: int = EXPORT_PART_SIZE):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.buffer = bytearray()
+        self.parts = []
+        self.position = 0
+        self.upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data) -> int:
+        self.buffer.extend(data)
+        self.position += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[: self.part_size]))
+            del self.buffer[: self.part_size]
+        return len(data)
+
+    def _upload_part(self, body: bytes):
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=body)
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    def close(self):
+        """Upload the final part and complete the multipart upload"""
+        if self.closed:
+            return
+        if self.buffer or not self.parts:
+            self._upload_part(bytes(self.buffer))
+            self.buffer.clear()
+        self.client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts})
+        super().close()
+
+    def abort(self):
+        """Discard all uploaded parts"""
+        if self.closed:
+            return
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        self.buffer.clear()
+        super().close()
+
+
+class GzipWriter(io.RawIOBase):
+    """Streaming gzip compressor in front of another writable file object"""
+
+    def __init__(self, sink: io.RawIOBase):
+        super().__init__()
+        self.sink = sink
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode()
+        self.sink.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.sink.write(self.compressor.flush())
+        self.sink.close()
+        super().close()
+
+
+def rows_to_batch(rows) -> pa.RecordBatch:
+    """Convert a fetchmany() batch into an Arrow record batch"""
+    columns = list(zip(*rows))
+    arrays = []
+    for index, field in enumerate(EXPORT_SCHEMA):
+        values = columns[index]
+        if pa.types.is_floating(field.type):
+            values = [float(v) if v is not None else None for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=EXPORT_SCHEMA)
+
+
+def prepare_export(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate an export request before touching the database"""
+    export_format = request.get("format", "csv")
+    compression = request.get("compression")
+    if export_format not in FORMATS:
+        raise QueryError(f"Invalid format: {export_format}")
+    if export_format == "csv" and compression not in CSV_COMPRESSIONS:
+        raise QueryError(f"Invalid CSV compression: {compression}")
+    if export_format == "parquet" and compression not in PARQUET_COMPRESSIONS:
+        raise QueryError(f"Invalid Parquet compression: {compression}")
+
+    return {"format": export_format, "compression": compression, "filters": normalize_filters(request.get("filters"))}
+
+
+class ForecastExportHandler(ForecastSyncHandler):
+    """Streams filtered forecast_data exports to S3; reuses the sync handler's connection logic"""
+
+    def build_select(self, filters: Dict[str, Any]) -> str:
+        """Render the filtered SELECT with parameters safely bound (COPY cannot take parameters)"""
+        conditions, params = build_where_clause(filters)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM forecast_data {where} ORDER BY business_date, restaurant_id, inventory_item_id"
+        return self.cursor.mogrify(sql, params).decode()
+
+    def export_csv(self, select_sql: str, sink: io.RawIOBase) -> int:
+        """Stream COPY output into the sink; returns rows exported"""
+        self.cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", sink)
+        return self.cursor.rowcount
+
+    def export_parquet(self, select_sql: str, sink: io.RawIOBase, compression: str) -> int:
+        """Stream a server-side cursor into Parquet row groups; returns rows exported"""
+        total_rows = 0
+        with self.connection.cursor(name=f"forecast_export_{uuid.uuid4().hex[:8]}") as server_cursor:
+            server_cursor.itersize = EXPORT_BATCH_ROWS
+            server_cursor.execute(select_sql)
+            with pq.ParquetWriter(sink, EXPORT_SCHEMA, compression=compression or "none") as writer:
+                while True:
+                    rows = server_cursor.fetchmany(EXPORT_BATCH_ROWS)
+                    if not rows:
+                        break
+                    writer.write_batch(rows_to_batch(rows))
+                    total_rows += len(rows)
+        sink.close()
+        return total_rows
+
+    def export(self, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a prepared export request and return a presigned download URL"""
+        if not EXPORT_BUCKET:
+            raise ValueError("EXPORT_BUCKET is not configured")
+
+        export_format, compression = prepared["format"], prepared["compression"]
+        select_sql = self.build_select(prepared["filters"])
+
+        extension, content_type = FORMATS[export_format]
+        suffix = CSV_COMPRESSIONS[compression] if export_format == "csv" else ""
+        key = f"{EXPORT_PREFIX}/{datetime.now():%Y/%m/%d}/{uuid.uuid4()}.{extension}{suffix}"
+
+        writer = S3MultipartWriter(s3_client, EXPORT_BUCKET, key, content_type)
+        try:
+            if export_format == "csv":
+                sink = GzipWriter(writer) if compression == "gzip" else writer
+                rows = self.export_csv(select_sql, sink)
+                sink.close()
+            else:
+                rows = self.export_parquet(select_sql, writer, compression)
+        except Exception:
+            writer.abort()
+            raise
+
+        url = s3_client.generate_presigned_url("get_object", Params={"Bucket": EXPORT_BUCKET, "Key": key}, ExpiresIn=EXPORT_URL_EXPIRY)
+        logger.info(f"Exported {rows} rows ({writer.position} bytes) to s3://{EXPORT_BUCKET}/{key}")
+        return {"url": url, "bucket": EXPORT_BUCKET, "key": key, "rows": rows, "bytes": writer.position, "expires_in": EXPORT_URL_EXPIRY}
+
+
+def lambda_handler(event, context):
+    """Lambda function entry point"""
+    headers = {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}
+
+    try:
+        prepared = prepare_export(parse_request(event))
+        with ForecastExportHandler() as handler:
+            result = handler.export(prepared)
+        return {"statusCode": 200, "headers": headers, "body": json.dumps(result)}
+
+    except (QueryError, json.JSONDecodeError) as e:
+        logger.warning(f"Invalid export request: {str(e)}")
+        return {"statusCode": 400, "headers": headers, "body": json.dumps({"error": str(e)})}
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        return {"statusCode": 500, "headers": headers, "body": json.dumps({"error": str(e), "timestamp": datetime.now().isoformat()})}
@@ -13,8 +13,10 @@ from typing import Dict, List, Any, Optional
 from functools import lru_cache
 import boto3
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_batch, execute_values
 import requests
+from snapshots import publish_snapshots
+from adjustments import ADJUSTMENT_SCHEMA_SQL, apply_adjustments
 
 # Configure logging
 logger = logging.getLogger()
@@ -30,6 +32,10 @@ SSM_NEON_PROJECT_ID_PATH = os.environ.get("SSM_NEON_PROJECT_ID_PATH")
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
 BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "10000"))
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "dev")
+SNAPSHOT_BUCKET = os.environ.get("SNAPSHOT_BUCKET")
+SNAPSHOT_PREFIX = os.environ.get("SNAPSHOT_PREFIX", "forecast-snapshots")
+# Snapshot versions kept in S3, including the current one
+SNAPSHOT_KEEP_VERSIONS = int(os.environ.get("SNAPSHOT_KEEP_VERSIONS", "3"))
 
 # AWS clients
 athena_client = boto3.client("athena", region_name=AWS_REGION)
@@ -181,6 +187,22 @@ class ForecastSyncHandler:
         CREATE INDEX IF NOT EXISTS idx_forecast_inventory ON forecast_data(inventory_item_id);
         CREATE INDEX IF NOT EXISTS idx_forecast_composite ON forecast_data(state, dma_id, dc_id, business_date);
 
+        -- Create dashboard table (kept in sync incrementally by sync_data)
+        CREATE TABLE IF NOT EXISTS dashboard_forecast_view (
+            restaurant_id INTEGER,
+            inventory_item_id INTEGER,
+            business_date DATE,
+            dma_id VARCHAR(50),
+            dc_id INTEGER,
+            state VARCHAR(50),
+            y_05 DECIMAL(10, 2),
+            y_50 DECIMAL(10, 2),
+            y_95 DECIMAL(10, 2)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_dashboard_forecast_slice ON dashboard_forecast_view(state, dma_id, dc_id, business_date);
+        CREATE INDEX IF NOT EXISTS idx_dashboard_forecast_key ON dashboard_forecast_view(restaurant_id, inventory_item_id, business_date);
+
         -- Create sync tracking table
         CREATE TABLE IF NOT EXISTS forecast_sync_status (
             id SERIAL PRIMARY KEY,
@@ -202,15 +224,21 @@ class ForecastSyncHandler:
         END;
         $$ language 'plpgsql';
 
-        DROP TRIGGER IF EXISTS update_forecast_data_updated_at ON forecast_data;
-        CREATE TRIGGER update_forecast_data_updated_at
-            BEFORE UPDATE ON forecast_data
-            FOR EACH ROW
-            EXECUTE FUNCTION update_updated_at_column();
+        -- Only create the trigger when missing: trigger DDL takes an ACCESS EXCLUSIVE lock on forecast_data
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'update_forecast_data_updated_at' AND tgrelid = 'forecast_data'::regclass) THEN
+                CREATE TRIGGER update_forecast_data_updated_at
+                    BEFORE UPDATE ON forecast_data
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_updated_at_column();
+            END IF;
+        END
+        $$;
         """
 
         try:
-            self.cursor.execute(schema_sql)
+            self.cursor.execute(schema_sql + ADJUSTMENT_SCHEMA_SQL)
             self.connection.commit()
             logger.info("Schema created/updated successfully")
         except Exception as e:
@@ -218,6 +246,16 @@ class ForecastSyncHandler:
             self.connection.rollback()
             raise
 
+    def create_adjustment_schema(self):
+        """Create only the adjustment engine tables, taking no locks on forecast_data"""
+        try:
+            self.cursor.execute(ADJUSTMENT_SCHEMA_SQL)
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f"Failed to create adjustment schema: {str(e)}")
+            self.connection.rollback()
+            raise
+
     def get_last_sync_info(self) -> Dict[str, Any]:
         """Get information about the last successful sync"""
         try:
@@ -293,6 +331,108 @@ class ForecastSyncHandler:
         logger.info(f"Query returned {len(results)} records")
         return results
 
+    def track_touched_rows(self, values: List[tuple]):
+        """Record upserted rows in a transaction-scoped temp table for the dashboard refresh"""
+        self.cursor.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS sync_touched_rows (
+                restaurant_id INTEGER,
+                inventory_item_id INTEGER,
+                business_date DATE,
+                dma_id VARCHAR(50),
+                dc_id INTEGER,
+                state VARCHAR(50)
+            ) ON COMMIT DROP
+        """
+        )
+        execute_values(self.cursor, "INSERT INTO sync_touched_rows (restaurant_id, inventory_item_id, business_date, dma_id, dc_id, state) VALUES %s", [value[:6] for value in values], page_size=BATCH_SIZE)
+
+    def refresh_dashboard_view(self) -> int:
+        """
+        Refresh dashboard_forecast_view for the (state, dma, dc, date) slices touched by this sync.
+
+        Must run inside the sync transaction (before commit) so readers never see the
+        dashboard table out of step with forecast_data.
+        """
+        # The temp table is filled batch by batch; index and analyze it once so the deletes
+        # below get a hash/merge join plan instead of a nested loop over unindexed rows
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS sync_touched_rows_key ON sync_touched_rows (restaurant_id, inventory_item_id, business_date);
+            ANALYZE sync_touched_rows;
+        """
+        )
+
+        # Remove rows in touched slices. Equality on state/business_date keeps the join hashable;
+        # dma_id/dc_id are nullable so they are compared with IS NOT DISTINCT FROM as a join filter.
+        self.cursor.execute(
+            """
+            DELETE FROM dashboard_forecast_view v
+            USING (SELECT DISTINCT state, dma_id, dc_id, business_date FROM sync_touched_rows) t
+            WHERE v.state = t.state
+                AND v.business_date = t.business_date
+                AND v.dma_id IS NOT DISTINCT FROM t.dma_id
+                AND v.dc_id IS NOT DISTINCT FROM t.dc_id
+        """
+        )
+
+        # Remove rows whose key moved to a different slice
+        self.cursor.execute(
+            """
+            DELETE FROM dashboard_forecast_view v
+            USING sync_touched_rows k
+            WHERE v.restaurant_id = k.restaurant_id
+                AND v.inventory_item_id = k.inventory_item_id
+                AND v.business_date = k.business_date
+        """
+        )
+
+        self.cursor.execute(
+            """
+            WITH touched_slices AS (
+                SELECT DISTINCT state, dma_id, dc_id, business_date FROM sync_touched_rows
+            )
+            INSERT INTO dashboard_forecast_view (
+                restaurant_id, inventory_item_id, business_date,
+                dma_id, dc_id, state, y_05, y_50, y_95
+            )
+            SELECT
+                f.restaurant_id, f.inventory_item_id, f.business_date,
+                f.dma_id, f.dc_id, f.state, f.y_05, f.y_50, f.y_95
+            FROM forecast_data f
+            JOIN touched_slices t
+                ON f.state = t.state
+                AND f.dma_id IS NOT DISTINCT FROM t.dma_id
+                AND f.dc_id IS NOT DISTINCT FROM t.dc_id
+                AND f.business_date = t.business_date
+        """
+        )
+        refreshed = self.cursor.rowcount
+        logger.info(f"Refreshed {refreshed} dashboard rows for touched slices")
+        return refreshed
+
+    def apply_adjustments(self, full_rebuild: bool = False) -> Dict[str, Any]:
+        """Incrementally materialize adjusted_forecast from active forecast_adjustments"""
+        try:
+            stats = apply_adjustments(self.cursor, full_rebuild)
+            self.connection.commit()
+            return stats
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def publish_snapshots(self) -> Optional[Dict[str, Any]]:
+        """Publish dashboard bootstrap snapshots to S3; failures are logged but never fail the sync"""
+        if not SNAPSHOT_BUCKET:
+            return None
+
+        try:
+            return publish_snapshots(self.cursor, s3_client, SNAPSHOT_BUCKET, SNAPSHOT_PREFIX, SNAPSHOT_KEEP_VERSIONS)
+        except Exception as e:
+            logger.error(f"Failed to publish forecast snapshots: {str(e)}")
+            self.connection.rollback()
+            return None
+
     def sync_data(self, sync_type: str = "incremental") -> int:
         """Sync data from Athena to Postgres"""
         sync_info = self.get_last_sync_info()
@@ -381,9 +521,12 @@ class ForecastSyncHandler:
                 values = [(record["restaurant_id"], record["inventory_item_id"], record["business_date"], record.get("dma_id"), record.get("dc_id"), record["state"], record.get("y_05"), record["y_50"], record.get("y_95")) for record in batch]
 
                 execute_batch(self.cursor, insert_sql, values)
+                self.track_touched_rows(values)
                 total_synced += len(batch)
                 logger.info(f"Synced batch: {total_synced}/{len(data)} records")
 
+            # Refresh dashboard slices in the same transaction as the upserts
+            self.refresh_dashboard_view()
             self.connection.commit()
 
             # Update sync status
@@ -400,6 +543,14 @@ class ForecastSyncHandler:
             self.connection.commit()
 
             logger.info(f"Successfully synced {total_synced} records")
+
+            # Keep adjusted_forecast current; the engine catches up on the next run if this fails
+            try:
+                self.apply_adjustments()
+            except Exception as e:
+                logger.error(f"Failed to apply adjustments after sync: {str(e)}")
+
+            self.publish_snapshots()
             return total_synced
 
         except Exception as e:
@@ -447,6 +598,9 @@ def lambda_handler(event, context):
             elif event["source"] == "github.actions":
                 logger.info("GitHub Actions deployment detected")
                 sync_type = event.get("sync_type", "full")
+            elif event["source"] == "forecast.adjustments":
+                logger.info("Adjustment change detected")
+                sync_type = "adjustments"
 
         # Check if this is an EventBridge event
         elif "detail-type" in event:
@@ -455,6 +609,15 @@ def lambda_handler(event, context):
 
         # Perform sync
         with ForecastSyncHandler() as handler:
+            # Adjustment changes only need adjusted_forecast recomputed; the frequent scheduled runs
+            # skip the full schema DDL so they never lock forecast_data
+            if sync_type == "adjustments":
+                handler.create_adjustment_schema()
+                stats = handler.apply_adjustments(full_rebuild=bool(event.get("full_rebuild")))
+                response = {"statusCode": 200, "body": json.dumps({"message": f"Recomputed {stats['affected_rows']} adjusted forecast rows", "sync_type": sync_type, **stats, "timestamp": datetime.now().isoformat()})}
+                logger.info(f"Response: {response}")
+                return response
+
             # Create/update schema
             handler.create_schema()
 
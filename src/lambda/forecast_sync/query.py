@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Lambda function for reading forecast data from Postgres.
+Serves keyset-paginated filtered queries and server-side aggregations over forecast_data,
+with a per-container LRU cache (bounded by serialized bytes) invalidated by the latest
+forecast_sync_status row.
+"""
+
+import os
+import json
+import base64
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Any, Optional, Tuple
+
+import psycopg2
+
+from index import ForecastSyncHandler
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Environment variables
+DEFAULT_PAGE_SIZE = int(os.environ.get("DEFAULT_PAGE_SIZE", "1000"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "10000"))
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+# Cached results are kept serialized; total and per-result byte limits keep the cache well inside Lambda memory
+QUERY_CACHE_MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_MB", "64")) * 1024 * 1024
+QUERY_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("QUERY_CACHE_MAX_ENTRY_MB", "4")) * 1024 * 1024
+# Aggregations returning more groups than this are rejected; page through forecast rows instead
+MAX_AGGREGATE_GROUPS = int(os.environ.get("MAX_AGGREGATE_GROUPS", "10000"))
+# Seconds a looked-up data version is trusted before forecast_sync_status is checked again
+DATA_VERSION_TTL_SECONDS = float(os.environ.get("DATA_VERSION_TTL_SECONDS", "30"))
+
+# Filter name -> (column, caster). Only these columns can ever reach the SQL text.
+FILTER_COLUMNS = {"state": ("state", str), "dma_id": ("dma_id", str), "dc_id": ("dc_id", int), "inventory_item_id": ("inventory_item_id", int), "restaurant_id": ("restaurant_id", int)}
+GROUP_BY_COLUMNS = ["state", "dma_id", "dc_id", "inventory_item_id", "restaurant_id", "business_date"]
+
+# Keyset order matches the UNIQUE(restaurant_id, inventory_item_id, business_date) index
+KEYSET_COLUMNS = ["restaurant_id", "inventory_item_id", "business_date"]
+SELECT_COLUMNS = ["restaurant_id", "inventory_item_id", "business_date", "dma_id", "dc_id", "state", "y_05", "y_50", "y_95"]
+
+
+class QueryError(ValueError):
+    """Raised for invalid query requests (mapped to HTTP 400)"""
+
+
+class ResultCache:
+    """
+    LRU cache of serialized results, bounded by entry count and total bytes, whose entries are
+    dropped whenever the data version changes. Results larger than max_entry_bytes are not cached.
+    """
+
+    def __init__(self, max_size: int, max_bytes: int = QUERY_CACHE_MAX_BYTES, max_entry_bytes: int = QUERY_CACHE_MAX_ENTRY_BYTES):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.version = None
+        self.version_checked_at = None
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+    def version_expired(self, ttl: float) -> bool:
+        """Whether the data version must be looked up again before serving cached results"""
+        return self.version_checked_at is None or time.monotonic() - self.version_checked_at >= ttl
+
+    def validate(self, version: Any):
+        """Clear all entries if the data version has moved on"""
+        self.version_checked_at = time.monotonic()
+        if version != self.version:
+            if self.entries:
+                logger.info(f"Data version changed ({self.version} -> {version}), clearing {len(self.entries)} cached results")
+            self.entries.clear()
+            self.total_bytes = 0
+            self.version = version
+
+    def get(self, key: str) -> Optional[str]:
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key: str, value: str):
+        if len(value) > self.max_entry_bytes:
+            return
+        if key in self.entries:
+            self.total_bytes -= len(self.entries.pop(key))
+        self.entries[key] = value
+        self.total_bytes += len(value)
+        while len(self.entries) > self.max_size or self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+
+# Survives across invocations in a warm container
+result_cache = ResultCache(QUERY_CACHE_SIZE)
+
+# Resolved database URL and read-only connection, reused across invocations in a warm container
+shared_database_url = None
+shared_connection = None
+
+
+def reset_shared_connection():
+    """Drop the shared connection so the next request reconnects"""
+    global shared_connection
+    if shared_connection is not None and not shared_connection.closed:
+        shared_connection.close()
+    shared_connection = None
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate filters and normalize them to a canonical form (sorted, de-duplicated lists)"""
+    filters = filters or {}
+    normalized = {}
+
+    for name, (_, caster) in FILTER_COLUMNS.items():
+        value = filters.get(name)
+        if value is None or value == "" or value == []:
+            continue
+        values = value if isinstance(value, list) else [value]
+        try:
+            normalized[name] = sorted({caster(v) for v in values})
+        except (TypeError, ValueError):
+            raise QueryError(f"Invalid value for filter {name}: {value}")
+
+    for name in ["start_date", "end_date"]:
+        value = filters.get(name)
+        if value:
+            try:
+                normalized[name] = date.fromisoformat(str(value)[:10]).isoformat()
+            except ValueError:
+                raise QueryError(f"Invalid date for filter {name}: {value}")
+
+    unknown = set(filters) - set(FILTER_COLUMNS) - {"start_date", "end_date"}
+    if unknown:
+        raise QueryError(f"Unknown filters: {sorted(unknown)}")
+
+    return normalized
+
+
+def build_where_clause(filters: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+    """Build parameterized WHERE conditions from normalized filters"""
+    conditions = []
+    params = []
+
+    for name, (column, _) in FILTER_COLUMNS.items():
+        if name in filters:
+            conditions.append(f"{column} = ANY(%s)")
+            params.append(filters[name])
+
+    if "start_date" in filters:
+        conditions.append("business_date >= %s")
+        params.append(filters["start_date"])
+    if "end_date" in filters:
+        conditions.append("business_date <= %s")
+        params.append(filters["end_date"])
+
+    return conditions, params
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Encode the keyset position of the last row in a page"""
+    key = [row[column] for column in KEYSET_COLUMNS]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a page cursor produced by encode_cursor"""
+    try:
+        restaurant_id, inventory_item_id, business_date = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return [int(restaurant_id), int(inventory_item_id), date.fromisoformat(business_date).isoformat()]
+    except (ValueError, TypeError):
+        raise QueryError("Invalid cursor")
+
+
+def to_json_value(value: Any) -> Any:
+    """Convert Postgres values to JSON-serializable types"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class ForecastQueryHandler(ForecastSyncHandler):
+    """
+    Read-only query handler over forecast_data; reuses the sync handler's connection logic.
+    Connects lazily on first use and shares one connection per container, so requests served
+    from the cache make no database or Neon API round trips.
+    """
+
+    def __enter__(self):
+        """Context manager entry; the connection is opened on first query"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit; a broken connection is dropped instead of being reused"""
+        self.disconnect()
+        if exc_type is not None and issubclass(exc_type, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+            reset_shared_connection()
+
+    def connect(self):
+        """Attach to the shared connection, opening it (and resolving the URL) only when needed"""
+        global shared_database_url, shared_connection
+        if shared_connection is None or shared_connection.closed:
+            if shared_database_url is None:
+                shared_database_url = self._get_database_url()
+            shared_connection = psycopg2.connect(shared_database_url)
+            # Autocommit so the idle connection never holds a transaction open between invocations
+            shared_connection.set_session(readonly=True, autocommit=True)
+            logger.info("Database connection established")
+        self.connection = shared_connection
+        self.cursor = self.connection.cursor()
+
+    def disconnect(self):
+        """Close this request's cursor; the shared connection stays open for the next invocation"""
+        if self.cursor:
+            self.cursor.close()
+        self.cursor = None
+        self.connection = None
+
+    def ensure_connected(self):
+        if self.cursor is None:
+            self.connect()
+
+    def get_data_version(self) -> Optional[int]:
+        """Latest forecast_sync_status row id; any new sync attempt invalidates cached results"""
+        self.ensure_connected()
+        self.cursor.execute("SELECT MAX(id) FROM forecast_sync_status")
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+
+    def fetch_rows(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        self.ensure_connected()
+        self.cursor.execute(sql, params)
+        columns = [desc[0] for desc in self.cursor.description]
+        return [{column: to_json_value(value) for column, value in zip(columns, row)} for row in self.cursor.fetchall()]
+
+    def query_page(self, filters: Dict[str, Any], page_size: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Return one keyset-paginated page of forecast rows"""
+        conditions, params = build_where_clause(filters)
+        if cursor:
+            conditions.append(f"({', '.join(KEYSET_COLUMNS)}) > (%s, %s, %s)")
+            params.extend(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Fetch one extra row to know whether another page exists without a COUNT(*)
+        sql = f"""
+            SELECT {', '.join(SELECT_COLUMNS)}
+            FROM forecast_data
+            {where}
+            ORDER BY {', '.join(KEYSET_COLUMNS)}
+            LIMIT %s
+        """
+        rows = self.fetch_rows(sql, params + [page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return {"rows": rows, "count": len(rows), "next_cursor": encode_cursor(rows[-1]) if has_more else None}
+
+    def query_aggregate(self, filters: Dict[str, Any], group_by: List[str]) -> Dict[str, Any]:
+        """Return quantile sums and row counts grouped by the requested dimensions (at most MAX_AGGREGATE_GROUPS groups)"""
+        invalid = [column for column in group_by if column not in GROUP_BY_COLUMNS]
+        if invalid:
+            raise QueryError(f"Invalid group_by columns: {invalid}")
+
+        conditions, params = build_where_clause(filters)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        dimensions = ", ".join(group_by)
+        select_dimensions = f"{dimensions}, " if group_by else ""
+        group_clause = f"GROUP BY {dimensions} ORDER BY {dimensions}" if group_by else ""
+
+        sql = f"""
+            SELECT
+                {select_dimensions}
+                SUM(y_05) AS y_05,
+                SUM(y_50) AS y_50,
+                SUM(y_95) AS y_95,
+                COUNT(*) AS row_count
+            FROM forecast_data
+            {where}
+            {group_clause}
+            LIMIT %s
+        """
+        # Fetch one extra group to detect an oversized result without materializing all of it
+        rows = self.fetch_rows(sql, params + [MAX_AGGREGATE_GROUPS + 1])
+        if len(rows) > MAX_AGGREGATE_GROUPS:
+            raise QueryError(f"Aggregation returns more than {MAX_AGGREGATE_GROUPS} groups; add filters, group by fewer columns or use get_forecast_page")
+        return {"rows": rows, "count": len(rows)}
+
+
+def parse_request(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Accept both API Gateway proxy events and direct invocations"""
+    if "body" in event:
+        body = event.get("body") or "{}"
+        return json.loads(body) if isinstance(body, str) else body
+    return event
+
+
+def prepare_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a query request and compute its cache key before touching the database"""
+    action = request.get("action", "get_forecast_page")
+    prepared = {"action": action, "filters": normalize_filters(request.get("filters"))}
+
+    if action == "get_forecast_page":
+        prepared["page_size"] = min(int(request.get("page_size", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        if prepared["page_size"] <= 0:
+            raise QueryError("page_size must be positive")
+        prepared["cursor"] = request.get("cursor")
+        if prepared["cursor"]:
+            decode_cursor(prepared["cursor"])
+    elif action == "get_forecast_aggregate":
+        group_by = request.get("group_by", [])
+        prepared["group_by"] = group_by if isinstance(group_by, list) else [group_by]
+    else:
+        raise QueryError(f"Invalid action: {action}")
+
+    prepared["cache_key"] = json.dumps(prepared, sort_keys=True)
+    return prepared
+
+
+def handle_request(handler: ForecastQueryHandler, prepared: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a prepared request, serving repeated requests for the same data version from the cache.
+    The data version itself is only re-read once DATA_VERSION_TTL_SECONDS have passed.
+    """
+    if result_cache.version_expired(DATA_VERSION_TTL_SECONDS):
+        result_cache.validate(handler.get_data_version())
+    cached = result_cache.get(prepared["cache_key"])
+    if cached is not None:
+        return {**json.loads(cached), "cached": True}
+
+    if prepared["action"] == "get_forecast_page":
+        result = handler.query_page(prepared["filters"], prepared["page_size"], prepared["cursor"])
+    else:
+        result = handler.query_aggregate(prepared["filters"], prepared["group_by"])
+
+    result_cache.put(prepared["cache_key"], json.dumps(result))
+    return {**result, "cached": False}
+
+
+def lambda_handler(event, context):
+    """Lambda function entry point"""
+    headers = {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}
+
+    try:
+        prepared = prepare_request(parse_request(event))
+        with ForecastQueryHandler() as handler:
+            result = handle_request(handler, prepared)
+        return {"statusCode": 200, "headers": headers, "body": json.dumps(result)}
+
+    except (QueryError, ValueError) as e:
+        logger.warning(f"Invalid query request: {str(e)}")
+        return {"statusCode": 400, "headers": headers, "body": json.dumps({"error": str(e)})}
+    except Exception as e:
+        logger.error(f"Query execution failed: {str(e)}")
+        return {"statusCode": 500, "headers": headers, "body": json.dumps({"error": str(e), "timestamp": datetime.now().isoformat()})}
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Columnar forecast snapshots for fast dashboard bootstrap.
+After each successful sync, per-state and per-item quantile time series are written to S3 as
+immutable Parquet objects under a content-hashed version prefix, plus a small manifest that
+points at the current version.
+"""
+
+import io
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Versioned objects never change once written; only the manifest is revalidated
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+# S3 DeleteObjects accepts at most this many keys per request
+MAX_DELETE_KEYS = 1000
+
+SNAPSHOT_SCHEMA = pa.schema([("business_date", pa.date32()), ("y_05", pa.float64()), ("y_50", pa.float64()), ("y_95", pa.float64())])
+
+# Dimension name -> (column, query). Quantiles are summed the same way the dashboard does.
+SNAPSHOT_QUERIES = {
+    "state": (
+        "state",
+        """
+        SELECT state, business_date, SUM(y_05), SUM(y_50), SUM(y_95)
+        FROM forecast_data
+        GROUP BY state, business_date
+        ORDER BY state, business_date
+    """,
+    ),
+    "item": (
+        "inventory_item_id",
+        """
+        SELECT inventory_item_id, business_date, SUM(y_05), SUM(y_50), SUM(y_95)
+        FROM forecast_data
+        GROUP BY inventory_item_id, business_date
+        ORDER BY inventory_item_id, business_date
+    """,
+    ),
+}
+
+
+def rows_to_table(rows: List[tuple]) -> pa.Table:
+    """Build an Arrow table from (business_date, y_05, y_50, y_95) rows"""
+    dates, y_05, y_50, y_95 = zip(*rows) if rows else ([], [], [], [])
+    return pa.Table.from_arrays(
+        [pa.array(dates, type=pa.date32()), pa.array([float(v) if v is not None else None for v in y_05], type=pa.float64()), pa.array([float(v) for v in y_50], type=pa.float64()), pa.array([float(v) if v is not None else None for v in y_95], type=pa.float64())],
+        schema=SNAPSHOT_SCHEMA,
+    )
+
+
+def table_to_parquet(table: pa.Table) -> bytes:
+    """Serialize an Arrow table to compact Parquet bytes"""
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def build_snapshots(cursor) -> Dict[str, bytes]:
+    """Query per-dimension time series and return {relative_key: parquet_bytes}"""
+    snapshots = {}
+
+    for dimension, (column, sql) in SNAPSHOT_QUERIES.items():
+        cursor.execute(sql)
+        grouped: Dict[str, List[tuple]] = {}
+        for value, business_date, y_05, y_50, y_95 in cursor.fetchall():
+            grouped.setdefault(str(value), []).append((business_date, y_05, y_50, y_95))
+
+        for value, rows in grouped.items():
+            snapshots[f"{dimension}/{value}.parquet"] = table_to_parquet(rows_to_table(rows))
+
+        logger.info(f"Built {len(grouped)} {dimension} snapshots from {column}")
+
+    return snapshots
+
+
+def compute_version(snapshots: Dict[str, bytes]) -> str:
+    """Content hash over all snapshot objects, so unchanged data keeps the same version"""
+    digest = hashlib.sha256()
+    for key in sorted(snapshots):
+        digest.update(key.encode())
+        digest.update(hashlib.sha256(snapshots[key]).digest())
+    return digest.hexdigest()[:16]
+
+
+def prune_snapshot_versions(s3_client, bucket: str, prefix: str, current_version: str, keep_versions: int) -> List[str]:
+    """
+    Delete all but the newest keep_versions version prefixes, always keeping current_version.
+    Older versions stay briefly so clients holding a cached manifest can still fetch them.
+    Returns the deleted versions.
+    """
+    version_keys: Dict[str, List[str]] = {}
+    last_modified: Dict[str, datetime] = {}
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=f"{prefix}/"):
+        for obj in page.get("Contents", []):
+            version, separator, _ = obj["Key"][len(prefix) + 1 :].partition("/")
+            if not separator:
+                continue  # The latest manifest.json
+            version_keys.setdefault(version, []).append(obj["Key"])
+            last_modified[version] = max(last_modified.get(version, obj["LastModified"]), obj["LastModified"])
+
+    older = sorted((v for v in version_keys if v != current_version), key=last_modified.get, reverse=True)
+    expired = older[max(0, keep_versions - 1) :]
+
+    keys = [key for version in expired for key in version_keys[version]]
+    for start in range(0, len(keys), MAX_DELETE_KEYS):
+        response = s3_client.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": key} for key in keys[start : start + MAX_DELETE_KEYS]], "Quiet": True})
+        for error in response.get("Errors", []):
+            logger.warning(f"Failed to delete snapshot object {error.get('Key')}: {error.get('Message')}")
+
+    if expired:
+        logger.info(f"Pruned {len(expired)} old snapshot versions ({len(keys)} objects)")
+    return expired
+
+
+def publish_snapshots(cursor, s3_client, bucket: str, prefix: str, keep_versions: int = 3) -> Dict[str, Any]:
+    """Write versioned snapshot objects and the manifest to S3, then prune old versions; returns the manifest"""
+    snapshots = build_snapshots(cursor)
+    version = compute_version(snapshots)
+    version_prefix = f"{prefix}/{version}"
+
+    objects = {}
+    for key, body in snapshots.items():
+        s3_key = f"{version_prefix}/{key}"
+        s3_client.put_object(Bucket=bucket, Key=s3_key, Body=body, ContentType="application/vnd.apache.parquet", CacheControl=IMMUTABLE_CACHE_CONTROL)
+        objects[key] = {"key": s3_key, "size": len(body)}
+
+    manifest = {"version": version, "generated_at": datetime.now().isoformat(), "format": "parquet", "schema": [field.name for field in SNAPSHOT_SCHEMA], "objects": objects}
+
+    # Immutable copy for pinning plus the mutable "latest" pointer clients bootstrap from
+    manifest_body = json.dumps(manifest).encode()
+    s3_client.put_object(Bucket=bucket, Key=f"{version_prefix}/manifest.json", Body=manifest_body, ContentType="application/json", CacheControl=IMMUTABLE_CACHE_CONTROL)
+    s3_client.put_object(Bucket=bucket, Key=f"{prefix}/manifest.json", Body=manifest_body, ContentType="application/json", CacheControl=MANIFEST_CACHE_CONTROL)
+
+    logger.info(f"Published {len(objects)} forecast snapshots as version {version}")
+
+    # The new manifest is already live, so a failed cleanup is retried by the next publish
+    try:
+        prune_snapshot_versions(s3_client, bucket, prefix, version, keep_versions)
+    except Exception as e:
+        logger.error(f"Failed to prune old forecast snapshots: {str(e)}")
+
+    return manifest
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the adjustment-application engine
+"""
+
+import unittest
+from unittest.mock import Mock
+from datetime import datetime
+
+from adjustments import apply_adjustments, match_condition
+
+
+class TestAdjustmentEngine(unittest.TestCase):
+    """Test cases for apply_adjustments"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.mock_cursor = Mock()
+        self.mock_cursor.rowcount = 3
+
+    def executed_sql(self):
+        return [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+
+    def test_match_condition(self):
+        """Test the match predicate mirrors the API route's filter_context semantics"""
+        condition = match_condition("f", "a")
+
+        self.assertIn("a.filter_context->>'inventoryItemId' = f.inventory_item_id::text", condition)
+        self.assertIn("f.business_date >= a.adjustment_start_date", condition)
+        self.assertIn("jsonb_array_length((CASE WHEN jsonb_typeof(a.filter_context->'dmaIds') = 'array'", condition)
+        self.assertIn("f.dc_id::text IN", condition)
+        # Every jsonb array function call is guarded so null/scalar lists cannot abort the run
+        self.assertEqual(condition.count("jsonb_array_length("), 3)
+        self.assertEqual(condition.count("jsonb_array_elements_text("), 3)
+        self.assertEqual(condition.count("jsonb_typeof("), 6)
+
+    def test_skips_without_adjustments_table(self):
+        """Test the engine is a no-op when forecast_adjustments has not been migrated"""
+        self.mock_cursor.fetchone.return_value = (False,)
+
+        result = apply_adjustments(self.mock_cursor)
+
+        self.assertEqual(result, {"changed_adjustments": 0, "affected_rows": 0, "deleted_rows": 0})
+        self.assertEqual(self.mock_cursor.execute.call_count, 1)
+
+    def test_incremental_run_uses_watermark(self):
+        """Test only rows updated since the last run are picked up from forecast_data"""
+        watermark = datetime(2025, 1, 1, 12, 0)
+        self.mock_cursor.fetchone.side_effect = [(True,), (watermark,)]
+
+        result = apply_adjustments(self.mock_cursor)
+
+        self.assertEqual(result, {"changed_adjustments": 3, "affected_rows": 3, "deleted_rows": 3})
+        base_call = [c for c in self.mock_cursor.execute.call_args_list if "updated_at > %s" in c[0][0]][0]
+        self.assertEqual(base_call[0][1], (watermark, watermark))
+
+        statements = self.executed_sql()
+        self.assertTrue(any("FULL OUTER JOIN applied_adjustments" in sql for sql in statements))
+        self.assertTrue(any("INSERT INTO adjusted_forecast" in sql and "ON CONFLICT" in sql for sql in statements))
+        self.assertTrue(any("INSERT INTO adjustment_engine_state" in sql for sql in statements))
+        self.assertTrue(any("DELETE FROM adjusted_forecast" in sql and "NOT EXISTS" in sql for sql in statements))
+
+    def test_full_rebuild_ignores_watermark(self):
+        """Test a full rebuild recomputes every base row"""
+        self.mock_cursor.fetchone.side_effect = [(True,), (datetime(2025, 1, 1),)]
+
+        apply_adjustments(self.mock_cursor, full_rebuild=True)
+
+        base_call = [c for c in self.mock_cursor.execute.call_args_list if "updated_at > %s" in c[0][0]][0]
+        self.assertEqual(base_call[0][1], (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
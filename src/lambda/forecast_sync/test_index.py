@@ -225,7 +225,44 @@ class TestForecastSyncHandler(unittest.TestCase):
         executed_sql = self.mock_cursor.execute.call_args[0][0]
         self.assertIn("CREATE TABLE IF NOT EXISTS forecast_data", executed_sql)
         self.assertIn("CREATE TABLE IF NOT EXISTS forecast_sync_status", executed_sql)
+        self.assertIn("CREATE TABLE IF NOT EXISTS dashboard_forecast_view", executed_sql)
         self.assertIn("CREATE INDEX", executed_sql)
+        self.assertNotIn("DROP TRIGGER", executed_sql)
+        self.assertIn("pg_trigger", executed_sql)
+
+    @patch("index.execute_values")
+    def test_track_touched_rows(self, mock_execute_values):
+        """Test upserted rows are staged for the dashboard refresh"""
+        self.handler.connection = self.mock_connection
+        self.handler.cursor = self.mock_cursor
+
+        values = [(123, 456, "2024-01-02", "DMA1", 1, "CA", 90.0, 100.0, 110.0)]
+        self.handler.track_touched_rows(values)
+
+        create_sql = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("CREATE TEMP TABLE IF NOT EXISTS sync_touched_rows", create_sql)
+        self.assertIn("ON COMMIT DROP", create_sql)
+        self.assertEqual(mock_execute_values.call_args[0][2], [(123, 456, "2024-01-02", "DMA1", 1, "CA")])
+
+    def test_refresh_dashboard_view(self):
+        """Test dashboard refresh only touches affected slices and does not commit"""
+        self.handler.connection = self.mock_connection
+        self.handler.cursor = self.mock_cursor
+        self.mock_cursor.rowcount = 42
+
+        refreshed = self.handler.refresh_dashboard_view()
+
+        self.assertEqual(refreshed, 42)
+        index_sql, slice_delete_sql, key_delete_sql, insert_sql = [c[0][0] for c in self.mock_cursor.execute.call_args_list]
+        self.assertIn("CREATE INDEX IF NOT EXISTS sync_touched_rows_key", index_sql)
+        self.assertIn("ANALYZE sync_touched_rows", index_sql)
+        for delete_sql in (slice_delete_sql, key_delete_sql):
+            self.assertIn("DELETE FROM dashboard_forecast_view", delete_sql)
+            self.assertIn("sync_touched_rows", delete_sql)
+            self.assertNotIn(" OR ", delete_sql)
+        self.assertIn("INSERT INTO dashboard_forecast_view", insert_sql)
+        self.assertIn("JOIN touched_slices", insert_sql)
+        self.mock_connection.commit.assert_not_called()
 
 
 class TestLambdaHandler(unittest.TestCase):
@@ -302,6 +339,28 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertEqual(body["sync_type"], "incremental")
         self.assertEqual(body["records_synced"], 75)
 
+    @patch("index.ForecastSyncHandler")
+    def test_lambda_handler_adjustments_event(self, mock_handler_class):
+        """Test Lambda handler with an adjustment change event"""
+        mock_handler = Mock()
+        mock_handler_class.return_value.__enter__.return_value = mock_handler
+        mock_handler.apply_adjustments.return_value = {"changed_adjustments": 1, "affected_rows": 40}
+
+        event = {"source": "forecast.adjustments"}
+
+        response = lambda_handler(event, None)
+
+        self.assertEqual(response["statusCode"], 200)
+        body = json.loads(response["body"])
+        self.assertEqual(body["sync_type"], "adjustments")
+        self.assertEqual(body["affected_rows"], 40)
+
+        # Adjustment changes must not trigger a data sync
+        mock_handler.apply_adjustments.assert_called_once_with(full_rebuild=False)
+        mock_handler.create_adjustment_schema.assert_called_once()
+        mock_handler.create_schema.assert_not_called()
+        mock_handler.sync_data.assert_not_called()
+
     @patch("index.ForecastSyncHandler")
     def test_lambda_handler_error(self, mock_handler_class):
         """Test Lambda handler error handling"""
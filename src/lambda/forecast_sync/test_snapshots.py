@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for forecast snapshot publishing
+"""
+
+import io
+import json
+import unittest
+from unittest.mock import Mock
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow.parquet as pq
+
+from snapshots import build_snapshots, compute_version, prune_snapshot_versions, publish_snapshots
+
+
+def listed_s3(*objects):
+    """S3 client mock whose list_objects_v2 paginator returns (key, day) objects over two pages"""
+    contents = [{"Key": key, "LastModified": datetime(2025, 1, day)} for key, day in objects]
+    s3_client = Mock()
+    s3_client.get_paginator.return_value.paginate.return_value = [{"Contents": contents[:2]}, {"Contents": contents[2:]}]
+    s3_client.delete_objects.return_value = {}
+    return s3_client
+
+
+class TestSnapshots(unittest.TestCase):
+    """Test cases for snapshot building and publishing"""
+
+    def setUp(self):
+        """Set up a cursor returning one state query and one item query result"""
+        self.mock_cursor = Mock()
+        self.mock_cursor.fetchall.side_effect = [
+            # State time series
+            [("CA", date(2025, 1, 1), Decimal("90.00"), Decimal("100.00"), Decimal("110.00")), ("CA", date(2025, 1, 2), None, Decimal("95.00"), None), ("TX", date(2025, 1, 1), Decimal("40.00"), Decimal("50.00"), Decimal("60.00"))],
+            # Item time series
+            [(456, date(2025, 1, 1), Decimal("130.00"), Decimal("150.00"), Decimal("170.00"))],
+        ]
+
+    def test_build_snapshots(self):
+        """Test one Parquet object is built per state and per item"""
+        snapshots = build_snapshots(self.mock_cursor)
+
+        self.assertEqual(sorted(snapshots), ["item/456.parquet", "state/CA.parquet", "state/TX.parquet"])
+
+        table = pq.read_table(io.BytesIO(snapshots["state/CA.parquet"]))
+        self.assertEqual(table.column_names, ["business_date", "y_05", "y_50", "y_95"])
+        self.assertEqual(table.column("y_50").to_pylist(), [100.0, 95.0])
+        self.assertEqual(table.column("y_05").to_pylist(), [90.0, None])
+
+    def test_compute_version_is_content_addressed(self):
+        """Test the version only changes when snapshot content changes"""
+        self.assertEqual(compute_version({"a": b"1", "b": b"2"}), compute_version({"b": b"2", "a": b"1"}))
+        self.assertNotEqual(compute_version({"a": b"1"}), compute_version({"a": b"2"}))
+
+    def test_publish_snapshots(self):
+        """Test snapshots are written immutably under a version prefix with a latest manifest"""
+        mock_s3 = listed_s3()
+
+        manifest = publish_snapshots(self.mock_cursor, mock_s3, "test-bucket", "forecast-snapshots")
+
+        keys = [c.kwargs["Key"] for c in mock_s3.put_object.call_args_list]
+        version = manifest["version"]
+        self.assertIn(f"forecast-snapshots/{version}/state/CA.parquet", keys)
+        self.assertIn(f"forecast-snapshots/{version}/manifest.json", keys)
+        self.assertEqual(keys[-1], "forecast-snapshots/manifest.json")
+
+        latest = mock_s3.put_object.call_args_list[-1].kwargs
+        self.assertIn("must-revalidate", latest["CacheControl"])
+        self.assertEqual(json.loads(latest["Body"])["objects"]["item/456.parquet"]["key"], f"forecast-snapshots/{version}/item/456.parquet")
+
+        first = mock_s3.put_object.call_args_list[0].kwargs
+        self.assertIn("immutable", first["CacheControl"])
+
+    def test_publish_prunes_after_manifest_switch(self):
+        """Test old versions are deleted only after the latest manifest points at the new one"""
+        mock_s3 = listed_s3(("forecast-snapshots/old/state/CA.parquet", 1))
+
+        manifest = publish_snapshots(self.mock_cursor, mock_s3, "test-bucket", "forecast-snapshots", keep_versions=1)
+
+        calls = [c[0] for c in mock_s3.method_calls if c[0] in ("put_object", "delete_objects")]
+        self.assertEqual(calls[-1], "delete_objects")
+        self.assertEqual(calls[-2], "put_object")
+        self.assertEqual(mock_s3.delete_objects.call_args.kwargs["Delete"]["Objects"], [{"Key": "forecast-snapshots/old/state/CA.parquet"}])
+        self.assertNotIn(manifest["version"], str(mock_s3.delete_objects.call_args))
+
+    def test_publish_survives_prune_failure(self):
+        """Test a failed cleanup is logged without failing the publish"""
+        mock_s3 = listed_s3()
+        mock_s3.get_paginator.side_effect = Exception("AccessDenied")
+
+        with self.assertLogs("root", level="ERROR"):
+            manifest = publish_snapshots(self.mock_cursor, mock_s3, "test-bucket", "forecast-snapshots")
+
+        self.assertIn("version", manifest)
+
+
+class TestPruneSnapshotVersions(unittest.TestCase):
+    """Test cases for deleting old snapshot versions"""
+
+    def test_keeps_newest_versions_and_current(self):
+        """Test all but the newest versions are deleted and the latest manifest is never touched"""
+        mock_s3 = listed_s3(
+            ("forecast-snapshots/manifest.json", 9),
+            ("forecast-snapshots/v1/state/CA.parquet", 1),
+            ("forecast-snapshots/v1/manifest.json", 1),
+            ("forecast-snapshots/v2/state/CA.parquet", 2),
+            ("forecast-snapshots/v3/state/CA.parquet", 3),
+            ("forecast-snapshots/v4/state/CA.parquet", 4),
+        )
+
+        expired = prune_snapshot_versions(mock_s3, "test-bucket", "forecast-snapshots", "v2", keep_versions=2)
+
+        self.assertEqual(sorted(expired), ["v1", "v3"])
+        deleted = [obj["Key"] for c in mock_s3.delete_objects.call_args_list for obj in c.kwargs["Delete"]["Objects"]]
+        self.assertEqual(sorted(deleted), ["forecast-snapshots/v1/manifest.json", "forecast-snapshots/v1/state/CA.parquet", "forecast-snapshots/v3/state/CA.parquet"])
+
+    def test_nothing_to_prune(self):
+        """Test no delete request is made when only kept versions exist"""
+        mock_s3 = listed_s3(("forecast-snapshots/v1/state/CA.parquet", 1), ("forecast-snapshots/v2/state/CA.parquet", 2))
+
+        self.assertEqual(prune_snapshot_versions(mock_s3, "test-bucket", "forecast-snapshots", "v2", keep_versions=3), [])
+        mock_s3.delete_objects.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import json
+import boto3
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from botocore.config import Config
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Maximum number of concurrent post_to_connection calls per broadcast
+BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", "32"))
+
+dynamodb = boto3.resource("dynamodb")
+connection_table = dynamodb.Table(os.environ.get("CONNECTION_TABLE"))
+subscription_table = dynamodb.Table(os.environ.get("SUBSCRIPTION_TABLE"))
+deserializer = TypeDeserializer()
+
+# Sort key of the per-paramId version counter item written by updateVisualizationParams
+VERSION_COUNTER_TIMESTAMP = 0
+
+# Newest lastUpdatedAt broadcast per paramId by this container, so stale or replayed records are skipped
+last_broadcast = {}
+
+# The management API is served over HTTPS even though clients connect with wss://
+endpoint = os.environ.get("WEBSOCKET_API_ENDPOINT", "").replace("wss://", "https://", 1)
+
+# Size the HTTP pool to the broadcast concurrency so every worker reuses a keep-alive connection
+apigw_config = Config(max_pool_connections=BROADCAST_CONCURRENCY, tcp_keepalive=True, retries={"max_attempts": 2, "mode": "standard"})
+apigw_management = boto3.client("apigatewaymanagementapi", endpoint_url=endpoint, config=apigw_config)
+
+
+def decimal_default(obj):
+    """JSON encoder for the Decimal values DynamoDB returns"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def iter_subscribers(param_id):
+    """Yield the connection IDs subscribed to a parameter set, following LastEvaluatedKey across pages"""
+    query_kwargs = {"IndexName": "ParamSubscribersIndex", "KeyConditionExpression": Key("paramId").eq(param_id)}
+    while True:
+        response = subscription_table.query(**query_kwargs)
+        for item in response.get("Items", []):
+            yield item["connectionId"]
+
+        if "LastEvaluatedKey" not in response:
+            return
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def post_to_connection(connection_id, message):
+    """Post a message to one connection, returning False if the connection is gone"""
+    try:
+        apigw_management.post_to_connection(ConnectionId=connection_id, Data=message)
+        return True
+    except apigw_management.exceptions.GoneException:
+        return False
+    except Exception as e:
+        logger.error(f"Error posting to connection {connection_id}: {str(e)}")
+        return True
+
+
+def remove_connections(connection_ids, param_id):
+    """
+    Delete stale connections and their subscription to param_id with BatchWriteItem
+    (the batch writer resends unprocessed items). Other subscriptions expire via TTL.
+    """
+    with connection_table.batch_writer(overwrite_by_pkeys=["connectionId"]) as batch:
+        for connection_id in connection_ids:
+            batch.delete_item(Key={"connectionId": connection_id})
+
+    with subscription_table.batch_writer(overwrite_by_pkeys=["connectionId", "paramId"]) as batch:
+        for connection_id in connection_ids:
+            batch.delete_item(Key={"connectionId": connection_id, "paramId": param_id})
+
+
+def fan_out(connection_ids, message):
+    """
+    Post a message to many connections through a bounded thread pool.
+    Returns the connection IDs that reported GoneException.
+    """
+    connection_ids = list(connection_ids)
+    if not connection_ids:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(BROADCAST_CONCURRENCY, len(connection_ids))) as executor:
+        delivered = list(executor.map(lambda connection_id: post_to_connection(connection_id, message), connection_ids))
+
+    return [connection_id for connection_id, ok in zip(connection_ids, delivered) if not ok]
+
+
+def broadcast_params_update(item):
+    """Broadcast a parameter item to the WebSocket clients subscribed to its paramId"""
+    param_id = item["paramId"]
+    message = json.dumps({"type": "PARAMS_UPDATE", "data": {"paramId": param_id, "mean": item.get("mean"), "stdDev": item.get("stdDev"), "updatedBy": item.get("lastUpdatedBy"), "userId": item.get("userId"), "version": item.get("version"), "timestamp": item.get("timestamp")}}, default=decimal_default)
+
+    connection_ids = list(iter_subscribers(param_id))
+    stale_connections = fan_out(connection_ids, message)
+
+    if stale_connections:
+        # Every post has already gone out, so a cleanup failure must not fail (and re-broadcast) the record
+        logger.info(f"Removing {len(stale_connections)} stale connections")
+        try:
+            remove_connections(stale_connections, param_id)
+        except Exception as e:
+            logger.error(f"Error removing stale connections for {param_id}: {str(e)}")
+
+    logger.info(f"Broadcast update for {param_id} to {len(connection_ids) - len(stale_connections)} of {len(connection_ids)} connections")
+
+
+def updated_at(item):
+    """Ordering key for parameter items; coalesced items share a timestamp but not lastUpdatedAt"""
+    return item.get("lastUpdatedAt", item.get("timestamp", 0))
+
+
+def latest_items(records):
+    """
+    Deserialize the new images in a stream batch, keeping only the newest item per paramId.
+    Returns {paramId: (item, [sequence numbers])} so failures can be reported per record.
+    """
+    latest = {}
+    for record in records:
+        if record.get("eventName") not in ("INSERT", "MODIFY"):
+            continue
+
+        image = record["dynamodb"].get("NewImage")
+        if not image:
+            continue
+
+        item = {key: deserializer.deserialize(value) for key, value in image.items()}
+        if item.get("timestamp") == VERSION_COUNTER_TIMESTAMP:
+            continue  # Version counter updates carry no parameters
+        sequence_number = record["dynamodb"]["SequenceNumber"]
+        param_id = item["paramId"]
+
+        if param_id in latest:
+            current, sequence_numbers = latest[param_id]
+            sequence_numbers.append(sequence_number)
+            if updated_at(item) >= updated_at(current):
+                latest[param_id] = (item, sequence_numbers)
+        else:
+            latest[param_id] = (item, [sequence_number])
+
+    return latest
+
+
+def lambda_handler(event, context):
+    """
+    Fan out parameter table stream records to subscribed WebSocket clients.
+    Records for the same paramId within a batch are collapsed to the newest one, which
+    together with coalesced writes keeps slider drags from flooding clients.
+    Failed broadcasts are reported as partial batch failures so they are retried.
+    """
+    failures = []
+
+    for param_id, (item, sequence_numbers) in latest_items(event.get("Records", [])).items():
+        if updated_at(item) < last_broadcast.get(param_id, 0):
+            logger.info(f"Skipping stale update for {param_id}")
+            continue
+
+        try:
+            broadcast_params_update(item)
+            last_broadcast[param_id] = updated_at(item)
+        except Exception as e:
+            logger.error(f"Error broadcasting update for {param_id}: {str(e)}")
+            failures.extend({"itemIdentifier": sequence_number} for sequence_number in sequence_numbers)
+
+    return {"batchItemFailures": failures}
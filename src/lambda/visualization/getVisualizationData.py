@@ -1,6 +1,9 @@
 import json
 import boto3
 import os
+import time
+import hashlib
+from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 import logging
 
@@ -10,6 +13,88 @@ logger.setLevel(logging.INFO)
 dynamodb = boto3.resource("dynamodb")
 parameter_table = dynamodb.Table(os.environ.get("PARAMETER_TABLE"))
 
+# Sort key of the per-paramId version counter item written by updateVisualizationParams
+VERSION_COUNTER_TIMESTAMP = 0
+
+# Seconds a warm container serves parameters from memory before querying DynamoDB again
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "2"))
+MAX_CACHE_ENTRIES = 256
+
+# (paramId, userId) -> (expires_at, body, etag)
+response_cache = {}
+
+
+def decimal_default(obj):
+    """JSON encoder for the Decimal values DynamoDB returns"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def compute_etag(items, fallback):
+    """Strong ETag from the version and update time of the returned parameter items"""
+    if not items:
+        return f'"{fallback}"'
+    state = "|".join(f"{item.get('paramId')}:{item.get('version')}:{item.get('lastUpdatedAt', item.get('timestamp'))}" for item in items)
+    return '"' + hashlib.sha1(state.encode()).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches etag (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates]
+
+
+def load_parameters(param_id, user_id):
+    """Query the parameters for a request, returning the response body and its ETag"""
+    # If a specific user ID is provided, query by user ID through the GSI
+    if user_id:
+        logger.info(f"Querying parameters for user: {user_id}")
+        response = parameter_table.query(IndexName="UserIdIndex", KeyConditionExpression=Key("userId").eq(user_id), Limit=10, ScanIndexForward=False)  # Get most recent 10 parameter sets for the user
+
+        # If no results from user ID query, fall back to default parameters
+        if not response.get("Items"):
+            return {"mean": 0, "stdDev": 1, "lastUpdatedBy": None, "lastUpdatedAt": None, "paramId": param_id, "userId": user_id}, compute_etag([], f"default-{user_id}")
+
+        # Return the user's parameters with additional metadata
+        items = response.get("Items", [])
+        return {"parameters": items, "count": len(items)}, compute_etag(items, None)
+
+    # Standard query by parameter ID when no user ID is specified
+    response = parameter_table.query(KeyConditionExpression=Key("paramId").eq(param_id) & Key("timestamp").gt(VERSION_COUNTER_TIMESTAMP), Limit=1, ScanIndexForward=False)
+
+    # Default values if no custom parameters exist
+    if not response.get("Items"):
+        return {"mean": 0, "stdDev": 1, "lastUpdatedBy": None, "lastUpdatedAt": None, "paramId": param_id}, compute_etag([], f"default-{param_id}")
+
+    # Return the current parameters
+    return response["Items"][0], compute_etag(response["Items"][:1], None)
+
+
+def get_parameters(param_id, user_id):
+    """Serve parameters from the container cache while fresh, otherwise reload them"""
+    cache_key = (param_id, user_id)
+    now = time.monotonic()
+
+    cached = response_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1], cached[2]
+
+    body, etag = load_parameters(param_id, user_id)
+
+    if CACHE_TTL_SECONDS > 0:
+        if len(response_cache) >= MAX_CACHE_ENTRIES:
+            # Drop expired entries first, then the oldest if the cache is still full
+            for key in [key for key, entry in response_cache.items() if entry[0] <= now]:
+                del response_cache[key]
+            if len(response_cache) >= MAX_CACHE_ENTRIES:
+                del response_cache[next(iter(response_cache))]
+        response_cache[cache_key] = (now + CACHE_TTL_SECONDS, body, etag)
+
+    return body, etag
+
 
 def lambda_handler(event, context):
     """
@@ -17,6 +102,7 @@ def lambda_handler(event, context):
     Returns default values if no parameters exist.
 
     Supports retrieving parameters by user ID when specified in the query parameters.
+    Responses carry an ETag; requests whose If-None-Match matches it get a 304 with no body.
     """
     try:
         # Extract user ID if provided in the query parameters
@@ -39,28 +125,16 @@ def lambda_handler(event, context):
         # Get parameter ID if specified, otherwise use default
         param_id = query_params.get("paramId", "normal_distribution_params")
 
-        # If a specific user ID is provided, query by user ID through the GSI
-        if user_id:
-            logger.info(f"Querying parameters for user: {user_id}")
-            response = parameter_table.query(IndexName="UserIdIndex", KeyConditionExpression=Key("userId").eq(user_id), Limit=10, ScanIndexForward=False)  # Get most recent 10 parameter sets for the user
-
-            # If no results from user ID query, fall back to default parameters
-            if not response.get("Items"):
-                return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"mean": 0, "stdDev": 1, "lastUpdatedBy": None, "lastUpdatedAt": None, "paramId": param_id, "userId": user_id})}
+        body, etag = get_parameters(param_id, user_id)
 
-            # Return the user's parameters with additional metadata
-            items = response.get("Items", [])
-            return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"parameters": items, "count": len(items)})}
-        else:
-            # Standard query by parameter ID when no user ID is specified
-            response = parameter_table.query(KeyConditionExpression=Key("paramId").eq(param_id), Limit=1, ScanIndexForward=False)
+        headers = {"Access-Control-Allow-Origin": "*", "Access-Control-Expose-Headers": "ETag", "Content-Type": "application/json", "ETag": etag, "Cache-Control": "no-cache"}
 
-            # Default values if no custom parameters exist
-            if not response.get("Items"):
-                return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"mean": 0, "stdDev": 1, "lastUpdatedBy": None, "lastUpdatedAt": None, "paramId": param_id})}
+        # HTTP header names are case-insensitive
+        request_headers = {name.lower(): value for name, value in (event.get("headers") or {}).items()}
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            return {"statusCode": 304, "headers": headers, "body": ""}
 
-            # Return the current parameters
-            return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps(response["Items"][0])}
+        return {"statusCode": 200, "headers": headers, "body": json.dumps(body, default=decimal_default)}
 
     except Exception as e:
         logger.error(f"Error getting visualization data: {str(e)}")
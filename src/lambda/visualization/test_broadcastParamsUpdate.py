@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the parameter update broadcast Lambda function
+"""
+
+import os
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+# Set up test environment variables before importing the handler
+os.environ["CONNECTION_TABLE"] = "connections"
+os.environ["SUBSCRIPTION_TABLE"] = "subscriptions"
+os.environ["WEBSOCKET_API_ENDPOINT"] = "wss://example.execute-api.us-east-2.amazonaws.com/prod"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-2"
+
+import broadcastParamsUpdate
+from broadcastParamsUpdate import VERSION_COUNTER_TIMESTAMP, broadcast_params_update, fan_out, iter_subscribers, lambda_handler, latest_items
+
+PARAMETER_ITEM = {"paramId": "normal_distribution_params", "timestamp": 1000, "mean": 10, "stdDev": 2, "version": "v3", "lastUpdatedAt": 1000}
+
+
+def stream_record(sequence_number, param_id="normal_distribution_params", timestamp=1000, updated_at=None, version="v3", event_name="MODIFY"):
+    """Stream record whose NewImage is a parameter item in DynamoDB JSON"""
+    image = {"paramId": {"S": param_id}, "timestamp": {"N": str(timestamp)}, "mean": {"N": "10"}, "stdDev": {"N": "2"}, "version": {"S": version}, "lastUpdatedAt": {"N": str(timestamp if updated_at is None else updated_at)}}
+    return {"eventName": event_name, "dynamodb": {"SequenceNumber": sequence_number, "NewImage": image}}
+
+
+class BroadcastTestCase(unittest.TestCase):
+    """Stubs the subscription table and management API used by the broadcaster"""
+
+    def setUp(self):
+        self.subscription_table = Mock()
+        self.subscription_table.query.return_value = {"Items": [{"connectionId": "conn-1"}, {"connectionId": "conn-2"}]}
+        self.apigw_management = Mock()
+        self.apigw_management.exceptions.GoneException = type("GoneException", (Exception,), {})
+        self.remove_connections = Mock()
+        for name, value in [("subscription_table", self.subscription_table), ("apigw_management", self.apigw_management), ("remove_connections", self.remove_connections)]:
+            patcher = patch.object(broadcastParamsUpdate, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def gone_for(self, *connection_ids):
+        """Make post_to_connection raise GoneException for the given connections"""
+
+        def post(ConnectionId, Data):
+            if ConnectionId in connection_ids:
+                raise self.apigw_management.exceptions.GoneException()
+
+        self.apigw_management.post_to_connection.side_effect = post
+
+
+class TestBroadcastParamsUpdate(BroadcastTestCase):
+    """Test cases for broadcasting one parameter item"""
+
+    def test_posts_to_every_subscriber(self):
+        """Test the update is posted to each subscribed connection"""
+        broadcast_params_update(PARAMETER_ITEM)
+
+        posted = {call.kwargs["ConnectionId"]: json.loads(call.kwargs["Data"]) for call in self.apigw_management.post_to_connection.call_args_list}
+        self.assertEqual(set(posted), {"conn-1", "conn-2"})
+        self.assertEqual(posted["conn-1"]["data"]["version"], "v3")
+        self.remove_connections.assert_not_called()
+
+    def test_stale_connections_removed(self):
+        """Test connections that are gone are removed along with their subscription"""
+        self.gone_for("conn-2")
+
+        broadcast_params_update(PARAMETER_ITEM)
+
+        self.remove_connections.assert_called_once_with(["conn-2"], "normal_distribution_params")
+
+    def test_cleanup_failure_does_not_fail_broadcast(self):
+        """Test a failed stale-connection cleanup is logged instead of failing the delivered broadcast"""
+        self.gone_for("conn-2")
+        self.remove_connections.side_effect = Exception("Throttled")
+
+        with self.assertLogs(broadcastParamsUpdate.logger, level="ERROR") as logs:
+            broadcast_params_update(PARAMETER_ITEM)
+
+        self.assertIn("Throttled", logs.output[0])
+        self.assertEqual(self.apigw_management.post_to_connection.call_count, 2)
+
+
+class TestSubscribersAndFanOut(BroadcastTestCase):
+    """Test cases for subscriber lookup and concurrent delivery"""
+
+    def test_iter_subscribers_follows_pages(self):
+        """Test subscribers are read from every page of the subscription index"""
+        self.subscription_table.query.side_effect = [{"Items": [{"connectionId": "conn-1"}], "LastEvaluatedKey": {"connectionId": "conn-1"}}, {"Items": [{"connectionId": "conn-2"}]}]
+
+        self.assertEqual(list(iter_subscribers("normal_distribution_params")), ["conn-1", "conn-2"])
+
+        first, second = self.subscription_table.query.call_args_list
+        self.assertEqual(first.kwargs["IndexName"], "ParamSubscribersIndex")
+        self.assertNotIn("ExclusiveStartKey", first.kwargs)
+        self.assertEqual(second.kwargs["ExclusiveStartKey"], {"connectionId": "conn-1"})
+
+    def test_fan_out_returns_only_gone_connections(self):
+        """Test only GoneException connections are reported stale, not other post errors"""
+
+        def post(ConnectionId, Data):
+            if ConnectionId == "conn-2":
+                raise self.apigw_management.exceptions.GoneException()
+            if ConnectionId == "conn-3":
+                raise Exception("Throttled")
+
+        self.apigw_management.post_to_connection.side_effect = post
+
+        self.assertEqual(fan_out(["conn-1", "conn-2", "conn-3", "conn-4"], "{}"), ["conn-2"])
+        self.assertEqual(self.apigw_management.post_to_connection.call_count, 4)
+
+    def test_fan_out_without_connections(self):
+        """Test an empty subscriber list posts nothing"""
+        self.assertEqual(fan_out([], "{}"), [])
+        self.apigw_management.post_to_connection.assert_not_called()
+
+
+class TestStreamBatches(BroadcastTestCase):
+    """Test cases for collapsing and broadcasting stream batches"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.dict(broadcastParamsUpdate.last_broadcast, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_latest_items_keeps_newest_per_param(self):
+        """Test records are collapsed to the newest lastUpdatedAt per paramId with every sequence number kept"""
+        records = [stream_record("1", updated_at=1000, version="v3"), stream_record("2", updated_at=1500, version="v4"), stream_record("3", updated_at=1200, version="v3"), stream_record("4", param_id="other_params")]
+
+        latest = latest_items(records)
+
+        item, sequence_numbers = latest["normal_distribution_params"]
+        self.assertEqual(item["version"], "v4")
+        self.assertEqual(sequence_numbers, ["1", "2", "3"])
+        self.assertEqual(latest["other_params"][1], ["4"])
+
+    def test_latest_items_skips_counter_and_removals(self):
+        """Test version counter updates and REMOVE events are not broadcast"""
+        records = [stream_record("1", timestamp=VERSION_COUNTER_TIMESTAMP), stream_record("2", event_name="REMOVE"), {"eventName": "MODIFY", "dynamodb": {"SequenceNumber": "3"}}]
+
+        self.assertEqual(latest_items(records), {})
+
+    def test_failed_broadcast_reports_its_records(self):
+        """Test a failed broadcast reports every collapsed sequence number and no others"""
+        def query(**kwargs):
+            if kwargs["KeyConditionExpression"].get_expression()["values"][1] != "other_params":
+                raise Exception("Unavailable")
+            return {"Items": [{"connectionId": "conn-1"}]}
+
+        self.subscription_table.query.side_effect = query
+
+        response = lambda_handler({"Records": [stream_record("1"), stream_record("2", updated_at=1100), stream_record("3", param_id="other_params")]}, None)
+
+        self.assertEqual(response, {"batchItemFailures": [{"itemIdentifier": "1"}, {"itemIdentifier": "2"}]})
+        self.assertNotIn("normal_distribution_params", broadcastParamsUpdate.last_broadcast)
+        self.assertEqual(broadcastParamsUpdate.last_broadcast["other_params"], 1000)
+
+    def test_stale_record_skipped(self):
+        """Test a record older than the last broadcast for its paramId is not sent again"""
+        broadcastParamsUpdate.last_broadcast["normal_distribution_params"] = 2000
+
+        response = lambda_handler({"Records": [stream_record("1", updated_at=1000)]}, None)
+
+        self.assertEqual(response, {"batchItemFailures": []})
+        self.apigw_management.post_to_connection.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
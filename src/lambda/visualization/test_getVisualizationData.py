@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the visualization parameter read Lambda function
+"""
+
+import os
+import json
+import unittest
+from unittest.mock import Mock, patch
+from decimal import Decimal
+
+# Set up test environment variables before importing the handler
+os.environ["PARAMETER_TABLE"] = "parameters"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-2"
+
+import getVisualizationData
+from getVisualizationData import compute_etag, etag_matches, lambda_handler
+
+PARAMETER_ITEM = {"paramId": "normal_distribution_params", "timestamp": Decimal(1000), "mean": Decimal("10.5"), "stdDev": Decimal("2"), "version": "v3", "lastUpdatedAt": Decimal(1000)}
+
+
+def get_event(headers=None, **query):
+    return {"queryStringParameters": query or None, "headers": headers}
+
+
+class TestEtags(unittest.TestCase):
+    """Test cases for ETag computation and If-None-Match matching"""
+
+    def test_etag_changes_with_version(self):
+        """Test the ETag is stable for the same items and changes with the version"""
+        etag = compute_etag([PARAMETER_ITEM], None)
+
+        self.assertEqual(etag, compute_etag([dict(PARAMETER_ITEM)], None))
+        self.assertNotEqual(etag, compute_etag([{**PARAMETER_ITEM, "version": "v4"}], None))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_etag_matches(self):
+        """Test If-None-Match lists, weak validators and wildcards"""
+        self.assertTrue(etag_matches('"abc"', '"abc"'))
+        self.assertTrue(etag_matches('W/"abc"', '"abc"'))
+        self.assertTrue(etag_matches('"xyz", W/"abc"', '"abc"'))
+        self.assertTrue(etag_matches("*", '"abc"'))
+        self.assertFalse(etag_matches('"abcd"', '"abc"'))
+        self.assertFalse(etag_matches(None, '"abc"'))
+        self.assertFalse(etag_matches("", '"abc"'))
+
+
+class TestLambdaHandler(unittest.TestCase):
+    """Test cases for cached reads and conditional GETs"""
+
+    def setUp(self):
+        self.parameter_table = Mock()
+        self.parameter_table.query.return_value = {"Items": [PARAMETER_ITEM]}
+        patcher = patch.object(getVisualizationData, "parameter_table", self.parameter_table)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        getVisualizationData.response_cache.clear()
+
+    def test_returns_parameters_with_etag(self):
+        """Test a plain GET returns the latest parameters and their ETag"""
+        response = lambda_handler(get_event(), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"])["mean"], 10.5)
+        self.assertEqual(response["headers"]["ETag"], compute_etag([PARAMETER_ITEM], None))
+        self.assertIn("ETag", response["headers"]["Access-Control-Expose-Headers"])
+
+    def test_matching_if_none_match_returns_304(self):
+        """Test a request with the current ETag gets a 304 with no body"""
+        etag = lambda_handler(get_event(), None)["headers"]["ETag"]
+
+        response = lambda_handler(get_event(headers={"If-None-Match": etag}), None)
+
+        self.assertEqual(response["statusCode"], 304)
+        self.assertEqual(response["body"], "")
+        self.assertEqual(response["headers"]["ETag"], etag)
+
+    def test_header_name_is_case_insensitive(self):
+        """Test lower-case header names from HTTP APIs are honored"""
+        etag = lambda_handler(get_event(), None)["headers"]["ETag"]
+
+        self.assertEqual(lambda_handler(get_event(headers={"if-none-match": etag}), None)["statusCode"], 304)
+
+    def test_stale_etag_returns_200(self):
+        """Test a request with an outdated ETag gets the full response"""
+        response = lambda_handler(get_event(headers={"If-None-Match": '"stale"'}), None)
+
+        self.assertEqual(response["statusCode"], 200)
+
+    @patch("getVisualizationData.CACHE_TTL_SECONDS", 60)
+    def test_cache_serves_repeated_reads(self):
+        """Test repeated reads within the TTL do not query DynamoDB again"""
+        lambda_handler(get_event(), None)
+        lambda_handler(get_event(), None)
+        lambda_handler(get_event(paramId="other_params"), None)
+
+        self.assertEqual(self.parameter_table.query.call_count, 2)
+
+    @patch("getVisualizationData.CACHE_TTL_SECONDS", 0)
+    def test_cache_disabled(self):
+        """Test a zero TTL queries DynamoDB on every read"""
+        lambda_handler(get_event(), None)
+        lambda_handler(get_event(), None)
+
+        self.assertEqual(self.parameter_table.query.call_count, 2)
+        self.assertEqual(getVisualizationData.response_cache, {})
+
+    @patch("getVisualizationData.CACHE_TTL_SECONDS", 60)
+    @patch("getVisualizationData.MAX_CACHE_ENTRIES", 2)
+    def test_cache_is_bounded(self):
+        """Test the cache evicts entries instead of growing without limit"""
+        for param_id in ["a", "b", "c"]:
+            lambda_handler(get_event(paramId=param_id), None)
+
+        self.assertEqual(len(getVisualizationData.response_cache), 2)
+        self.assertNotIn(("a", None), getVisualizationData.response_cache)
+
+    def test_missing_parameters_return_defaults(self):
+        """Test a parameter set with no items returns the default distribution"""
+        self.parameter_table.query.return_value = {"Items": []}
+
+        response = lambda_handler(get_event(paramId="new_params"), None)
+
+        self.assertEqual(json.loads(response["body"])["stdDev"], 1)
+        self.assertEqual(response["headers"]["ETag"], '"default-new_params"')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the parameter update Lambda function
+"""
+
+import os
+import json
+import unittest
+from unittest.mock import Mock, patch
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+# Set up test environment variables before importing the handler
+os.environ["PARAMETER_TABLE"] = "parameters"
+os.environ["HISTORY_TABLE"] = "history"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-2"
+
+import updateVisualizationParams
+from updateVisualizationParams import MAX_WRITE_ATTEMPTS, HistoryKeyConflict, VersionConflict, lambda_handler, write_params
+
+WINDOW_MS = 1000
+NOW_MS = 1_700_000_000_500
+WINDOW_START = NOW_MS - NOW_MS % WINDOW_MS
+
+
+def cancelled(*codes):
+    """TransactionCanceledException with one cancellation reason per transaction item"""
+    return ClientError({"Error": {"Code": "TransactionCanceledException", "Message": "Transaction cancelled"}, "CancellationReasons": [{"Code": code} for code in codes]}, "TransactWriteItems")
+
+
+def update_event(param_id="normal_distribution_params", mean="10", std_dev="2"):
+    return {"requestContext": {"authorizer": {"claims": {"sub": "user-1", "email": "user@example.com"}}}, "body": json.dumps({"paramId": param_id, "mean": float(mean), "stdDev": float(std_dev)})}
+
+
+class UpdateParamsTestCase(unittest.TestCase):
+    """Stubs the DynamoDB client and tables used by the handler"""
+
+    def setUp(self):
+        self.client = Mock()
+        self.parameter_table = Mock()
+        self.parameter_table.name = "parameters"
+        self.history_table = Mock()
+        self.history_table.name = "history"
+        for name, value in [("dynamodb_client", self.client), ("parameter_table", self.parameter_table), ("history_table", self.history_table)]:
+            patcher = patch.object(updateVisualizationParams, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("updateVisualizationParams.time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def current_item(self, timestamp=WINDOW_START, version="v3", param_id="normal_distribution_params"):
+        return {"paramId": param_id, "timestamp": Decimal(timestamp), "mean": Decimal("5"), "stdDev": Decimal("1"), "version": version, "lastUpdatedAt": Decimal(timestamp)}
+
+    def transact_items(self, call=-1):
+        return self.client.transact_write_items.call_args_list[call].kwargs["TransactItems"]
+
+
+@patch("updateVisualizationParams.COALESCE_WINDOW_MS", WINDOW_MS)
+class TestCoalescing(UpdateParamsTestCase):
+    """Test cases for coalescing updates within a window"""
+
+    def test_update_in_current_window_is_coalesced(self):
+        """Test an update in the current item's window overwrites it and keeps its version"""
+        parameter_item, coalesced = write_params(self.current_item(), "normal_distribution_params", Decimal("10"), Decimal("2"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+        self.assertTrue(coalesced)
+        self.assertEqual(parameter_item["timestamp"], WINDOW_START)
+        self.assertEqual(parameter_item["version"], "v3")
+
+        counter, parameter, mean_history, std_history = self.transact_items()
+        self.assertIn("ConditionCheck", counter)
+        self.assertEqual(parameter["Put"]["ConditionExpression"], "lastUpdatedAt <= :updated_at")
+        self.assertEqual(mean_history["Update"]["Key"], {"userId": {"S": "user-1"}, "timestamp": {"N": str(WINDOW_START)}})
+        self.assertEqual(std_history["Update"]["Key"]["timestamp"], {"N": str(WINDOW_START + 1)})
+        self.assertIn("paramId = :param_id", mean_history["Update"]["ConditionExpression"])
+        self.assertIn("if_not_exists(oldValue, :old)", mean_history["Update"]["UpdateExpression"])
+
+    def test_update_in_new_window_adds_version(self):
+        """Test the first update in a window writes a new item with the next version"""
+        parameter_item, coalesced = write_params(self.current_item(WINDOW_START - WINDOW_MS), "normal_distribution_params", Decimal("10"), Decimal("2"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+        self.assertFalse(coalesced)
+        self.assertEqual(parameter_item["timestamp"], WINDOW_START)
+        self.assertEqual(parameter_item["version"], "v4")
+        counter = self.transact_items()[0]["Update"]
+        self.assertEqual(counter["ExpressionAttributeValues"], {":current": {"N": "3"}, ":next": {"N": "4"}})
+
+    def test_superseded_update_is_skipped(self):
+        """Test a request older than the current item does not overwrite it"""
+        self.parameter_table.query.return_value = {"Items": [{**self.current_item(), "lastUpdatedAt": Decimal(NOW_MS + 10_000)}]}
+
+        with patch("updateVisualizationParams.time.time", return_value=NOW_MS / 1000):
+            response = lambda_handler(update_event(), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertTrue(json.loads(response["body"])["superseded"])
+        self.client.transact_write_items.assert_not_called()
+
+    def test_history_entry_of_other_param_is_not_overwritten(self):
+        """Test a window history entry held by another paramId falls back to separate entries"""
+        self.parameter_table.query.return_value = {"Items": [self.current_item(param_id="other_params")]}
+        self.client.transact_write_items.side_effect = [cancelled("None", "None", "ConditionalCheckFailed", "None"), {}]
+
+        with patch("updateVisualizationParams.time.time", return_value=NOW_MS / 1000):
+            response = lambda_handler(update_event(param_id="other_params"), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(self.client.transact_write_items.call_count, 2)
+        mean_history = self.transact_items()[2]
+        self.assertEqual(mean_history["Put"]["Item"]["paramId"], {"S": "other_params"})
+        self.assertEqual(mean_history["Put"]["Item"]["timestamp"], {"N": str(NOW_MS)})
+        self.assertNotIn("ConditionExpression", mean_history["Put"])
+
+    def test_history_conflict_is_not_a_version_conflict(self):
+        """Test only failed counter or parameter conditions count as version conflicts"""
+        self.client.transact_write_items.side_effect = cancelled("None", "None", "ConditionalCheckFailed")
+
+        with self.assertRaises(HistoryKeyConflict):
+            write_params(self.current_item(), "normal_distribution_params", Decimal("10"), Decimal("1"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+
+class TestVersionedWrites(UpdateParamsTestCase):
+    """Test cases for the transactional version counter"""
+
+    def test_write_is_one_transaction(self):
+        """Test the counter, parameter item and history are written in a single call"""
+        parameter_item, coalesced = write_params(self.current_item(), "normal_distribution_params", Decimal("10"), Decimal("2"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+        self.assertFalse(coalesced)
+        self.assertEqual(parameter_item["version"], "v4")
+        counter, parameter, mean_history, std_history = self.transact_items()
+        self.assertEqual(counter["Update"]["ConditionExpression"], "attribute_not_exists(versionNumber) OR versionNumber = :current")
+        self.assertEqual(parameter["Put"]["ConditionExpression"], "attribute_not_exists(paramId)")
+        self.assertEqual(mean_history["Put"]["Item"]["newValue"], {"N": "10"})
+        self.assertEqual(std_history["Put"]["Item"]["timestamp"], {"N": str(NOW_MS + 1)})
+
+    def test_first_write_creates_counter(self):
+        """Test a parameter set with no items starts the counter at v1"""
+        parameter_item, _ = write_params(None, "new_params", Decimal("10"), Decimal("2"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+        self.assertEqual(parameter_item["version"], "v1")
+        counter = self.transact_items()[0]["Update"]
+        self.assertEqual(counter["ConditionExpression"], "attribute_not_exists(versionNumber)")
+        self.assertEqual(counter["ExpressionAttributeValues"], {":next": {"N": "1"}})
+
+    def test_failed_counter_condition_is_version_conflict(self):
+        """Test losing the counter race raises VersionConflict"""
+        self.client.transact_write_items.side_effect = cancelled("ConditionalCheckFailed", "None", "None")
+
+        with self.assertRaises(VersionConflict):
+            write_params(self.current_item(), "normal_distribution_params", Decimal("10"), Decimal("1"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+    def test_version_conflict_retried_with_fresh_state(self):
+        """Test a conflict re-reads the current parameters and retries"""
+        self.parameter_table.query.side_effect = [{"Items": [self.current_item(version="v3")]}, {"Items": [self.current_item(NOW_MS - 100, version="v4")]}]
+        self.client.transact_write_items.side_effect = [cancelled("ConditionalCheckFailed", "None", "None", "None"), {}]
+
+        with patch("updateVisualizationParams.time.time", return_value=NOW_MS / 1000):
+            response = lambda_handler(update_event(), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"])["version"], "v5")
+        self.assertTrue(self.parameter_table.query.call_args.kwargs["ConsistentRead"])
+
+    def test_transaction_conflict_is_version_conflict(self):
+        """Test a concurrent transaction on the counter item is treated as a lost race"""
+        self.client.transact_write_items.side_effect = cancelled("TransactionConflict", "None", "None")
+
+        with self.assertRaises(VersionConflict):
+            write_params(self.current_item(), "normal_distribution_params", Decimal("10"), Decimal("1"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+    def test_transaction_in_progress_is_version_conflict(self):
+        """Test TransactionInProgressException is retried like a version conflict"""
+        self.client.transact_write_items.side_effect = ClientError({"Error": {"Code": "TransactionInProgressException", "Message": "In progress"}}, "TransactWriteItems")
+
+        with self.assertRaises(VersionConflict):
+            write_params(self.current_item(), "normal_distribution_params", Decimal("10"), Decimal("1"), "user-1", "user@example.com", "Title", "", NOW_MS)
+
+    def test_concurrent_writer_retried_with_backoff(self):
+        """Test a transaction conflict with a concurrent writer is retried after a jittered backoff"""
+        self.parameter_table.query.side_effect = [{"Items": [self.current_item(version="v3")]}, {"Items": [self.current_item(NOW_MS - 100, version="v4")]}]
+        self.client.transact_write_items.side_effect = [cancelled("TransactionConflict", "None", "None", "None"), {}]
+
+        with patch("updateVisualizationParams.time.time", return_value=NOW_MS / 1000):
+            response = lambda_handler(update_event(), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"])["version"], "v5")
+        self.sleep.assert_called_once()
+        self.assertLessEqual(self.sleep.call_args[0][0], updateVisualizationParams.RETRY_BASE_DELAY_SECONDS)
+
+    def test_persistent_conflict_returns_409(self):
+        """Test a write that keeps losing the race is rejected after MAX_WRITE_ATTEMPTS"""
+        self.parameter_table.query.return_value = {"Items": [self.current_item()]}
+        self.client.transact_write_items.side_effect = cancelled("ConditionalCheckFailed", "None", "None", "None")
+
+        response = lambda_handler(update_event(), None)
+
+        self.assertEqual(response["statusCode"], 409)
+        self.assertEqual(self.client.transact_write_items.call_count, MAX_WRITE_ATTEMPTS)
+        self.assertEqual(self.sleep.call_count, MAX_WRITE_ATTEMPTS - 1)
+
+    def test_other_errors_return_500(self):
+        """Test non-conflict DynamoDB errors are not retried"""
+        self.parameter_table.query.return_value = {"Items": []}
+        self.client.transact_write_items.side_effect = ClientError({"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "Slow down"}}, "TransactWriteItems")
+
+        response = lambda_handler(update_event(), None)
+
+        self.assertEqual(response["statusCode"], 500)
+        self.client.transact_write_items.assert_called_once()
+
+    def test_invalid_std_dev_rejected(self):
+        """Test non-positive standard deviations are rejected before any write"""
+        response = lambda_handler(update_event(std_dev="0"), None)
+
+        self.assertEqual(response["statusCode"], 400)
+        self.client.transact_write_items.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the WebSocket disconnect Lambda function
+"""
+
+import os
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+# Set up test environment variables before importing the handler
+os.environ["CONNECTION_TABLE"] = "connections"
+os.environ["SUBSCRIPTION_TABLE"] = "subscriptions"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-2"
+
+import wsDisconnect
+from wsDisconnect import lambda_handler, remove_subscriptions
+
+DISCONNECT_EVENT = {"requestContext": {"connectionId": "conn-1"}}
+
+
+class TestDisconnect(unittest.TestCase):
+    """Test cases for removing a connection and its subscriptions"""
+
+    def setUp(self):
+        self.connection_table = Mock()
+        self.connection_table.delete_item.return_value = {"Attributes": {"connectionId": "conn-1", "userId": "user-1"}}
+        self.subscription_table = MagicMock()
+        self.subscription_table.query.return_value = {"Items": []}
+        self.batch = MagicMock()
+        self.subscription_table.batch_writer.return_value.__enter__.return_value = self.batch
+        for name, value in [("connection_table", self.connection_table), ("subscription_table", self.subscription_table)]:
+            patcher = patch.object(wsDisconnect, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_subscriptions_removed_across_pages(self):
+        """Test every page of the connection's subscriptions is deleted"""
+        self.subscription_table.query.side_effect = [{"Items": [{"paramId": "a"}, {"paramId": "b"}], "LastEvaluatedKey": {"connectionId": "conn-1", "paramId": "b"}}, {"Items": [{"paramId": "c"}]}]
+
+        remove_subscriptions("conn-1")
+
+        deleted = [call.kwargs["Key"]["paramId"] for call in self.batch.delete_item.call_args_list]
+        self.assertEqual(deleted, ["a", "b", "c"])
+        first, second = self.subscription_table.query.call_args_list
+        self.assertNotIn("ExclusiveStartKey", first.kwargs)
+        self.assertEqual(second.kwargs["ExclusiveStartKey"], {"connectionId": "conn-1", "paramId": "b"})
+
+    def test_disconnect_deletes_connection_and_subscriptions(self):
+        """Test disconnecting deletes the connection record in one call and its subscriptions"""
+        self.subscription_table.query.return_value = {"Items": [{"paramId": "a"}]}
+
+        response = lambda_handler(DISCONNECT_EVENT, None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.connection_table.delete_item.assert_called_once_with(Key={"connectionId": "conn-1"}, ReturnValues="ALL_OLD")
+        self.batch.delete_item.assert_called_once_with(Key={"connectionId": "conn-1", "paramId": "a"})
+
+    def test_unknown_connection_still_cleans_up(self):
+        """Test subscriptions are removed even when the connection record is already gone"""
+        self.connection_table.delete_item.return_value = {}
+        self.subscription_table.query.return_value = {"Items": [{"paramId": "a"}]}
+
+        response = lambda_handler(DISCONNECT_EVENT, None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.batch.delete_item.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the WebSocket subscribe Lambda function
+"""
+
+import os
+import json
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+# Set up test environment variables before importing the handler
+os.environ["CONNECTION_TABLE"] = "connections"
+os.environ["SUBSCRIPTION_TABLE"] = "subscriptions"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-2"
+
+import wsSubscribe
+from wsSubscribe import MAX_SUBSCRIPTIONS, lambda_handler
+
+
+def subscribe_event(body):
+    return {"requestContext": {"connectionId": "conn-1"}, "body": body if isinstance(body, str) else json.dumps(body)}
+
+
+class TestSubscribe(unittest.TestCase):
+    """Test cases for subscribe and unsubscribe messages"""
+
+    def setUp(self):
+        self.connection_table = Mock()
+        self.connection_table.get_item.return_value = {"Item": {"userId": "user-1", "expiry": 1_700_086_400}}
+        self.subscription_table = MagicMock()
+        self.batch = MagicMock()
+        self.subscription_table.batch_writer.return_value.__enter__.return_value = self.batch
+        for name, value in [("connection_table", self.connection_table), ("subscription_table", self.subscription_table)]:
+            patcher = patch.object(wsSubscribe, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_subscribe_writes_deduplicated_subscriptions(self):
+        """Test each distinct paramId is subscribed with the connection's user and expiry"""
+        response = lambda_handler(subscribe_event({"action": "subscribe", "paramIds": ["a", "b", "a"]}), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(response["body"])["paramIds"], ["a", "b"])
+        items = [call.kwargs["Item"] for call in self.batch.put_item.call_args_list]
+        self.assertEqual([item["paramId"] for item in items], ["a", "b"])
+        self.assertEqual(items[0]["userId"], "user-1")
+        self.assertEqual(items[0]["expiry"], 1_700_086_400)
+
+    def test_single_param_id_accepted(self):
+        """Test the singular paramId field subscribes to one parameter set"""
+        response = lambda_handler(subscribe_event({"paramId": "a"}), None)
+
+        self.assertEqual(json.loads(response["body"]), {"action": "subscribe", "paramIds": ["a"]})
+
+    def test_unsubscribe_deletes_subscriptions(self):
+        """Test unsubscribe deletes the subscriptions without reading the connection"""
+        response = lambda_handler(subscribe_event({"action": "unsubscribe", "paramIds": ["a"]}), None)
+
+        self.assertEqual(response["statusCode"], 200)
+        self.batch.delete_item.assert_called_once_with(Key={"connectionId": "conn-1", "paramId": "a"})
+        self.batch.put_item.assert_not_called()
+        self.connection_table.get_item.assert_not_called()
+
+    def test_invalid_requests_rejected(self):
+        """Test malformed bodies and paramIds are rejected before any write"""
+        for body in ["{not json", {"action": "subscribe"}, {"paramIds": "a"}, {"paramIds": ["a", ""]}, {"paramIds": ["a", 1]}, {"paramIds": [f"p{i}" for i in range(MAX_SUBSCRIPTIONS + 1)]}]:
+            with self.subTest(body=body):
+                self.assertEqual(lambda_handler(subscribe_event(body), None)["statusCode"], 400)
+
+        self.subscription_table.batch_writer.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
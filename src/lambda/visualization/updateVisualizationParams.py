@@ -2,28 +2,168 @@ import json
 import boto3
 import time
 import os
+import random
 import logging
+from decimal import Decimal
+from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 dynamodb = boto3.resource("dynamodb")
+dynamodb_client = dynamodb.meta.client
 parameter_table = dynamodb.Table(os.environ.get("PARAMETER_TABLE"))
 history_table = dynamodb.Table(os.environ.get("HISTORY_TABLE"))
-connection_table = dynamodb.Table(os.environ.get("CONNECTION_TABLE"))
+serializer = TypeSerializer()
 
-# Optional: WebSocket API client for real-time updates
-apigw_management = None
-if os.environ.get("WEBSOCKET_API_ENDPOINT"):
-    endpoint = os.environ.get("WEBSOCKET_API_ENDPOINT")
-    apigw_management = boto3.client("apigatewaymanagementapi", endpoint_url=endpoint)
+# Updates to a paramId within the same window (ms) overwrite one parameter item and one
+# history entry per field instead of adding new ones. 0 disables coalescing.
+COALESCE_WINDOW_MS = int(os.environ.get("COALESCE_WINDOW_MS", "0"))
+
+# Each paramId has a counter item at this sort key holding the latest versionNumber.
+# Every write transaction conditions on it, which serializes concurrent writers.
+VERSION_COUNTER_TIMESTAMP = 0
+
+# Attempts before a write that keeps losing the version race is rejected, and the base of the
+# jittered exponential backoff (seconds) between them
+MAX_WRITE_ATTEMPTS = 3
+RETRY_BASE_DELAY_SECONDS = 0.05
+
+
+class VersionConflict(Exception):
+    """Raised when another writer changed the version counter or parameter item first"""
+
+
+class HistoryKeyConflict(Exception):
+    """Raised when the user's coalesced history entry for this window belongs to another paramId"""
+
+
+def window_start(timestamp):
+    """Start of the coalescing window containing timestamp"""
+    if COALESCE_WINDOW_MS <= 0:
+        return timestamp
+    return timestamp - timestamp % COALESCE_WINDOW_MS
+
+
+def serialize(values):
+    """Convert a dict of Python values to DynamoDB attribute values"""
+    return {key: serializer.serialize(value) for key, value in values.items()}
+
+
+def parse_version(version):
+    """Numeric part of a "v<n>" version string, or 0 if it isn't one"""
+    try:
+        return int(version[1:]) if version and version.startswith("v") else 0
+    except ValueError:
+        return 0
+
+
+def get_current_params(param_id):
+    """Latest parameter item for param_id (strongly consistent), or None"""
+    response = parameter_table.query(KeyConditionExpression=Key("paramId").eq(param_id) & Key("timestamp").gt(VERSION_COUNTER_TIMESTAMP), Limit=1, ScanIndexForward=False, ConsistentRead=True)
+    items = response.get("Items", [])
+    return items[0] if items else None
+
+
+def history_write(user_id, user_email, param_id, param_name, timestamp, old_value, new_value, coalesce=True):
+    """
+    Transaction item recording a parameter change. When coalescing, changes in the same window
+    update one entry, keeping the value from before the window as oldValue and the latest as newValue.
+
+    History is keyed by (userId, timestamp), so the coalesced entry only updates an entry for the
+    same paramId; one left in the window by the user's update to another paramId fails the condition.
+    """
+    if COALESCE_WINDOW_MS <= 0 or not coalesce:
+        history_item = {"userId": user_id, "timestamp": timestamp, "paramName": param_name, "paramId": param_id, "oldValue": old_value, "newValue": new_value, "userEmail": user_email}
+        return {"Put": {"TableName": history_table.name, "Item": serialize(history_item)}}
+
+    return {
+        "Update": {
+            "TableName": history_table.name,
+            "Key": serialize({"userId": user_id, "timestamp": timestamp}),
+            "UpdateExpression": "SET paramName = :name, paramId = :param_id, oldValue = if_not_exists(oldValue, :old), newValue = :new, userEmail = :email",
+            "ConditionExpression": "attribute_not_exists(paramId) OR paramId = :param_id",
+            "ExpressionAttributeValues": serialize({":name": param_name, ":param_id": param_id, ":old": old_value, ":new": new_value, ":email": user_email}),
+        }
+    }
+
+
+def write_params(current, param_id, new_mean, new_std_dev, user_id, user_email, title, description, timestamp, coalesce_history=True):
+    """
+    Write the parameter item, its history and the version counter in one TransactWriteItems call.
+    Returns the written parameter item and whether it was coalesced into the current window.
+
+    With coalesce_history=False the history is recorded as separate entries after the window's
+    coalesced entries, for when the user's window entry is taken by another paramId.
+    """
+    current_mean = current.get("mean", 0) if current else 0
+    current_std_dev = current.get("stdDev", 1) if current else 1
+    current_version = parse_version(current.get("version")) if current else 0
+
+    item_timestamp = window_start(timestamp)
+    coalesced = COALESCE_WINDOW_MS > 0 and current is not None and current["timestamp"] == item_timestamp
+    if current is not None and not coalesced:
+        # New items must sort after the current one (the history stdDev row uses timestamp + 1)
+        item_timestamp = max(item_timestamp, int(current["timestamp"]) + 2)
+
+    # Updates collapsed into the current window keep its version
+    version_number = current_version if coalesced else current_version + 1
+
+    parameter_item = {"paramId": param_id, "timestamp": item_timestamp, "mean": new_mean, "stdDev": new_std_dev, "lastUpdatedBy": user_email, "userId": user_id, "lastUpdatedAt": timestamp, "title": title, "description": description, "version": f"v{version_number}"}
+
+    # Parameter sets written before the counter existed start from their latest item's version
+    counter_key = serialize({"paramId": param_id, "timestamp": VERSION_COUNTER_TIMESTAMP})
+    counter_condition = "attribute_not_exists(versionNumber) OR versionNumber = :current" if current_version else "attribute_not_exists(versionNumber)"
+    counter_values = {":current": current_version} if current_version else {}
+
+    if coalesced:
+        counter_write = {"ConditionCheck": {"TableName": parameter_table.name, "Key": counter_key, "ConditionExpression": counter_condition}}
+    else:
+        counter_write = {"Update": {"TableName": parameter_table.name, "Key": counter_key, "UpdateExpression": "SET versionNumber = :next", "ConditionExpression": counter_condition}}
+        counter_values[":next"] = version_number
+    if counter_values:
+        counter_write[next(iter(counter_write))]["ExpressionAttributeValues"] = serialize(counter_values)
+
+    # Coalesced writes overwrite the window item only with a newer value; other writes never overwrite
+    if coalesced:
+        parameter_write = {"Put": {"TableName": parameter_table.name, "Item": serialize(parameter_item), "ConditionExpression": "lastUpdatedAt <= :updated_at", "ExpressionAttributeValues": serialize({":updated_at": timestamp})}}
+    else:
+        parameter_write = {"Put": {"TableName": parameter_table.name, "Item": serialize(parameter_item), "ConditionExpression": "attribute_not_exists(paramId)"}}
+
+    transact_items = [counter_write, parameter_write]
+    history_timestamp = item_timestamp if coalesce_history else max(timestamp, window_start(timestamp) + 2)
+
+    # Record change history with paramId
+    if new_mean != current_mean:
+        transact_items.append(history_write(user_id, user_email, param_id, "mean", history_timestamp, current_mean, new_mean, coalesce_history))
+
+    if new_std_dev != current_std_dev:
+        transact_items.append(history_write(user_id, user_email, param_id, "stdDev", history_timestamp + 1, current_std_dev, new_std_dev, coalesce_history))  # Ensure unique timestamp
+
+    try:
+        dynamodb_client.transact_write_items(TransactItems=transact_items)
+    except ClientError as e:
+        error_code = e.response["Error"]["Code"]
+        reasons = [reason.get("Code") for reason in e.response.get("CancellationReasons", [])]
+
+        # A concurrent transaction on the same items (botocore doesn't retry these) lost the race
+        # just like a failed counter condition; reasons are positional, counter and parameter item first
+        if error_code == "TransactionInProgressException" or (error_code == "TransactionCanceledException" and ("TransactionConflict" in reasons or "ConditionalCheckFailed" in reasons[:2])):
+            raise VersionConflict(param_id) from e
+        if error_code == "TransactionCanceledException" and "ConditionalCheckFailed" in reasons:
+            raise HistoryKeyConflict(param_id) from e
+        raise
+
+    return parameter_item, coalesced
 
 
 def lambda_handler(event, context):
     """
     Updates normal distribution parameters and records the change history.
-    Optionally broadcasts updates to connected clients via WebSocket.
+    Subscribed WebSocket clients are notified asynchronously by broadcastParamsUpdate,
+    which consumes the parameter table stream.
     """
     # Extract user information from Cognito authorizer
     request_context = event.get("requestContext", {})
@@ -33,8 +173,8 @@ def lambda_handler(event, context):
     user_id = claims.get("sub", "anonymous")
     user_email = claims.get("email", "anonymous@example.com")
 
-    # Parse request body
-    body = json.loads(event.get("body", "{}"))
+    # Parse request body (DynamoDB only accepts Decimal numbers)
+    body = json.loads(event.get("body") or "{}", parse_float=Decimal)
     new_mean = body.get("mean")
     new_std_dev = body.get("stdDev")
 
@@ -53,86 +193,33 @@ def lambda_handler(event, context):
         return {"statusCode": 400, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"error": "Standard deviation must be positive"})}
 
     try:
-        # Get current params for history tracking
-        current_params = parameter_table.query(KeyConditionExpression=Key("paramId").eq(param_id), Limit=1, ScanIndexForward=False)
-
-        current_mean = 0
-        current_std_dev = 1
-        param_exists = False
-
-        if current_params.get("Items"):
-            param_exists = True
-            current_mean = current_params["Items"][0].get("mean", 0)
-            current_std_dev = current_params["Items"][0].get("stdDev", 1)
-
         timestamp = int(time.time() * 1000)  # Milliseconds since epoch
+        coalesce_history = True
 
-        # Build updated parameter item
-        parameter_item = {"paramId": param_id, "timestamp": timestamp, "mean": new_mean, "stdDev": new_std_dev, "lastUpdatedBy": user_email, "userId": user_id, "lastUpdatedAt": timestamp, "title": title, "description": description}
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            # Get current params for history tracking
+            current = get_current_params(param_id)
 
-        # Add unique version identifier for tracking
-        if not param_exists:
-            # For new parameter sets, create a version identifier
-            parameter_item["version"] = "v1"
+            # A request that arrives after a newer one must not overwrite it
+            if COALESCE_WINDOW_MS > 0 and current is not None and current.get("lastUpdatedAt", 0) > timestamp:
+                logger.info(f"Update to {param_id} at {timestamp} superseded by a newer update")
+                return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"success": True, "superseded": True, "timestamp": timestamp, "paramId": param_id})}
+
+            try:
+                parameter_item, coalesced = write_params(current, param_id, new_mean, new_std_dev, user_id, user_email, title, description, timestamp, coalesce_history)
+                break
+            except HistoryKeyConflict:
+                logger.info(f"History entry for {user_id} in this window belongs to another paramId, recording {param_id} separately")
+                coalesce_history = False
+            except VersionConflict:
+                logger.info(f"Version conflict updating {param_id} (attempt {attempt + 1})")
+                if attempt + 1 < MAX_WRITE_ATTEMPTS:
+                    time.sleep(random.uniform(0, RETRY_BASE_DELAY_SECONDS * 2**attempt))
         else:
-            # For updates, increment the version
-            current_version = current_params["Items"][0].get("version", "v0")
-            if current_version.startswith("v"):
-                try:
-                    version_num = int(current_version[1:])
-                    parameter_item["version"] = f"v{version_num + 1}"
-                except ValueError:
-                    parameter_item["version"] = "v1"
-            else:
-                parameter_item["version"] = "v1"
-
-        # Update the parameters
-        parameter_table.put_item(Item=parameter_item)
-
-        # Record change history with paramId
-        if new_mean != current_mean:
-            history_item = {"userId": user_id, "timestamp": timestamp, "paramName": "mean", "paramId": param_id, "oldValue": current_mean, "newValue": new_mean, "userEmail": user_email}
-            history_table.put_item(Item=history_item)
-
-        if new_std_dev != current_std_dev:
-            history_item = {"userId": user_id, "timestamp": timestamp + 1, "paramName": "stdDev", "paramId": param_id, "oldValue": current_std_dev, "newValue": new_std_dev, "userEmail": user_email}  # Ensure unique timestamp
-            history_table.put_item(Item=history_item)
-
-        # Broadcast to all connected clients if WebSocket API is configured
-        if apigw_management:
-            broadcast_params_update(param_id, new_mean, new_std_dev, user_email, user_id)
-
-        return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"success": True, "timestamp": timestamp, "paramId": param_id, "version": parameter_item["version"]})}
+            return {"statusCode": 409, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"error": "Parameters were modified concurrently, please retry"})}
+
+        return {"statusCode": 200, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"success": True, "timestamp": timestamp, "paramId": param_id, "version": parameter_item["version"], "coalesced": coalesced})}
 
     except Exception as e:
         logger.error(f"Error updating parameters: {str(e)}")
         return {"statusCode": 500, "headers": {"Access-Control-Allow-Origin": "*", "Content-Type": "application/json"}, "body": json.dumps({"error": str(e)})}
-
-
-def broadcast_params_update(param_id, mean, std_dev, updated_by, user_id):
-    """Broadcast parameter updates to all connected WebSocket clients"""
-    if not apigw_management:
-        return
-
-    try:
-        # Get all connection IDs
-        response = connection_table.scan(ProjectionExpression="connectionId,userId")
-
-        message = json.dumps({"type": "PARAMS_UPDATE", "data": {"paramId": param_id, "mean": mean, "stdDev": std_dev, "updatedBy": updated_by, "userId": user_id, "timestamp": int(time.time() * 1000)}})
-
-        # Send to each connection
-        for item in response.get("Items", []):
-            connection_id = item["connectionId"]
-            try:
-                apigw_management.post_to_connection(ConnectionId=connection_id, Data=message)
-                logger.info(f"Successfully sent update to connection {connection_id}")
-            except Exception as e:
-                # Connection is no longer valid, delete it
-                if "GoneException" in str(e):
-                    logger.info(f"Removing stale connection: {connection_id}")
-                    connection_table.delete_item(Key={"connectionId": connection_id})
-                else:
-                    logger.error(f"Error posting to connection {connection_id}: {str(e)}")
-
-    except Exception as e:
-        logger.error(f"Error broadcasting update: {str(e)}")
@@ -9,6 +9,11 @@ logger.setLevel(logging.INFO)
 
 dynamodb = boto3.resource("dynamodb")
 connection_table = dynamodb.Table(os.environ.get("CONNECTION_TABLE"))
+subscription_table = dynamodb.Table(os.environ.get("SUBSCRIPTION_TABLE"))
+
+# Parameter set clients are subscribed to when they don't ask for any
+DEFAULT_PARAM_ID = "normal_distribution_params"
+MAX_SUBSCRIPTIONS = 25
 
 
 def lambda_handler(event, context):
@@ -27,6 +32,10 @@ def lambda_handler(event, context):
     # Get userId from query parameters or default to anonymous
     user_id = query_params.get("userId", "anonymous")
 
+    # Parameter sets to subscribe to, e.g. ?paramIds=a,b
+    param_ids = [p.strip() for p in query_params.get("paramIds", query_params.get("paramId", "")).split(",") if p.strip()]
+    param_ids = list(dict.fromkeys(param_ids))[:MAX_SUBSCRIPTIONS] or [DEFAULT_PARAM_ID]
+
     current_time = int(time.time())
     timestamp_ms = current_time * 1000
 
@@ -35,11 +44,16 @@ def lambda_handler(event, context):
         expiry = current_time + 86400
 
         # Create connection record with enhanced attributes
-        connection_item = {"connectionId": connection_id, "userId": user_id, "connectedAt": timestamp_ms, "expiry": expiry, "connectionStatus": "connected", "clientIp": source_ip}
+        connection_item = {"connectionId": connection_id, "userId": user_id, "connectedAt": timestamp_ms, "expiry": expiry, "connectionStatus": "connected", "clientIp": source_ip, "paramIds": param_ids}
 
         # Store connection in DynamoDB
         connection_table.put_item(Item=connection_item)
 
+        # Index the connection under each parameter set it is viewing
+        with subscription_table.batch_writer() as batch:
+            for param_id in param_ids:
+                batch.put_item(Item={"connectionId": connection_id, "paramId": param_id, "userId": user_id, "subscribedAt": timestamp_ms, "expiry": expiry})
+
         logger.info(f"WebSocket connected: {json.dumps(connection_item)}")
         return {"statusCode": 200, "body": "Connected"}
     except Exception as e:
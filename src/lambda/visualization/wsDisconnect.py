@@ -1,12 +1,28 @@
 import boto3
 import os
 import logging
+from boto3.dynamodb.conditions import Key
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 dynamodb = boto3.resource("dynamodb")
 connection_table = dynamodb.Table(os.environ.get("CONNECTION_TABLE"))
+subscription_table = dynamodb.Table(os.environ.get("SUBSCRIPTION_TABLE"))
+
+
+def remove_subscriptions(connection_id):
+    """Delete every subscription held by a connection"""
+    query_kwargs = {"KeyConditionExpression": Key("connectionId").eq(connection_id), "ProjectionExpression": "connectionId,paramId"}
+    with subscription_table.batch_writer() as batch:
+        while True:
+            response = subscription_table.query(**query_kwargs)
+            for item in response.get("Items", []):
+                batch.delete_item(Key={"connectionId": connection_id, "paramId": item["paramId"]})
+
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
 
 def lambda_handler(event, context):
@@ -14,31 +30,19 @@ def lambda_handler(event, context):
     connection_id = event["requestContext"]["connectionId"]
 
     try:
-        # Get the connection record to log details before deletion
-        connection_response = connection_table.get_item(Key={"connectionId": connection_id})
+        # Delete the connection record, getting its details back for logging in the same call
+        connection_response = connection_table.delete_item(Key={"connectionId": connection_id}, ReturnValues="ALL_OLD")
 
-        if "Item" in connection_response:
-            connection_data = connection_response["Item"]
-            logger.info(f"Disconnecting user: {connection_data.get('userId', 'unknown')} with connection ID: {connection_id}")
+        # Alternative: mark the connection as disconnected (update_item SET connectionStatus,
+        # disconnectedAt) and let TTL expire it, for analytics on connection durations
 
-            # Option 1: Delete the connection record
-            connection_table.delete_item(Key={"connectionId": connection_id})
-
-            # Option 2 (alternative): Mark connection as disconnected but let TTL expire it
-            # This would be useful for analytics on connection durations
-            # current_time = int(time.time())
-            # connection_table.update_item(
-            #     Key={"connectionId": connection_id},
-            #     UpdateExpression="SET connectionStatus = :status, disconnectedAt = :time",
-            #     ExpressionAttributeValues={
-            #         ":status": "disconnected",
-            #         ":time": current_time * 1000
-            #     }
-            # )
+        if "Attributes" in connection_response:
+            connection_data = connection_response["Attributes"]
+            logger.info(f"Disconnecting user: {connection_data.get('userId', 'unknown')} with connection ID: {connection_id}")
         else:
             logger.warning(f"Connection ID not found: {connection_id}")
-            # Still attempt to delete in case it exists
-            connection_table.delete_item(Key={"connectionId": connection_id})
+
+        remove_subscriptions(connection_id)
 
         return {"statusCode": 200, "body": "Disconnected"}
     except Exception as e:
@@ -0,0 +1,62 @@
+import boto3
+import os
+import time
+import logging
+import json
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+dynamodb = boto3.resource("dynamodb")
+connection_table = dynamodb.Table(os.environ.get("CONNECTION_TABLE"))
+subscription_table = dynamodb.Table(os.environ.get("SUBSCRIPTION_TABLE"))
+
+MAX_SUBSCRIPTIONS = 25
+
+
+def lambda_handler(event, context):
+    """
+    Handle WebSocket subscribe/unsubscribe messages.
+
+    Expects a body like {"action": "subscribe", "paramIds": ["normal_distribution_params"]}.
+    Subscribed connections receive PARAMS_UPDATE messages for those parameter sets only.
+    """
+    connection_id = event["requestContext"]["connectionId"]
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        return {"statusCode": 400, "body": "Invalid JSON body"}
+
+    action = body.get("action", "subscribe")
+    param_ids = body.get("paramIds", [body["paramId"]] if body.get("paramId") else [])
+    if not isinstance(param_ids, list) or not all(isinstance(p, str) and p for p in param_ids):
+        return {"statusCode": 400, "body": "paramIds must be a list of parameter set IDs"}
+
+    param_ids = list(dict.fromkeys(param_ids))
+    if not param_ids:
+        return {"statusCode": 400, "body": "Missing required parameter: paramIds"}
+    if len(param_ids) > MAX_SUBSCRIPTIONS:
+        return {"statusCode": 400, "body": f"At most {MAX_SUBSCRIPTIONS} paramIds are allowed"}
+
+    try:
+        if action == "unsubscribe":
+            with subscription_table.batch_writer() as batch:
+                for param_id in param_ids:
+                    batch.delete_item(Key={"connectionId": connection_id, "paramId": param_id})
+        else:
+            # Subscriptions expire with the connection they belong to
+            connection = connection_table.get_item(Key={"connectionId": connection_id}, ProjectionExpression="userId,expiry").get("Item", {})
+            current_time = int(time.time())
+            user_id = connection.get("userId", "anonymous")
+            expiry = connection.get("expiry", current_time + 86400)
+
+            with subscription_table.batch_writer() as batch:
+                for param_id in param_ids:
+                    batch.put_item(Item={"connectionId": connection_id, "paramId": param_id, "userId": user_id, "subscribedAt": current_time * 1000, "expiry": expiry})
+
+        logger.info(f"Connection {connection_id} {action}d: {param_ids}")
+        return {"statusCode": 200, "body": json.dumps({"action": action, "paramIds": param_ids})}
+    except Exception as e:
+        logger.error(f"Error handling WebSocket {action}: {str(e)}")
+        return {"statusCode": 500, "body": str(e)}